@@ -0,0 +1,76 @@
+"""Сравнение векторного colormap с прежними поэлементными циклами.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_colormap --faces 2000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.analysis import colormap
+
+
+def _loop_diverging(values: np.ndarray, palette: colormap.Palette) -> np.ndarray:
+    # Прежняя реализация из mesh_utils: одна грань за итерацию
+    base, low, high = palette
+    colors = np.zeros((len(values), 4), dtype=np.uint8)
+    for i, val in enumerate(values):
+        if val < 0:
+            t = -val
+            colors[i] = (base * (1 - t) + low * t).astype(np.uint8)
+        elif val > 0:
+            t = val
+            colors[i] = (base * (1 - t) + high * t).astype(np.uint8)
+        else:
+            colors[i] = base
+    return colors
+
+
+def _loop_sequential(values: np.ndarray, palette: colormap.Palette) -> np.ndarray:
+    base, _, high = palette
+    colors = np.zeros((len(values), 4), dtype=np.uint8)
+    for i in range(len(values)):
+        t = values[i]
+        colors[i] = (base * (1 - t) + high * t).astype(np.uint8)
+    return colors
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    signed = np.clip(rng.normal(0.0, 0.5, args.faces), -1.0, 1.0)
+    unsigned = rng.random(args.faces)
+
+    cases = [
+        ("diverging", "texel_density", signed, _loop_diverging, colormap.diverging),
+        ("sequential", "uv_distortion", unsigned, _loop_sequential, colormap.sequential),
+    ]
+    print(f"faces={args.faces}")
+    for kind, name, values, loop_fn, vec_fn in cases:
+        palette = colormap.get_palette(name)
+        expected = loop_fn(values, palette)
+        actual = vec_fn(values, name)
+        if not np.array_equal(expected, actual):
+            raise SystemExit(f"{kind}: vectorized colors differ from the loop reference")
+        loop_time = _best_of(lambda: loop_fn(values, palette), 1)
+        vec_time = _best_of(lambda: vec_fn(values, name), args.repeat)
+        print(f"{kind:<11} loop {loop_time * 1000:10.1f} ms   vectorized {vec_time * 1000:8.1f} ms   x{loop_time / vec_time:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
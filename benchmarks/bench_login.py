@@ -0,0 +1,118 @@
+"""Пропускная способность входа: проверка argon2 через пул PasswordHasher.
+
+Для каждого набора параметров argon2 (time_cost:memory_cost_KiB:parallelism)
+и каждого уровня одновременности запускает --logins проверок пароля так, как их
+делает /authorization/login, и печатает входы в секунду, p50/p95/p99 ответа,
+число отказов по пределу очереди (429) и наибольшую задержку цикла событий:
+если она растет вместе с нагрузкой, хэширование все еще блокирует цикл.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_login
+    python -m benchmarks.bench_login --costs 3:65536:4,2:19456:1 --concurrency 1,8,64 --workers 4
+    python -m benchmarks.bench_login --max-queue 16 --concurrency 64
+
+Параметры по умолчанию берутся из настроек (ARGON2_*, PASSWORD_HASH_*).
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+# Настройки читаются при импорте src.config, для бенчмарка база и ключ не нужны
+os.environ.setdefault("JWT_SECRET_KEY", "bench-login-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from src.authorization.security import HashingBusy, PasswordHasher, make_pwd_context  # noqa: E402
+from src.config import settings  # noqa: E402
+
+PASSWORD = "bench-login-password"
+
+
+def parse_costs(spec: str) -> List[Tuple[int, int, int]]:
+    costs = []
+    for part in spec.split(","):
+        time_cost, memory_cost, parallelism = (int(x) for x in part.split(":"))
+        costs.append((time_cost, memory_cost, parallelism))
+    return costs
+
+
+async def _loop_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Наибольшее опоздание таймера цикла событий, пока идет замер."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run(hasher: PasswordHasher, hashed: str, logins: int, concurrency: int) -> dict:
+    latencies: List[float] = []
+    rejected = 0
+    remaining = iter(range(logins))
+
+    async def client():
+        nonlocal rejected
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                await hasher.verify(PASSWORD, hashed)
+            except HashingBusy:
+                rejected += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(_loop_lag(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    p50, p95, p99 = np.percentile(np.array(latencies or [0.0]) * 1000, [50, 95, 99])
+    return {"logins": len(latencies), "rejected": rejected, "seconds": elapsed,
+            "per_second": len(latencies) / elapsed, "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+            "loop_lag_ms": await lag * 1000}
+
+
+async def main_async(args):
+    results = []
+    print(f"workers {args.workers}, max queue {args.max_queue}, {args.logins} logins per row")
+    print(f"{'cost t:m:p':<16} {'conc':>5} {'login/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'429':>5} {'loop lag ms':>12}")
+    for time_cost, memory_cost, parallelism in parse_costs(args.costs):
+        context = make_pwd_context(time_cost, memory_cost, parallelism)
+        hashed = context.hash(PASSWORD)
+        hasher = PasswordHasher(context, args.workers, args.max_queue)
+        try:
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                row = await run(hasher, hashed, args.logins, concurrency)
+                cost = f"{time_cost}:{memory_cost}:{parallelism}"
+                results.append({"cost": cost, "concurrency": concurrency, **row})
+                print(f"{cost:<16} {concurrency:>5} {row['per_second']:>9.1f} {row['p50_ms']:>8.1f} "
+                      f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['rejected']:>5} "
+                      f"{row['loop_lag_ms']:>12.1f}")
+        finally:
+            hasher.shutdown()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    default_cost = f"{settings.ARGON2_TIME_COST}:{settings.ARGON2_MEMORY_COST}:{settings.ARGON2_PARALLELISM}"
+    parser.add_argument("--costs", default=default_cost, help="time_cost:memory_cost_KiB:parallelism через запятую")
+    parser.add_argument("--concurrency", default="1,4,16", help="одновременных входов, через запятую")
+    parser.add_argument("--logins", type=int, default=64, help="проверок пароля на строку")
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--max-queue", type=int, default=settings.PASSWORD_HASH_MAX_QUEUE)
+    parser.add_argument("--json", default="", help="куда сохранить результаты в JSON")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Бенчмарк mesh_utils на синтетических моделях со сравнением с базовой линией.
+
+Для каждой модели из benchmarks.synthetic (икосфера, UV-сетка с перекрытиями
+и искажениями, сцена из нескольких геометрий; GLB и OBJ) замеряются load_mesh,
+compute_metrics, починка нормалей, раскраска по плотности, UV метрики и все
+режимы UV SVG. Печатается время, грани/с и пик памяти (tracemalloc), а также
+отношение ко времени из базовой линии.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_mesh_utils --sizes 10k,100k
+    python -m benchmarks.bench_mesh_utils --sizes 10k,100k --update-baseline
+    python -m benchmarks.bench_mesh_utils --sizes 1m,5m --no-memory --baseline ''
+
+С --check код возврата 1, если какой-то замер медленнее базовой линии больше чем в --tolerance раз
+(и больше чем на --min-delta-ms, чтобы шум миллисекундных замеров не давал ложных срабатываний).
+Базовая линия зависит от машины и в репозиторий не входит: запишите ее через
+--update-baseline на той же машине, где сравниваете.
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks import synthetic
+from src.analysis import mesh_utils
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline_mesh_utils.json")
+SVG_MODES = ("original", "overlap", "distortion", "texel_density")
+
+
+def build_assets(workdir: str, sizes: List[str], formats: List[str]) -> List[Tuple[str, str, int]]:
+    """Генерирует модели (если их еще нет в workdir) и возвращает (имя, путь, число граней)."""
+    assets = []
+    for size in sizes:
+        faces = synthetic.SIZES[size]
+        generators = {
+            "icosphere": lambda: [synthetic.icosphere(faces)],
+            "uv_grid": lambda: [synthetic.uv_grid(faces)],
+            "multi": lambda: synthetic.multi_scene(faces),
+        }
+        for kind, generate in generators.items():
+            meshes = None
+            for fmt in formats:
+                # OBJ хранит одну геометрию, сцену из частей в нем проверять нечего
+                if kind == "multi" and fmt == "obj":
+                    continue
+                name = f"{kind}_{size}.{fmt}"
+                path = os.path.join(workdir, name)
+                if not os.path.exists(path):
+                    meshes = meshes or generate()
+                    synthetic.export(path, *meshes)
+                total = len(mesh_utils.load_mesh(path).faces)
+                assets.append((name, path, total))
+    return assets
+
+
+def measure(setup: Callable, fn: Callable, repeat: int, memory: bool) -> Tuple[float, int | None]:
+    """Лучшее время fn(setup()) из repeat запусков и пик памяти отдельного запуска.
+
+    setup не входит в замер и каждый раз дает свежие данные, чтобы кэши trimesh
+    и GeometryData (в том числе найденные перекрытия UV) не переносились между запусками.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        arg = setup()
+        tracemalloc.start()
+        try:
+            fn(arg)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def _context(path: str) -> mesh_utils.AnalysisContext:
+    ctx = mesh_utils.AnalysisContext(path, use_mesh_cache=False)
+    ctx.prepare()
+    return ctx
+
+
+def cases(path: str, out_dir: str) -> Dict[str, Tuple[Callable, Callable]]:
+    """Замер -> (setup, fn). Функции mesh_utils получают свежий меш на каждый запуск."""
+    mesh = mesh_utils.load_mesh(path)
+
+    def fresh():
+        # Копия без внутреннего кэша trimesh: в нем mesh_utils держит GeometryData меша
+        return mesh.copy(include_cache=False)
+
+    result = {
+        "load_mesh": (lambda: path, mesh_utils.load_mesh),
+        "compute_metrics": (fresh, mesh_utils.compute_metrics),
+        "fix_and_color_inverted_polygons": (fresh, mesh_utils.fix_and_color_inverted_polygons),
+        "color_by_face_density": (fresh, mesh_utils.color_by_face_density),
+    }
+    if mesh_utils.has_uv(mesh):
+        result.update({
+            "uv_overlap": (fresh, mesh_utils.compute_uv_overlap),
+            "uv_overlap_raster": (fresh, lambda m: mesh_utils.compute_uv_overlap(m, method="raster")),
+            "uv_distortion": (fresh, mesh_utils.compute_uv_distortion),
+            "texel_density": (fresh, mesh_utils.compute_texel_density),
+        })
+        for mode in SVG_MODES:
+            out_path = os.path.join(out_dir, f"{mode}.svg")
+            result[f"svg_{mode}"] = (lambda: _context(path),
+                                     lambda ctx, out_path=out_path, mode=mode: ctx.save_uv_svg(out_path, mode=mode))
+    return result
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def save_baseline(path: str, results: Dict[str, dict]):
+    merged = load_baseline(path)
+    merged.update(results)
+    payload = {
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": dict(sorted(merged.items())),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10k,100k", help=f"через запятую из {', '.join(synthetic.SIZES)}")
+    parser.add_argument("--formats", default="glb,obj")
+    parser.add_argument("--only", default="", help="замеры через запятую (по умолчанию все)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="не мерить пик памяти (он удваивает время)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "revizor_bench"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--min-delta-ms", type=float, default=5.0,
+                        help="замедление меньше чем на столько миллисекунд не считается регрессией")
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    unknown = [s for s in sizes if s not in synthetic.SIZES]
+    if unknown:
+        raise SystemExit(f"unknown sizes: {unknown}")
+    only = {name for name in args.only.split(",") if name}
+
+    os.makedirs(args.workdir, exist_ok=True)
+    out_dir = tempfile.mkdtemp(prefix="svg_", dir=args.workdir)
+    baseline = load_baseline(args.baseline)
+    results: Dict[str, dict] = {}
+    regressions = []
+
+    print(f"{'asset':<22} {'case':<32} {'faces':>9} {'time ms':>10} {'faces/s':>12} {'peak MB':>9} {'vs base':>8}")
+    for name, path, faces in build_assets(args.workdir, sizes, args.formats.split(",")):
+        for case, (setup, fn) in cases(path, out_dir).items():
+            if only and case not in only:
+                continue
+            seconds, peak = measure(setup, fn, args.repeat, not args.no_memory)
+            key = f"{name}/{case}"
+            results[key] = {"faces": faces, "seconds": seconds, "peak_bytes": peak}
+            ratio = ""
+            if key in baseline and baseline[key]["seconds"] > 0:
+                r = seconds / baseline[key]["seconds"]
+                ratio = f"x{r:.2f}"
+                if r > args.tolerance and (seconds - baseline[key]["seconds"]) * 1000 > args.min_delta_ms:
+                    regressions.append((key, r))
+                    ratio += " !"
+            peak_mb = "" if peak is None else f"{peak / 2 ** 20:.1f}"
+            print(f"{name:<22} {case:<32} {faces:>9} {seconds * 1000:>10.1f} {faces / seconds:>12,.0f} "
+                  f"{peak_mb:>9} {ratio:>8}")
+
+    if args.update_baseline and args.baseline:
+        save_baseline(args.baseline, results)
+        print(f"baseline updated: {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} case(s) slower than baseline x{args.tolerance}:")
+        for key, r in regressions:
+            print(f"  {key}: x{r:.2f}")
+        if args.check:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Нагрузочный сценарий для всего приложения src.main.
+
+Поднимает приложение в отдельном процессе (uvicorn) на временной SQLite
+базе через aiosqlite, генерирует синтетические модели и запускает смесь
+виртуальных пользователей:
+
+    browser - вход, список моделей, ссылки на артефакты, скачивание статики;
+    analyst - загрузка модели, анализ, ожидание задачи, скачивание артефактов.
+
+В конце печатает p50/p95/p99 и пропускную способность по маршрутам, отдельно
+для запросов, пришедшихся на время, когда шли анализы (busy), и без них (idle):
+так видно, остаются ли вход и список ровными под тяжелой нагрузкой.
+
+Нужны зависимости из requirements-dev.txt (httpx). Запуск из корня репозитория:
+    python -m benchmarks.load_test --users browser=8,analyst=2 --duration 60
+    python -m benchmarks.load_test --users browser=20,analyst=4 --size 100k --json load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+import numpy as np
+
+from benchmarks import synthetic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "load-test-password"
+
+
+class Stats:
+    """Латентности по маршрутам с пометкой, шли ли в этот момент анализы."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[tuple]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.analyses_running = 0
+
+    def record(self, route: str, seconds: float, ok: bool):
+        self.samples[route].append((seconds, self.analyses_running > 0))
+        if not ok:
+            self.errors[route] += 1
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        result = {}
+        for route in sorted(self.samples):
+            row = {"count": len(self.samples[route]), "errors": self.errors[route],
+                   "rps": len(self.samples[route]) / elapsed}
+            for phase, busy in (("all", None), ("idle", False), ("busy", True)):
+                values = [s for s, b in self.samples[route] if busy is None or b == busy]
+                if values:
+                    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+                    row[phase] = {"n": len(values), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+            result[route] = row
+        return result
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, stats: Stats, login: str, think: float):
+        self.client = client
+        self.stats = stats
+        self.login = login
+        self.think = think
+        self.headers: Dict[str, str] = {}
+
+    async def request(self, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.stats.record(route, time.perf_counter() - started, False)
+            raise
+        self.stats.record(route, time.perf_counter() - started, response.status_code < 400)
+        if response.status_code == 401 and not url.startswith("/authorization"):
+            # Токен доступа живет 15 минут: на длинных прогонах входим заново
+            await self.sign_in()
+        return response
+
+    async def sign_in(self):
+        r = await self.request("POST /authorization/login", "POST", "/authorization/login",
+                               json={"login": self.login, "password": PASSWORD})
+        if r.status_code == 401:
+            r = await self.request("POST /authorization/register", "POST", "/authorization/register",
+                                   json={"login": self.login, "password": PASSWORD})
+        if "Authorization" in r.headers:
+            self.headers = {"Authorization": r.headers["Authorization"]}
+
+    async def browse(self):
+        """Сценарий browser: то, что делает фронтенд при открытии списка моделей."""
+        await self.sign_in()
+        r = await self.request("GET /analysis/models/names", "GET", "/analysis/models/names")
+        models = [m["id"] for m in r.json()] if r.status_code == 200 else []
+        await self.request("GET /analysis/options", "GET", "/analysis/options")
+        for model_id in models[:3]:
+            r = await self.request("GET /analysis/models/{id}/url", "GET", f"/analysis/models/{model_id}/url")
+            if r.status_code != 200:
+                continue
+            for key in ("url", "density_url", "uv_url"):
+                if r.json().get(key):
+                    await self.request("GET /models/{file}", "GET", r.json()[key])
+
+    async def analyze(self, asset: str, params: dict):
+        """Сценарий analyst: загрузка, анализ, ожидание задачи и просмотр результата."""
+        if not self.headers:
+            await self.sign_in()
+        with open(asset, "rb") as f:
+            r = await self.request("POST /upload/", "POST", "/upload/",
+                                   files={"file": (os.path.basename(asset), f.read())})
+        if r.status_code != 200:
+            return
+        model_id = r.json()["id"]
+        self.stats.analyses_running += 1
+        try:
+            r = await self.request("POST /analysis/models/{id}/analyze", "POST",
+                                   f"/analysis/models/{model_id}/analyze", json=params)
+            if r.status_code != 202:
+                return
+            job_id = r.json()["job_id"]
+            while True:
+                await asyncio.sleep(0.5)
+                r = await self.request("GET /analysis/jobs/{id}", "GET", f"/analysis/jobs/{job_id}")
+                if r.status_code != 200 or r.json()["status"] in ("done", "failed"):
+                    break
+        finally:
+            self.stats.analyses_running -= 1
+        r = await self.request("GET /analysis/models/{id}/url", "GET", f"/analysis/models/{model_id}/url")
+        if r.status_code == 200 and r.json().get("recolored_url"):
+            await self.request("GET /models/{file}", "GET", r.json()["recolored_url"])
+
+
+async def run_user(user: VirtualUser, role: str, deadline: float, assets, params: dict):
+    while time.perf_counter() < deadline:
+        try:
+            if role == "analyst":
+                await user.analyze(next(assets), params)
+            else:
+                await user.browse()
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+        await asyncio.sleep(user.think)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/openapi.json")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("server did not start")
+
+
+def parse_users(spec: str) -> Dict[str, int]:
+    users = {}
+    for part in spec.split(","):
+        role, _, count = part.partition("=")
+        if role not in ("browser", "analyst"):
+            raise SystemExit(f"unknown role: {role}")
+        users[role] = int(count)
+    return users
+
+
+def print_report(report: Dict[str, dict]):
+    print(f"{'route':<38} {'count':>6} {'err':>4} {'rps':>7}  "
+          f"{'p50':>8} {'p95':>8} {'p99':>8}  {'idle p95':>9} {'busy p95':>9}")
+    for route, row in report.items():
+        allp = row["all"]
+        idle = f"{row['idle']['p95_ms']:.1f}" if "idle" in row else "-"
+        busy = f"{row['busy']['p95_ms']:.1f}" if "busy" in row else "-"
+        print(f"{route:<38} {row['count']:>6} {row['errors']:>4} {row['rps']:>7.2f}  "
+              f"{allp['p50_ms']:>8.1f} {allp['p95_ms']:>8.1f} {allp['p99_ms']:>8.1f}  {idle:>9} {busy:>9}")
+
+
+async def main_async(args):
+    workdir = tempfile.mkdtemp(prefix="revizor_load_")
+    os.makedirs(os.path.join(workdir, "models"))
+    try:
+        faces = synthetic.SIZES[args.size]
+        # Разные seed - разное содержимое: иначе после первой модели анализы шли бы из кэша
+        assets = [synthetic.export(os.path.join(workdir, "assets", f"asset_{i}.glb"),
+                                   synthetic.uv_grid(faces, seed=i))
+                  for i in range(args.assets)]
+
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+            "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(workdir, 'load.db')}",
+            "JWT_SECRET_KEY": env.get("JWT_SECRET_KEY", "load-test-secret-key-" + "x" * 32),
+        })
+        # Таблицы создает само приложение при старте (init_database в lifespan)
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            cwd=workdir, env=env)
+        try:
+            limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout,
+                                         limits=limits) as client:
+                await wait_ready(client)
+                stats = Stats()
+                counter = itertools.count()
+                users = []
+                for role, count in parse_users(args.users).items():
+                    for _ in range(count):
+                        users.append((role, VirtualUser(client, stats, f"load_user_{next(counter)}", args.think)))
+                # Заранее регистрируем всех, чтобы первые замеры не состояли из одних регистраций
+                await asyncio.gather(*(user.sign_in() for _, user in users))
+                stats.samples.clear()
+                stats.errors.clear()
+
+                params = {"game_type": "aaa", "usage_area": "hero", **json.loads(args.params)}
+                asset_cycle = itertools.cycle(assets)
+                started = time.perf_counter()
+                deadline = started + args.duration
+                await asyncio.gather(*(run_user(user, role, deadline, asset_cycle, params) for role, user in users))
+                elapsed = time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        report = stats.report(elapsed)
+        print(f"duration {elapsed:.1f}s, users {args.users}, asset {args.size} x{args.assets}")
+        print_report(report)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "elapsed": elapsed, "routes": report}, f, indent=2)
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        else:
+            print(f"workdir kept: {workdir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="browser=8,analyst=2", help="роль=число через запятую")
+    parser.add_argument("--duration", type=float, default=30.0, help="секунд нагрузки")
+    parser.add_argument("--think", type=float, default=0.5, help="пауза пользователя между сценариями, с")
+    parser.add_argument("--size", default="10k", choices=list(synthetic.SIZES))
+    parser.add_argument("--assets", type=int, default=8, help="сколько разных моделей загружать по кругу")
+    parser.add_argument("--params", default="{}", help="JSON с дополнительными AnalyzeParams")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", default="", help="куда сохранить отчет в JSON")
+    parser.add_argument("--keep", action="store_true", help="не удалять рабочий каталог")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
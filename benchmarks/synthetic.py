@@ -0,0 +1,87 @@
+"""Детерминированные синтетические модели для бенчмарков mesh_utils.
+
+Все генераторы зависят только от аргументов и seed: одинаковые параметры
+дают одинаковые модели, и замеры разных запусков можно сравнивать.
+"""
+import math
+import os
+from typing import Dict, List
+
+import numpy as np
+import trimesh
+
+# Предустановленные размеры: имя -> целевое число граней
+SIZES: Dict[str, int] = {
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "5m": 5_000_000,
+}
+
+
+def icosphere(faces: int, inverted: float = 0.05, seed: int = 0) -> trimesh.Trimesh:
+    """Подразделенная икосфера (20 * 4^n граней, ближайшее к faces) со сферической UV развёрткой.
+
+    Доля inverted граней перевернута, чтобы починке нормалей было что делать.
+    На шве развёртки треугольники растянуты через всю текстуру - это дает искажения и перекрытия.
+    """
+    subdivisions = max(0, round(math.log(max(faces, 20) / 20, 4)))
+    mesh = trimesh.creation.icosphere(subdivisions=subdivisions)
+    vertices = np.asarray(mesh.vertices)
+    f = np.array(mesh.faces)
+    rng = np.random.default_rng(seed)
+    flip = rng.random(len(f)) < inverted
+    f[flip] = f[flip][:, ::-1]
+    u = 0.5 + np.arctan2(vertices[:, 1], vertices[:, 0]) / (2 * np.pi)
+    v = 0.5 + np.arcsin(np.clip(vertices[:, 2], -1.0, 1.0)) / np.pi
+    result = trimesh.Trimesh(vertices=vertices, faces=f, process=False)
+    result.visual = trimesh.visual.TextureVisuals(uv=np.c_[u, v])
+    return result
+
+
+def uv_grid(faces: int, overlap: float = 0.1, distortion: float = 0.2, seed: int = 0,
+            offset: float = 0.0) -> trimesh.Trimesh:
+    """Плоская сетка 2 * n^2 граней с UV, совпадающей с XY, и управляемыми дефектами.
+
+    overlap - доля строк сетки, UV которых сдвинута на соседние строки (перекрытия);
+    distortion - амплитуда случайного шума высоты, который растягивает треугольники
+    относительно UV (искажения и разброс texel density).
+    """
+    n = max(1, round(math.sqrt(faces / 2)))
+    rng = np.random.default_rng(seed)
+    xs, ys = np.meshgrid(np.linspace(0.0, 1.0, n + 1), np.linspace(0.0, 1.0, n + 1))
+    heights = distortion * rng.random(xs.size) / n * 4
+    vertices = np.c_[xs.ravel() + offset, ys.ravel(), heights]
+    uv = np.c_[xs.ravel(), ys.ravel()]
+    shifted_rows = int(round((n + 1) * overlap))
+    if shifted_rows:
+        uv[: (n + 1) * shifted_rows, 1] += 2.0 / n
+    idx = np.arange((n + 1) * (n + 1)).reshape(n + 1, n + 1)
+    a = idx[:-1, :-1].ravel()
+    b = idx[:-1, 1:].ravel()
+    c = idx[1:, 1:].ravel()
+    d = idx[1:, :-1].ravel()
+    f = np.r_[np.c_[a, b, c], np.c_[a, c, d]]
+    mesh = trimesh.Trimesh(vertices=vertices, faces=f, process=False)
+    mesh.visual = trimesh.visual.TextureVisuals(uv=uv)
+    return mesh
+
+
+def multi_scene(faces: int, parts: int = 8, seed: int = 0) -> List[trimesh.Trimesh]:
+    """Сцена из parts сеток примерно по faces / parts граней, разнесенных по X."""
+    return [uv_grid(faces // parts, seed=seed + i, offset=1.5 * i) for i in range(parts)]
+
+
+def export(path: str, *meshes: trimesh.Trimesh) -> str:
+    """Пишет геометрии в файл; формат по расширению (.glb, .obj)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".obj"):
+        # OBJ хранит одну геометрию: сцену объединяем заранее
+        mesh = meshes[0] if len(meshes) == 1 else trimesh.util.concatenate(list(meshes))
+        mesh.export(path)
+        return path
+    scene = trimesh.Scene()
+    for i, mesh in enumerate(meshes):
+        scene.add_geometry(mesh, geom_name=f"part_{i}")
+    scene.export(path)
+    return path
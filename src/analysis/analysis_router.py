@@ -1,34 +1,49 @@
-from typing import Annotated
+from typing import Annotated, Dict, Tuple
+import asyncio
+import base64
+import binascii
+import json
 import os
+import re
+from concurrent.futures.process import BrokenProcessPool
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.authorization.security import security
+from src.config import settings
 from src.database.db_main import get_session
 from src.database.repositories import ModelsRepository
-from src.analysis.schemas import AnalyzeParams
+from src.analysis.schemas import AnalyzeParams, UvOverlapMethod
 from src.analysis.thresholds import get_thresholds
-from src.analysis.mesh_utils import (
-    get_model_path,
-    get_model_variant_path,
-    load_mesh,
-    compute_metrics,
-    recolor_mesh_red,
-    fix_and_color_inverted_polygons,
-    color_by_face_density,
-    save_mesh,
-    save_uv_svg_from_path,
-    compute_uv_overlap_from_path,
-    compute_uv_distortion_from_path,
-    compute_texel_density_from_path,
-)
-from src.analysis.thresholds import THRESHOLDS
+from src.analysis.pipeline import run_analysis, materialize_artifact, LAZY_ARTIFACTS, AnalysisError
+from src.analysis.context_cache import context_cache
+from src.analysis.mesh_utils import get_model_dir
+from src.analysis.jobs import job_manager
+from src.analysis.thresholds import THRESHOLDS, evaluate_all
 
 router = APIRouter(prefix="/analysis")
 
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
 
+_STORED_NAME = re.compile(r"^[0-9a-f]{32}\.\w+$")
+MEDIA_TYPES = {".glb": "model/gltf-binary", ".svg": "image/svg+xml"}
+
+# Поле ответа /models/{id}/url -> ключ отчета со ссылкой
+URL_FIELDS = {
+    "recolored_url": "recolored_model_url",
+    "density_url": "density_model_url",
+    "uv_url": "uv_image_url",
+    "uv_overlap_url": "uv_overlap_url",
+    "uv_distortion_url": "uv_distortion_url",
+    "uv_texel_density_url": "uv_texel_density_url",
+    "uv_tiles_url": "uv_tiles_url",
+}
+
+# Артефакты, которые сейчас строятся: повторные запросы ждут ту же задачу
+_materializing: Dict[Tuple[int, str, str, str], asyncio.Future] = {}
+
 
 async def get_models_repo(session: AsyncSession = Depends(get_session)) -> ModelsRepository:
     return ModelsRepository(session)
@@ -38,12 +53,39 @@ async def get_current_user_id(token=Depends(security.access_token_required)):
     return int(token.sub)
 
 
+def _encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id}).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["after"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(after, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after
+
+
 @router.get("/models/names")
 async def get_model_names(
+    response: Response,
+    limit: int = Query(settings.MODELS_PAGE_SIZE, ge=1, le=settings.MODELS_PAGE_MAX),
+    cursor: str | None = None,
+    prefix: str | None = None,
     user_id: int = Depends(get_current_user_id),
     repo: ModelsRepository = Depends(get_models_repo),
 ):
-    rows = await repo.get_by_user(user_id)
+    """Страница списка моделей; курсор следующей страницы - в заголовке X-Next-Cursor.
+
+    Заголовка нет на последней странице. prefix - поиск по началу имени.
+    """
+    after_id = _decode_cursor(cursor) if cursor else None
+    # Лишняя строка показывает, есть ли следующая страница
+    rows = await repo.get_by_user(user_id, limit=limit + 1, after_id=after_id, name_prefix=prefix)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].id)
     return [{"id": row.id, "name": row.name} for row in rows]
 
 
@@ -53,20 +95,45 @@ async def get_model_analysis(
     user_id: int = Depends(get_current_user_id),
     repo: ModelsRepository = Depends(get_models_repo),
 ):
-    model = await repo.get_by_id(model_id)
-    if not model or model.user_id != user_id:
+    model = await repo.get_owned(model_id, user_id, "report")
+    if not model:
         raise HTTPException(status_code=404, detail="Model not found")
     return model.report if model.report is not None else {"message": "no analysis yet"}
 
 
+@router.get("/models/{model_id}/profiles")
+async def get_model_profiles(
+    model_id: int,
+    user_id: int = Depends(get_current_user_id),
+    repo: ModelsRepository = Depends(get_models_repo),
+):
+    """Проходит ли модель каждый профиль game_type x usage_area.
+
+    Метрики от профиля не зависят, поэтому матрица строится по метрикам
+    последнего отчета, без повторной загрузки меша.
+    """
+    model = await repo.get_owned(model_id, user_id, report_keys=("metrics",))
+    if not model:
+        raise HTTPException(status_code=404, detail="Model not found")
+    metrics = model.metrics
+    if metrics is None:
+        raise HTTPException(status_code=409, detail="Model has not been analyzed yet")
+    profiles = evaluate_all(metrics)
+    verdicts = [(f"{gt}/{ua}", verdict["passed"]) for gt, areas in profiles.items() for ua, verdict in areas.items()]
+    passed = [name for name, ok in verdicts if ok is True]
+    not_evaluated = [name for name, ok in verdicts if ok is None]
+    return {"metrics": metrics, "profiles": profiles, "passed": passed, "not_evaluated": not_evaluated}
+
+
 @router.get("/models/{model_id}/url")
 async def get_model_url(
     model_id: int,
     user_id: int = Depends(get_current_user_id),
     repo: ModelsRepository = Depends(get_models_repo),
 ):
-    model = await repo.get_by_id(model_id)
-    if not model or model.user_id != user_id:
+    model = await repo.get_owned(model_id, user_id, "name", "stored_name",
+                                 report_keys=(*URL_FIELDS.values(), "uv_tiles"))
+    if not model:
         raise HTTPException(status_code=404, detail="Model not found")
 
     user_dir = os.path.join("models", str(user_id))
@@ -85,20 +152,13 @@ async def get_model_url(
         "url": url,
     }
 
-    if model.report:
-        if "recolored_model_url" in model.report:
-            res["recolored_url"] = model.report["recolored_model_url"]
-        if "density_model_url" in model.report:
-            res["density_url"] = model.report["density_model_url"]
-        if "uv_image_url" in model.report:
-            res["uv_url"] = model.report["uv_image_url"]
-        if "uv_overlap_url" in model.report:
-            res["uv_overlap_url"] = model.report["uv_overlap_url"]
-        if "uv_distortion_url" in model.report:
-            res["uv_distortion_url"] = model.report["uv_distortion_url"]
-        if "uv_texel_density_url" in model.report:
-            res["uv_texel_density_url"] = model.report["uv_texel_density_url"]
-        
+    values = model._mapping
+    for field, key in URL_FIELDS.items():
+        if values[key] is not None:
+            res[field] = values[key]
+    if values["uv_tiles_url"] is not None:
+        res["uv_tiles"] = values["uv_tiles"]
+
     return res
 
 @router.get("/options")
@@ -110,119 +170,121 @@ async def get_analysis_options(
     return {"game_types": game_types, "usage_areas_by_game_type": usage_map}
 
 
-@router.post("/models/{model_id}/analyze")
+@router.post("/models/{model_id}/analyze", status_code=202)
 async def analyze_model(
     model_id: int,
     params: AnalyzeParams,
     user_id: int = Depends(get_current_user_id),
     repo: ModelsRepository = Depends(get_models_repo),
 ):
-    model = await repo.get_by_id(model_id)
-    if not model or model.user_id != user_id:
+    model = await repo.get_owned(model_id, user_id, "stored_name", "content_hash")
+    if not model:
         raise HTTPException(status_code=404, detail="Model not found")
-    path = get_model_path(user_id, model.stored_name)
-    try:
-        mesh = load_mesh(path)
-    except Exception:
-        raise HTTPException(status_code=400, detail="Failed to load model")
-    faces, density = compute_metrics(mesh)
     try:
-        max_faces, max_density = get_thresholds(params.game_type, params.usage_area)
+        get_thresholds(params.game_type, params.usage_area)
     except KeyError as e:
         raise HTTPException(status_code=400, detail=f"Invalid parameter: {str(e)}")
 
-    recolored_name = "recolored.glb"
-    recolored_path = get_model_variant_path(user_id, model.stored_name, recolored_name)
-    try:
-        recolored_mesh = fix_and_color_inverted_polygons(mesh)
-        save_mesh(recolored_mesh, recolored_path)
-    except Exception as e:
-        print(f"Error creating recolored mesh: {e}")
-        recolored_name = None
-    density_name = "density.glb"
-    density_path = get_model_variant_path(user_id, model.stored_name, density_name)
+    # Прошлый отчет задача читает сама, когда до нее дойдет очередь модели
+    job = job_manager.submit(user_id, model_id, run_analysis, user_id, model.stored_name, params.model_dump(),
+                             model.content_hash)
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(
+    job_id: str,
+    user_id: int = Depends(get_current_user_id),
+):
+    job = job_manager.get(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_analysis_job(
+    job_id: str,
+    user_id: int = Depends(get_current_user_id),
+    last_event_id: int = Header(0),
+):
+    # Server-Sent Events: ход анализа, частичные метрики и итоговый отчет.
+    # После переподключения EventSource шлет Last-Event-ID, и поток продолжается с него
+    job = job_manager.get(job_id, user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def stream():
+        async for event in job_manager.events(job, after=last_event_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/models/{model_id}/jobs")
+async def get_model_jobs(
+    model_id: int,
+    user_id: int = Depends(get_current_user_id),
+):
+    jobs = job_manager.list_for_model(model_id, user_id)
+    return [job.to_dict() for job in sorted(jobs, key=lambda j: j.created_at)]
+
+
+@router.get("/cache/stats")
+async def get_context_cache_stats(
+    user_id: int = Depends(get_current_user_id),
+):
+    # Счетчики кэша разобранных моделей этого процесса: для подбора ANALYSIS_CONTEXT_CACHE_BYTES
+    return context_cache.stats()
+
+
+@router.get("/artifacts/{user_id}/{stored_name}/{name}")
+async def get_lazy_artifact(
+    user_id: int,
+    stored_name: str,
+    name: str,
+    uv_overlap_method: UvOverlapMethod = "auto",
+    current_user_id: int = Depends(get_current_user_id),
+    repo: ModelsRepository = Depends(get_models_repo),
+):
+    # Запрос может запустить построение артефакта, поэтому отдаем его только владельцу модели
+    if name not in LAZY_ARTIFACTS or not _STORED_NAME.match(stored_name):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    model = None
+    if current_user_id == user_id:
+        model = await repo.get_owned_by_stored_name(stored_name, user_id, "content_hash")
+    if not model or not os.path.isdir(get_model_dir(user_id, stored_name)):
+        raise HTTPException(status_code=404, detail="Model not found")
+
+    key = (user_id, stored_name, name, uv_overlap_method)
+    future = _materializing.get(key)
+    # Завершенный future (в том числе с ошибкой) не переиспользуем: колбэк мог еще не убрать его
+    if future is None or future.done():
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(job_manager.executor, materialize_artifact,
+                                      user_id, stored_name, name, uv_overlap_method, model.content_hash)
+        _materializing[key] = future
+
+        def forget(done: asyncio.Future):
+            if _materializing.get(key) is done:
+                del _materializing[key]
+
+        future.add_done_callback(forget)
     try:
-        density_mesh = color_by_face_density(mesh)
-        save_mesh(density_mesh, density_path)
+        # shield: отмена одного запроса не должна отменять построение для остальных
+        path = await asyncio.shield(future)
+    except AnalysisError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (BrokenProcessPool, OSError) as e:
+        # Пул процессов пересоздается, запись кэша могла быть вытеснена во время раскладки: можно повторить
+        raise HTTPException(status_code=503, detail=f"Artifact is temporarily unavailable: {str(e)}",
+                            headers={"Retry-After": "1"})
     except Exception as e:
-        print(f"Error creating density mesh: {e}")
-        density_name = None
-
-    uv_name = "uv_layout.svg"
-    uv_path = get_model_variant_path(user_id, model.stored_name, uv_name)
-    
-    # Генерируем все варианты UV разверток
-    uv_present = save_uv_svg_from_path(path, uv_path, mode="original")
-    
-    uv_overlap_name = "uv_overlap.svg"
-    uv_overlap_path = get_model_variant_path(user_id, model.stored_name, uv_overlap_name)
-    
-    uv_distortion_name = "uv_distortion.svg"
-    uv_distortion_path = get_model_variant_path(user_id, model.stored_name, uv_distortion_name)
-    
-    uv_texel_name = "uv_texel_density.svg"
-    uv_texel_path = get_model_variant_path(user_id, model.stored_name, uv_texel_name)
-    
-    uv_overlap = 0.0
-    uv_distortion = 0.0
-    texel_density = 0.0
-    texel_uniformity = 0.0
-    
-    if uv_present:
-        # Генерируем дополнительные визуализации
-        save_uv_svg_from_path(path, uv_overlap_path, mode="overlap")
-        save_uv_svg_from_path(path, uv_distortion_path, mode="distortion")
-        save_uv_svg_from_path(path, uv_texel_path, mode="texel_density")
-        
-        # Считаем метрики
-        uv_overlap = compute_uv_overlap_from_path(path)
-        uv_distortion = compute_uv_distortion_from_path(path)
-        texel_res = compute_texel_density_from_path(path)
-        texel_density = texel_res["avg_density"]
-        texel_uniformity = texel_res["uniformity"]
-
-    payload = {
-        "params": params.model_dump(),
-        "metrics": {
-            "faces": faces, 
-            "density": density, 
-            "uv_overlap": uv_overlap,
-            "uv_distortion": uv_distortion,
-            "texel_density": texel_density,
-            "texel_uniformity": texel_uniformity
-        },
-        "limits": {
-            "max_faces": max_faces, 
-            "max_density": max_density, 
-            "max_uv_overlap": 0.0,
-            "max_uv_distortion": 0.5,
-            "max_texel_uniformity": 0.2
-        },
-        "result": {
-            "faces_ok": faces <= max_faces, 
-            "density_ok": density <= max_density,
-            "uv_overlap_ok": uv_overlap <= 0.001,
-            "uv_distortion_ok": uv_distortion <= 0.5,
-            "texel_uniformity_ok": texel_uniformity <= 0.2
-        },
-        "uv_present": uv_present,
-    }
-
-    if recolored_name:
-        import time
-        payload["recolored_model_url"] = f"/models/{user_id}/{model.stored_name}/{recolored_name}?t={int(time.time())}"
-    if density_name:
-        import time
-        payload["density_model_url"] = f"/models/{user_id}/{model.stored_name}/{density_name}?t={int(time.time())}"
-    
-    # Добавляем все URL для UV
-    if uv_present:
-        import time
-        t = int(time.time())
-        payload["uv_image_url"] = f"/models/{user_id}/{model.stored_name}/{uv_name}?t={t}"
-        payload["uv_overlap_url"] = f"/models/{user_id}/{model.stored_name}/{uv_overlap_name}?t={t}"
-        payload["uv_distortion_url"] = f"/models/{user_id}/{model.stored_name}/{uv_distortion_name}?t={t}"
-        payload["uv_texel_density_url"] = f"/models/{user_id}/{model.stored_name}/{uv_texel_name}?t={t}"
-
-    await repo.update_report(model_id, payload)
-    return payload
+        raise HTTPException(status_code=500, detail=f"Failed to build artifact: {str(e)}")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Artifact is not available for this model")
+    return FileResponse(path, media_type=MEDIA_TYPES.get(os.path.splitext(path)[1]))
@@ -0,0 +1,66 @@
+from typing import Dict, NamedTuple, Union
+
+import numpy as np
+
+
+class Palette(NamedTuple):
+    """Цвета RGBA: base соответствует 0, low - значению -1, high - значению 1."""
+    base: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+
+
+def make_palette(base, low, high) -> Palette:
+    return Palette(
+        base=np.asarray(base, dtype=np.uint8),
+        low=np.asarray(low, dtype=np.uint8),
+        high=np.asarray(high, dtype=np.uint8),
+    )
+
+
+PALETTES: Dict[str, Palette] = {
+    # Плотность граней: мелкие грани красные, крупные синие
+    "face_density": make_palette([180, 180, 180, 255], [255, 0, 0, 255], [0, 64, 255, 255]),
+    # Искажение UV: от серого к красному
+    "uv_distortion": make_palette([180, 180, 180, 150], [180, 180, 180, 150], [255, 0, 0, 200]),
+    # Плотность текселей: ниже среднего красный, выше среднего синий
+    "texel_density": make_palette([180, 180, 180, 150], [255, 0, 0, 200], [0, 64, 255, 200]),
+}
+
+PaletteLike = Union[str, Palette]
+
+
+def register_palette(name: str, palette: Palette):
+    PALETTES[name] = palette
+
+
+def get_palette(palette: PaletteLike) -> Palette:
+    if isinstance(palette, Palette):
+        return palette
+    try:
+        return PALETTES[palette]
+    except KeyError:
+        raise ValueError(f"unknown_palette: {palette}")
+
+
+def _blend(base: np.ndarray, target: np.ndarray, t: np.ndarray) -> np.ndarray:
+    # Та же арифметика, что и base * (1 - t) + target * t для одной грани, но за один проход
+    base = base.astype(np.float64)
+    target = target.astype(np.float64)
+    t = t[:, None]
+    return (base * (1.0 - t) + target * t).astype(np.uint8)
+
+
+def diverging(values: np.ndarray, palette: PaletteLike) -> np.ndarray:
+    """Значения из [-1, 1] в RGBA uint8: отрицательные к low, положительные к high."""
+    pal = get_palette(palette)
+    v = np.clip(np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0), -1.0, 1.0)
+    target = np.where((v < 0)[:, None], pal.low, pal.high)
+    return _blend(pal.base, target, np.abs(v))
+
+
+def sequential(values: np.ndarray, palette: PaletteLike) -> np.ndarray:
+    """Значения из [0, 1] в RGBA uint8: от base к high."""
+    pal = get_palette(palette)
+    v = np.clip(np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0), 0.0, 1.0)
+    return _blend(pal.base, pal.high, v)
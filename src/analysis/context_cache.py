@@ -0,0 +1,138 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src import monitoring
+from src.analysis.executor import pool_size
+from src.analysis.mesh_utils import AnalysisContext, GeometryData
+from src.config import settings
+
+
+def _array_bytes(value, seen: set) -> int:
+    """Байты массивов NumPy в значении (массив, список, словарь), каждый буфер один раз.
+
+    Массивы поверх mmap не считаются: их страницы принадлежат файлу, а не процессу.
+    """
+    if isinstance(value, np.ndarray):
+        base = value
+        while isinstance(base.base, np.ndarray):
+            base = base.base
+        if isinstance(base, np.memmap) or id(base) in seen:
+            return 0
+        seen.add(id(base))
+        return base.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_array_bytes(v, seen) for v in value)
+    if isinstance(value, dict):
+        return sum(_array_bytes(v, seen) for v in value.values())
+    return 0
+
+
+def _geometry_bytes(geom: GeometryData, seen: set) -> int:
+    mesh = geom.mesh
+    total = _array_bytes(geom.__dict__, seen)
+    total += _array_bytes([mesh.vertices, mesh.faces], seen)
+    # Внутренний кэш trimesh: нормали, площади и прочее, посчитанное по запросу
+    total += _array_bytes(getattr(getattr(mesh, "_cache", None), "cache", {}), seen)
+    total += _array_bytes(getattr(mesh.visual, "uv", None), seen)
+    return total
+
+
+def context_bytes(ctx: AnalysisContext) -> int:
+    """Сколько памяти занимают массивы контекста, включая лениво посчитанные."""
+    seen: set = set()
+    total = sum(_geometry_bytes(geom, seen) for geom in ctx.geometries)
+    # Объединенный меш считается, только если он уже построен: подсчет не должен его создавать
+    merged = ctx.__dict__.get("merged")
+    if merged is not None:
+        total += _geometry_bytes(merged, seen)
+    return total
+
+
+class ContextCache:
+    """LRU разобранных моделей (AnalysisContext) в памяти процесса.
+
+    Ключ - путь к файлу, его размер и mtime: измененный файл разбирается заново.
+    Размер записей пересчитывается при каждом обращении, потому что производные
+    массивы появляются лениво; вытесняются давно не использованные записи,
+    пока сумма не станет не больше max_bytes.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, int, int], AnalysisContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: str, uv_overlap_method: str = "auto", content_hash: str | None = None,
+            merged: bool = True) -> AnalysisContext:
+        """Контекст модели из кэша или только что разобранный.
+
+        merged=False - не строить объединенный меш заранее (задачи пула над UV);
+        он все равно посчитается лениво при первом обращении.
+        """
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            ctx = self._entries.get(key)
+            if ctx is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if ctx is None:
+            ctx = AnalysisContext(path, content_hash=content_hash)
+            # Общие для всех запросов массивы считаем до того, как контекст станет общим
+            ctx.prepare(merged=merged)
+            with self._lock:
+                for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                    del self._entries[stale]
+                self._entries[key] = ctx
+                self._entries.move_to_end(key)
+        self.evict()
+        return ctx.with_options(uv_overlap_method=uv_overlap_method)
+
+    def evict(self):
+        with self._lock:
+            sizes = {key: context_bytes(ctx) for key, ctx in self._entries.items()}
+            total = sum(sizes.values())
+            # Самую свежую запись не трогаем: она нужна текущему анализу
+            while total > self.max_bytes and len(self._entries) > 1:
+                key, _ = self._entries.popitem(last=False)
+                total -= sizes[key]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(context_bytes(ctx) for ctx in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Экземпляр есть в процессе API и в каждом процессе пула: бюджет делится между ними
+context_cache = ContextCache(settings.ANALYSIS_CONTEXT_CACHE_BYTES // (pool_size() + 1))
+
+CONTEXT_CACHE_STATS = monitoring.Gauge(
+    "analysis_context_cache", "Parsed model cache counters (entries, bytes, hits, misses, evictions)", ("stat",))
+
+
+def _collect_stats():
+    for stat, value in context_cache.stats().items():
+        CONTEXT_CACHE_STATS.set(value, stat=stat)
+
+
+monitoring.COLLECTORS.append(_collect_stats)
@@ -0,0 +1,179 @@
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.config import settings
+
+Task = Tuple[Callable[..., Any], tuple]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # Тяжелые импорты делаем один раз при старте процесса, а не в первой задаче
+    import numpy  # noqa: F401
+    import scipy.sparse  # noqa: F401
+    import scipy.spatial  # noqa: F401
+    import shapely  # noqa: F401
+    import trimesh  # noqa: F401
+    import trimesh.exchange.gltf  # noqa: F401
+    import src.analysis.mesh_utils  # noqa: F401
+
+
+def _ping() -> int:
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def pool_size() -> int:
+    if settings.ANALYSIS_PROCESSES is None:
+        return os.cpu_count() or 1
+    return max(0, settings.ANALYSIS_PROCESSES)
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Общий пул процессов для CPU-работы mesh_utils. None, если пул выключен."""
+    global _pool
+    size = pool_size()
+    if size == 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _pool
+
+
+def _reset_pool(pool: Executor):
+    """Убирает сломанный пул (процесс убит OOM, упал в нативном коде): следующий get_pool создаст новый."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def warm_up():
+    """Запускает все процессы пула заранее, чтобы первый анализ не платил за импорты."""
+    pool = get_pool()
+    if pool is None:
+        return
+    futures = [pool.submit(_ping) for _ in range(pool_size())]
+    wait(futures)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _measured(fn: Callable[..., Any], args: tuple) -> Tuple[Any, float, int]:
+    """Выполняет задачу и возвращает (результат, секунды, пик RSS процесса в байтах)."""
+    started = time.perf_counter()
+    value = fn(*args)
+    # ru_maxrss в Linux - в килобайтах
+    return value, time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _unwrap(measured: Future, name: str, timings: Dict[str, Tuple[float, int]]) -> Future:
+    """Future с результатом задачи; время и память из _measured попадают в timings[name]."""
+    future: Future = Future()
+
+    def done(src: Future):
+        if src.exception() is not None:
+            future.set_exception(src.exception())
+            return
+        value, seconds, peak_rss = src.result()
+        timings[name] = (seconds, peak_rss)
+        future.set_result(value)
+
+    measured.add_done_callback(done)
+    return future
+
+
+def _run_inline(fn: Callable[..., Any], args: tuple) -> Future:
+    future: Future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _submit(pool: Executor, tasks: Dict[str, Task],
+            timings: Optional[Dict[str, Tuple[float, int]]]) -> Dict[str, Future]:
+    futures = {}
+    for name, (fn, args) in tasks.items():
+        try:
+            if timings is None:
+                futures[name] = pool.submit(fn, *args)
+            else:
+                futures[name] = _unwrap(pool.submit(_measured, fn, args), name, timings)
+        except RuntimeError as e:
+            # Пул уже сломан или его только что сбросил другой поток
+            futures[name] = Future()
+            futures[name].set_exception(e if isinstance(e, BrokenProcessPool) else BrokenProcessPool(str(e)))
+    return futures
+
+
+def submit_all(tasks: Dict[str, Task], executor: Optional[Executor] = None,
+               on_done: Optional[Callable[[str, Future], None]] = None,
+               timings: Optional[Dict[str, Tuple[float, int]]] = None) -> Dict[str, Future]:
+    """Запускает независимые задачи параллельно и ждет завершения всех.
+
+    Возвращает словарь futures с теми же ключами; ошибки задач достаются
+    через future.result() как обычные исключения. on_done(name, future)
+    вызывается в вызывающем потоке по мере завершения задач. Если передан
+    timings, в него пишется (секунды, пик RSS) каждой успешной задачи,
+    измеренные там, где она выполнялась.
+
+    Если общий пул сломался (BrokenProcessPool), он пересоздается и задачи,
+    которые из-за этого не выполнились, запускаются еще раз; при повторной
+    поломке их futures содержат BrokenProcessPool.
+    """
+    pool = executor or get_pool()
+    if pool is None:
+        futures = {}
+        for name, (fn, args) in tasks.items():
+            if timings is None:
+                futures[name] = _run_inline(fn, args)
+            else:
+                futures[name] = _unwrap(_run_inline(_measured, (fn, args)), name, timings)
+            if on_done is not None:
+                on_done(name, futures[name])
+        return futures
+    order = list(tasks)
+    # Свой executor вызывающего кода не пересоздаем
+    attempts = 2 if executor is None else 1
+    futures = {}
+    for attempt in range(attempts):
+        batch = _submit(pool, tasks, timings)
+        names = {future: name for name, future in batch.items()}
+        broken = {}
+        for future in as_completed(names):
+            name = names[future]
+            if attempt + 1 < attempts and isinstance(future.exception(), BrokenProcessPool):
+                broken[name] = tasks[name]
+                continue
+            futures[name] = future
+            if on_done is not None:
+                on_done(name, future)
+        if not broken:
+            break
+        print(f"Process pool is broken, retrying {len(broken)} task(s) on a new pool")
+        _reset_pool(pool)
+        pool = get_pool()
+        tasks = broken
+    return {name: futures[name] for name in order}
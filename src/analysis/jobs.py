@@ -0,0 +1,222 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+
+from src import monitoring
+from src.config import settings
+from src.database.db_main import new_session
+from src.database.repositories import ModelsRepository
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Сколько секунд хранить завершенные задачи в памяти
+JOB_TTL = 3600
+# Как часто слать keep-alive подписчикам событий, если ничего не происходит
+EVENTS_KEEPALIVE = 15.0
+# Сколько последних событий хранить на задачу; более старые отбрасываются
+JOB_MAX_EVENTS = 500
+
+
+@dataclass
+class AnalysisJob:
+    id: str
+    user_id: int
+    model_id: int
+    status: str = JOB_QUEUED
+    error: Optional[str] = None
+    report: Optional[dict] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Последние JOB_MAX_EVENTS событий хода анализа по порядку; id события - его номер
+    # начиная с 1, dropped - сколько самых старых событий уже отброшено
+    events: List[dict] = field(default_factory=list)
+    dropped: int = 0
+    _waiters: Set[asyncio.Event] = field(default_factory=set, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def to_dict(self) -> dict:
+        res = {
+            "job_id": self.id,
+            "model_id": self.model_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error is not None:
+            res["error"] = self.error
+        if self.report is not None:
+            res["report"] = self.report
+        return res
+
+
+class JobManager:
+    """Очередь задач анализа.
+
+    Тяжелая работа выполняется в пуле потоков ограниченного размера, чтобы не
+    блокировать event loop; отчет сохраняется через ModelsRepository.update_report.
+    Задачи одной модели идут по очереди: каждая читает отчет, сохраненный
+    предыдущей, и дописывает в него свой результат.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, AnalysisJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Блокировки по модели и число их владельцев: запись исчезает вместе с последним
+        self._model_locks: Dict[int, asyncio.Lock] = {}
+        self._model_holders: Dict[int, int] = {}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+        return self._executor
+
+    def get(self, job_id: str, user_id: int) -> Optional[AnalysisJob]:
+        self._prune()
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    def list_for_model(self, model_id: int, user_id: int) -> List[AnalysisJob]:
+        self._prune()
+        return [j for j in self._jobs.values() if j.model_id == model_id and j.user_id == user_id]
+
+    def submit(self, user_id: int, model_id: int, fn: Callable[..., dict], *args) -> AnalysisJob:
+        """Ставит fn(*args, previous=..., progress=...) в очередь.
+
+        previous - отчет модели, прочитанный из базы непосредственно перед запуском;
+        progress(event, data) публикует события задачи.
+        """
+        self._prune()
+        job = AnalysisJob(id=uuid.uuid4().hex, user_id=user_id, model_id=model_id)
+        self._jobs[job.id] = job
+        self._publish(job, "status", {"status": job.status})
+        self._tasks[job.id] = asyncio.create_task(self._run(job, fn, args))
+        return job
+
+    @asynccontextmanager
+    async def _model_lock(self, model_id: int) -> AsyncIterator[None]:
+        lock = self._model_locks.setdefault(model_id, asyncio.Lock())
+        self._model_holders[model_id] = self._model_holders.get(model_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._model_holders[model_id] -= 1
+            if not self._model_holders[model_id]:
+                del self._model_holders[model_id]
+                del self._model_locks[model_id]
+
+    async def _run(self, job: AnalysisJob, fn: Callable[..., dict], args: tuple):
+        loop = asyncio.get_running_loop()
+
+        def progress(event: str, data: dict):
+            # Вызывается из потока пула: события публикуются в потоке event loop
+            loop.call_soon_threadsafe(self._publish, job, event, data)
+
+        try:
+            # Чтение отчета, дописывание и запись - под блокировкой модели, иначе
+            # параллельные задачи затирают результаты друг друга
+            async with self._model_lock(job.model_id):
+                async with new_session() as session:
+                    model = await ModelsRepository(session).get_owned(job.model_id, job.user_id, "report")
+                if model is None:
+                    raise LookupError("Model not found")
+                report = await loop.run_in_executor(self.executor, self._call, job, fn, args, model.report,
+                                                    progress)
+                faces = report.get("metrics", {}).get("faces")
+                size = monitoring.size_class(faces) if faces is not None else "unknown"
+                with monitoring.STAGE_SECONDS.time(stage="db_write", size_class=size):
+                    async with new_session() as session:
+                        updated = await ModelsRepository(session).update_report(job.model_id, report)
+                if not updated:
+                    raise LookupError("Model not found")
+            job.report = report
+            job.status = JOB_DONE
+            self._publish(job, "report", report)
+        except Exception as e:
+            job.error = str(e)
+            job.status = JOB_FAILED
+            self._publish(job, "error", {"error": job.error})
+        finally:
+            job.finished_at = time.time()
+            self._tasks.pop(job.id, None)
+            self._publish(job, "status", {"status": job.status})
+            # Чистим и без новых submit и чтений: через JOB_TTL задача станет просроченной
+            loop.call_later(JOB_TTL + 1, self._prune)
+
+    def _call(self, job: AnalysisJob, fn: Callable[..., dict], args: tuple, previous: Optional[dict],
+              progress: Callable) -> dict:
+        job.status = JOB_RUNNING
+        job.started_at = time.time()
+        progress("status", {"status": job.status})
+        return fn(*args, previous=previous, progress=progress)
+
+    @staticmethod
+    def _publish(job: AnalysisJob, event: str, data: dict):
+        job.events.append({"id": job.dropped + len(job.events) + 1, "event": event, "data": data})
+        if len(job.events) > JOB_MAX_EVENTS:
+            # Отбрасываются самые старые: итоговые report/error и status всегда последние
+            excess = len(job.events) - JOB_MAX_EVENTS
+            del job.events[:excess]
+            job.dropped += excess
+        for waiter in job._waiters:
+            waiter.set()
+
+    async def events(self, job: AnalysisJob, after: int = 0,
+                     keepalive: float = EVENTS_KEEPALIVE) -> AsyncIterator[Optional[dict]]:
+        """События задачи с номером больше after, пока задача не завершится.
+
+        Если keepalive секунд ничего не происходит, отдает None. Уже отброшенные
+        события (см. JOB_MAX_EVENTS) пропускаются.
+        """
+        last = after
+        while True:
+            while last < job.dropped + len(job.events):
+                event = job.events[max(last - job.dropped, 0)]
+                yield event
+                last = event["id"]
+            if job.finished:
+                return
+            waiter = asyncio.Event()
+            job._waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield None
+            finally:
+                job._waiters.discard(waiter)
+
+    def _prune(self):
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.finished_at > JOB_TTL
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+job_manager = JobManager(max_workers=settings.ANALYSIS_WORKERS)
@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Увеличивать при изменении состава или формата массивов
+MESH_CACHE_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+ARRAYS = ("vertices", "faces", "uv", "area_3d")
+
+
+def cache_dir(path: str, content_hash: Optional[str] = None) -> str:
+    """Каталог кэша для модели.
+
+    С content_hash кэш лежит рядом с blob и общий для всех моделей с тем же
+    содержимым; без него (старые модели) - рядом с файлом модели.
+    """
+    if content_hash:
+        # Настройки приложения нужны только здесь: mesh_utils и бенчмарки импортируются и без них
+        from src.config import settings
+        return os.path.join(settings.BLOB_STORE_DIR, content_hash[:2], f"{content_hash}.mesh")
+    return f"{path}.mesh"
+
+
+def _source_stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def save(path: str, geometries: List[Dict[str, Optional[np.ndarray]]], content_hash: Optional[str] = None):
+    """Пишет массивы геометрий модели в виде .npy файлов и manifest.json.
+
+    geometries - список словарей с ключами из ARRAYS (uv может быть None).
+    Каталог собирается во временном и подменяет старый целиком.
+    """
+    out_dir = cache_dir(path, content_hash)
+    os.makedirs(os.path.dirname(out_dir) or ".", exist_ok=True)
+    tmp_dir = f"{out_dir}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_dir)
+    try:
+        entries = []
+        for i, geom in enumerate(geometries):
+            files = {}
+            for name in ARRAYS:
+                arr = geom.get(name)
+                if arr is None:
+                    continue
+                filename = f"{i}_{name}.npy"
+                np.save(os.path.join(tmp_dir, filename), np.ascontiguousarray(arr))
+                files[name] = filename
+            entries.append(files)
+        manifest = {
+            "version": MESH_CACHE_VERSION,
+            "source": _source_stamp(path),
+            "geometries": entries,
+        }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp_dir, out_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def load(path: str, content_hash: Optional[str] = None) -> Optional[List[Dict[str, Optional[np.ndarray]]]]:
+    """Открывает кэш модели через mmap, без копирования данных.
+
+    Возвращает None, если кэша нет, он другой версии или файл модели изменился.
+    """
+    in_dir = cache_dir(path, content_hash)
+    try:
+        with open(os.path.join(in_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MESH_CACHE_VERSION or manifest.get("source") != _source_stamp(path):
+            return None
+        geometries = []
+        for files in manifest["geometries"]:
+            geom = {name: None for name in ARRAYS}
+            for name, filename in files.items():
+                geom[name] = np.load(os.path.join(in_dir, filename), mmap_mode="r")
+            geometries.append(geom)
+        return geometries
+    except (OSError, ValueError, KeyError):
+        return None
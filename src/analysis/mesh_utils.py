@@ -1,12 +1,25 @@
 import os
+import uuid
+from functools import cached_property
 from typing import Tuple, List, Dict
 import numpy as np
 import trimesh
-from shapely.geometry import Polygon
-from shapely.ops import unary_union
+
+from src.analysis import colormap, winding, uv_raster, uv_overlap, uv_svg, uv_tiles, mesh_cache
 
 UPLOAD_ROOT = "models"
 
+# В режиме auto точный расчет перекрытий UV используется только для небольших мешей,
+# для остальных - растровая оценка с этим разрешением. На синтетических моделях
+# (benchmarks.synthetic, 1 ядро) точный расчет до 50k граней быстрее растра 2048:
+# сетка 50k - 0.6 с против 0.9 с, на 100k уже примерно поровну (1.1 с против 1.0 с)
+UV_OVERLAP_EXACT_MAX_FACES = 50000
+UV_OVERLAP_RESOLUTION = 2048
+# Бюджет пар-кандидатов точного расчета (около 0.8 мкс на пару, то есть ~1.6 с).
+# Сложенные или повторяющиеся развертки дают квадратичное число пар: сверх бюджета - растр
+UV_OVERLAP_MAX_PAIRS = 2_000_000
+UV_OVERLAP_METHODS = ("auto", "exact", "raster")
+
 def get_model_dir(user_id: int, stored_name: str) -> str:
     return os.path.join(UPLOAD_ROOT, str(user_id), stored_name)
 
@@ -23,7 +36,9 @@ def get_model_variant_path(user_id: int, stored_name: str, variant_name: str) ->
     return os.path.join(base_dir, variant_name)
 
 def load_mesh(path: str) -> trimesh.Trimesh:
-    obj = trimesh.load(path, force="scene", skip_materials=False)
+    return _merge_geometry(load_mesh_raw(path))
+
+def _merge_geometry(obj) -> trimesh.Trimesh:
     if isinstance(obj, trimesh.Trimesh):
         return obj
     if hasattr(obj, "geometry"):
@@ -41,8 +56,9 @@ def load_mesh(path: str) -> trimesh.Trimesh:
     raise ValueError("unsupported_format")
 
 def compute_metrics(mesh: trimesh.Trimesh) -> Tuple[int, float]:
-    faces = int(mesh.faces.shape[0])
-    area = float(mesh.area)
+    geom = _as_geometry(mesh)
+    faces = int(geom.mesh.faces.shape[0])
+    area = float(np.sum(geom.area_3d))
     density = float(np.inf) if area <= 1e-12 else faces / area
     return faces, density
 
@@ -51,31 +67,16 @@ def recolor_mesh_red(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
     return mesh
 
 def fix_and_color_inverted_polygons(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
-    working_mesh = mesh.copy()
+    working_mesh = _as_geometry(mesh).mesh.copy()
     working_mesh.visual = trimesh.visual.ColorVisuals(mesh=working_mesh)
     working_mesh.merge_vertices()
 
-    old_face_data = {}
-    for i, face in enumerate(working_mesh.faces):
-        key = tuple(sorted(face))
-        old_face_data[key] = working_mesh.face_normals[i].copy()
+    v = working_mesh.vertices.view(np.ndarray)
+    old_faces = working_mesh.faces.view(np.ndarray)
+    old_normals = working_mesh.face_normals.view(np.ndarray)
 
-    trimesh.repair.fix_winding(working_mesh)
-    trimesh.repair.fix_normals(working_mesh)
-
-    v = working_mesh.vertices
-    f = working_mesh.faces
-    new_face_normals = working_mesh.face_normals
-
-    red_mask = np.zeros(len(f), dtype=bool)
-    for i, face in enumerate(f):
-        key = tuple(sorted(face))
-        if key in old_face_data:
-            old_normal = old_face_data[key]
-            new_normal = new_face_normals[i]
-            dot = np.dot(old_normal, new_normal)
-            if dot < -0.5:
-                red_mask[i] = True
+    f, flips = winding.orient_faces(v, old_faces)
+    red_mask = winding.inverted_face_mask(old_faces, old_normals, flips)
 
     new_vertices = v[f].reshape(-1, 3)
     new_faces = np.arange(len(f) * 3, dtype=np.int64).reshape(-1, 3)
@@ -93,32 +94,31 @@ def fix_and_color_inverted_polygons(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
     return result
 
 def save_mesh(mesh: trimesh.Trimesh, path: str):
-    mesh.export(path)
+    # Как и SVG: файл может быть жесткой ссылкой на запись кэша результатов, поэтому подменяем его
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        mesh.export(tmp, file_type=os.path.splitext(path)[1].lstrip("."))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def save_recolored_mesh(mesh: trimesh.Trimesh, path: str):
+    save_mesh(fix_and_color_inverted_polygons(mesh), path)
+
+def save_density_mesh(mesh: trimesh.Trimesh, path: str):
+    save_mesh(color_by_face_density(mesh), path)
 
 def color_by_face_density(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
-    m = mesh.copy()
-    areas = getattr(m, "area_faces", None)
-    if areas is None:
-        tri = m.triangles
-        areas = trimesh.triangles.area(tri)
+    geom = _as_geometry(mesh)
+    m = geom.mesh
+    areas = geom.area_3d
     x = np.log(areas + 1e-12)
     med = float(np.median(x))
     mad = float(np.median(np.abs(x - med))) + 1e-6
     d = (x - med) / (2.0 * mad)
-    d = np.clip(d, -1.0, 1.0)
-    base = np.array([180, 180, 180, 255], dtype=np.uint8)
-    red = np.array([255, 0, 0, 255], dtype=np.uint8)
-    blue = np.array([0, 64, 255, 255], dtype=np.uint8)
-    face_colors = np.zeros((len(d), 4), dtype=np.uint8)
-    for i, val in enumerate(d):
-        if val < 0:
-            t = -val
-            face_colors[i] = (base * (1 - t) + red * t).astype(np.uint8)
-        elif val > 0:
-            t = val
-            face_colors[i] = (base * (1 - t) + blue * t).astype(np.uint8)
-        else:
-            face_colors[i] = base
+    face_colors = colormap.diverging(d, "face_density")
     v = m.vertices
     f = m.faces
     new_vertices = v[f].reshape(-1, 3)
@@ -161,448 +161,280 @@ def _extract_uv(mesh: trimesh.Trimesh) -> np.ndarray | None:
         return None
     return arr[:, :2]
 
+def _uv_faces(mesh: trimesh.Trimesh, uv: np.ndarray | None) -> np.ndarray | None:
+    if uv is None:
+        return None
+    faces = mesh.faces
+    if uv.shape[0] == mesh.vertices.shape[0]:
+        return uv[faces]
+    if uv.shape[0] == faces.shape[0] * 3:
+        return uv.reshape((-1, 3, 2))
+    return None
+
+def _triangle_area_2d(uv_faces: np.ndarray) -> np.ndarray:
+    u = uv_faces[:, :, 0]
+    v = uv_faces[:, :, 1]
+    return 0.5 * np.abs(
+        u[:, 0] * (v[:, 1] - v[:, 2]) +
+        u[:, 1] * (v[:, 2] - v[:, 0]) +
+        u[:, 2] * (v[:, 0] - v[:, 1])
+    )
+
+class GeometryData:
+    """Одна геометрия сцены и производные массивы, посчитанные не более одного раза."""
+
+    def __init__(self, mesh: trimesh.Trimesh):
+        self.mesh = mesh
+        self._coverage: Dict[int, uv_raster.Coverage] = {}
+
+    @classmethod
+    def from_arrays(cls, vertices: np.ndarray, faces: np.ndarray, uv: np.ndarray | None,
+                    area_3d: np.ndarray | None) -> "GeometryData":
+        """Геометрия из готовых массивов (например, из mesh_cache), без разбора файла."""
+        geom = cls(trimesh.Trimesh(vertices=vertices, faces=faces, process=False, validate=False))
+        geom.__dict__["uv"] = uv
+        if area_3d is not None:
+            geom.__dict__["area_3d"] = area_3d
+        return geom
+
+    @cached_property
+    def uv(self) -> np.ndarray | None:
+        return _extract_uv(self.mesh)
+
+    @cached_property
+    def uv_faces(self) -> np.ndarray | None:
+        return _uv_faces(self.mesh, self.uv)
+
+    @cached_property
+    def area_uv(self) -> np.ndarray | None:
+        if self.uv_faces is None:
+            return None
+        return _triangle_area_2d(self.uv_faces)
+
+    @cached_property
+    def area_3d(self) -> np.ndarray:
+        return np.asarray(self.mesh.area_faces)
+
+    @cached_property
+    def uv_overlaps(self) -> uv_overlap.OverlapPairs | None:
+        """Пары перекрывающихся UV треугольников: общий источник и для доли, и для цветов.
+
+        None - нет UV или пар-кандидатов больше UV_OVERLAP_MAX_PAIRS.
+        """
+        if self.uv_faces is None:
+            return None
+        return _find_overlaps(self.uv_faces)
+
+    def uv_coverage(self, resolution: int) -> uv_raster.Coverage | None:
+        if self.uv_faces is None:
+            return None
+        if resolution not in self._coverage:
+            self._coverage[resolution] = uv_raster.uv_coverage(self.uv_faces, resolution)
+        return self._coverage[resolution]
+
+    def overlap_method(self, method: str) -> str:
+        if method not in UV_OVERLAP_METHODS:
+            raise ValueError(f"unknown_overlap_method: {method}")
+        if method == "auto":
+            n_faces = 0 if self.uv_faces is None else len(self.uv_faces)
+            method = "exact" if n_faces <= UV_OVERLAP_EXACT_MAX_FACES else "raster"
+        # Точный расчет сверх бюджета пар заменяется растровой оценкой
+        if method == "exact" and self.uv_faces is not None and self.uv_overlaps is None:
+            return "raster"
+        return method
+
+def _find_overlaps(uv_faces: np.ndarray) -> uv_overlap.OverlapPairs | None:
+    try:
+        return uv_overlap.find_overlaps(uv_faces, max_pairs=UV_OVERLAP_MAX_PAIRS)
+    except uv_overlap.TooManyPairs:
+        return None
+
+# Ключ GeometryData во внутреннем кэше trimesh: он сбрасывается при изменении вершин или граней
+_GEOMETRY_CACHE_KEY = "mesh_utils_geometry"
+
+def _as_geometry(mesh) -> GeometryData:
+    """GeometryData для меша; для trimesh - одна и та же между вызовами.
+
+    Так доля и цвета перекрытий для одного trimesh считаются один раз, а
+    массивы живут ровно столько, сколько сам меш.
+    """
+    if isinstance(mesh, GeometryData):
+        return mesh
+    geom = mesh._cache[_GEOMETRY_CACHE_KEY]
+    if geom is None or geom.mesh is not mesh:
+        geom = GeometryData(mesh)
+        mesh._cache[_GEOMETRY_CACHE_KEY] = geom
+    return geom
+
 def has_uv(mesh: trimesh.Trimesh) -> bool:
-    uv = _extract_uv(mesh)
+    uv = _as_geometry(mesh).uv
     return uv is not None and uv.shape[0] >= 3
 
-def generate_uv_svg(mesh: trimesh.Trimesh, size: int = 1024, stroke: int = 1, face_colors: np.ndarray = None) -> str:
-    uv = _extract_uv(mesh)
-    if uv is None:
+def _checked_uv_faces(mesh) -> np.ndarray:
+    geom = _as_geometry(mesh)
+    if geom.uv is None:
         raise ValueError("no_uv")
-    f = mesh.faces
-    n_verts = mesh.vertices.shape[0]
-    n_faces = f.shape[0]
-    n_corners = n_faces * 3
-    n_uv = uv.shape[0]
-    if n_uv == n_verts:
-        uvf = uv[f]
-    elif n_uv == n_corners:
-        uvf = uv.reshape((-1, 3, 2))
-    else:
+    if geom.uv_faces is None:
         raise ValueError("uv_mismatch")
-    u = uvf[..., 0]
-    v = uvf[..., 1]
-    finite = np.isfinite(u) & np.isfinite(v)
-    mask = finite.all(axis=1)
-    uvf = uvf[mask]
-    
-    # Также фильтруем цвета, если они есть
-    current_face_colors = face_colors[mask] if face_colors is not None else None
-    
-    if uvf.shape[0] == 0:
-        raise ValueError("no_uv")
-    mins = uvf.min(axis=(0, 1))
-    maxs = uvf.max(axis=(0, 1))
-    span = maxs - mins
-    span[span == 0] = 1.0
-    norm = (uvf - mins) / span
-    w = float(size)
-    h = float(size)
-    pts = norm.copy()
-    pts[..., 0] = pts[..., 0] * (w - 2.0) + 1.0
-    pts[..., 1] = (1.0 - pts[..., 1]) * (h - 2.0) + 1.0
-    header = f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">'
-    bg = f'<rect x="0" y="0" width="{size}" height="{size}" fill="#111"/>'
-    lines = []
-    
-    for i, tri in enumerate(pts):
-        x1, y1 = tri[0]
-        x2, y2 = tri[1]
-        x3, y3 = tri[2]
-        
-        fill = "none"
-        if current_face_colors is not None:
-            c = current_face_colors[i]
-            # Предполагаем, что c - это [R, G, B] или [R, G, B, A]
-            fill = f"rgb({int(c[0])},{int(c[1])},{int(c[2])})"
-            if len(c) > 3:
-                fill = f"rgba({int(c[0])},{int(c[1])},{int(c[2])},{c[3]/255.0:.2f})"
-        
-        path = f'<path d="M {x1:.2f} {y1:.2f} L {x2:.2f} {y2:.2f} L {x3:.2f} {y3:.2f} Z" stroke="#33d17a" stroke-width="{stroke}" fill="{fill}"/>'
-        lines.append(path)
-    grid = []
-    for i in range(11):
-        t = i / 10.0
-        gx = t * (w - 2.0) + 1.0
-        gy = t * (h - 2.0) + 1.0
-        grid.append(f'<line x1="{gx:.2f}" y1="1" x2="{gx:.2f}" y2="{h-1:.2f}" stroke="#333" stroke-width="1"/>')
-        grid.append(f'<line x1="1" y1="{gy:.2f}" x2="{w-1:.2f}" y2="{gy:.2f}" stroke="#333" stroke-width="1"/>')
-    content = header + bg + "".join(grid) + "".join(lines) + "</svg>"
-    return content
+    return geom.uv_faces
+
+def generate_uv_svg(mesh: trimesh.Trimesh, size: int = 1024, stroke: int = 1, face_colors: np.ndarray = None) -> str:
+    return uv_svg.render_uv_svg(_checked_uv_faces(mesh), face_colors, size, stroke)
 
 def save_uv_svg(mesh: trimesh.Trimesh, path: str, size: int = 1024, stroke: int = 1):
-    svg = generate_uv_svg(mesh, size=size, stroke=stroke)
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(svg)
+    uv_svg.save_uv_svg(path, _checked_uv_faces(mesh), None, size, stroke)
 
-def get_uv_overlap_colors(mesh: trimesh.Trimesh) -> np.ndarray:
+def get_uv_overlap_colors(mesh: trimesh.Trimesh, method: str = "auto", resolution: int = UV_OVERLAP_RESOLUTION) -> np.ndarray:
     """Возвращает цвета граней для визуализации перекрытий."""
-    uv = _extract_uv(mesh)
-    if uv is None:
+    geom = _as_geometry(mesh)
+    uv_faces = geom.uv_faces
+    if uv_faces is None:
         return None
-    
-    faces = mesh.faces
-    if uv.shape[0] == mesh.vertices.shape[0]:
-        uv_faces = uv[faces]
-    else:
-        uv_faces = uv.reshape((-1, 3, 2))
-        if uv_faces.shape[0] != faces.shape[0]:
-            return None
 
-    polygons = []
-    for f_uv in uv_faces:
-        try:
-            poly = Polygon(f_uv)
-            if not poly.is_valid:
-                poly = poly.buffer(0)
-            polygons.append(poly)
-        except:
-            polygons.append(Polygon())
-
-    n = len(polygons)
-    # По умолчанию серый
-    colors = np.full((n, 4), [100, 100, 100, 100], dtype=np.uint8)
-    
-    # Очень простой поиск пересечений: для каждой грани проверяем пересечение с объединением остальных
-    # Но это медленно O(N^2). Для визуализации лучше использовать дерево индексов.
-    from shapely.strtree import STRtree
-    tree = STRtree(polygons)
-    
-    for i, poly in enumerate(polygons):
-        if poly.is_empty or poly.area < 1e-12:
-            continue
-            
-        # Находим всех кандидатов
-        indices = tree.query(poly)
-        for idx in indices:
-            if idx == i:
-                continue
-            
-            other = polygons[idx]
-            if other.is_empty:
-                continue
-                
-            # Если есть значимое пересечение
-            if poly.intersects(other):
-                inter = poly.intersection(other)
-                if inter.area > 1e-12:
-                    colors[i] = [255, 0, 0, 200] # Красный для перекрытий
-                    break
-                    
+    if geom.overlap_method(method) == "raster":
+        coverage = geom.uv_coverage(resolution)
+        colors = np.full((len(uv_faces), 4), [100, 100, 100, 100], dtype=np.uint8)
+        colors[coverage.face_overlap] = [255, 0, 0, 200]
+        return colors
+
+    colors = np.full((len(uv_faces), 4), [100, 100, 100, 100], dtype=np.uint8)
+    colors[uv_overlap.face_overlap_mask(len(uv_faces), geom.uv_overlaps)] = [255, 0, 0, 200] # Красный для перекрытий
     return colors
 
 def get_uv_distortion_colors(mesh: trimesh.Trimesh) -> np.ndarray:
     """Возвращает цвета граней для визуализации искажений."""
-    uv = _extract_uv(mesh)
-    if uv is None:
+    geom = _as_geometry(mesh)
+    if geom.area_uv is None:
         return None
-        
-    faces = mesh.faces
-    area_3d = mesh.area_faces
-    
-    if uv.shape[0] == mesh.vertices.shape[0]:
-        uv_faces = uv[faces]
-    else:
-        uv_faces = uv.reshape((-1, 3, 2))
-        
-    u = uv_faces[:, :, 0]
-    v = uv_faces[:, :, 1]
-    area_uv = 0.5 * np.abs(u[:,0]*(v[:,1]-v[:,2]) + u[:,1]*(v[:,2]-v[:,0]) + u[:,2]*(v[:,0]-v[:,1]))
-    
+
+    area_3d = geom.area_3d
+    area_uv = geom.area_uv
+    n_faces = len(area_3d)
+
     valid = area_3d > 1e-12
-    ratios = np.ones(len(faces))
-    
+    ratios = np.ones(n_faces)
+
     sum_3d = np.sum(area_3d[valid])
     sum_uv = np.sum(area_uv[valid])
-    
+
     if sum_uv > 1e-12 and sum_3d > 1e-12:
         ratios[valid] = (area_uv[valid] / sum_uv) / (area_3d[valid] / sum_3d)
-    
+
     # Логарифмическое искажение
     dist = np.abs(np.log(np.clip(ratios, 0.1, 10.0)))
     dist_norm = np.clip(dist / np.log(2.0), 0, 1) # 0 - нет искажения, 1 - 2x искажение и выше
-    
-    colors = np.zeros((len(faces), 4), dtype=np.uint8)
-    base = np.array([180, 180, 180, 150], dtype=np.uint8)
-    red = np.array([255, 0, 0, 200], dtype=np.uint8)
-    
-    for i in range(len(faces)):
-        t = dist_norm[i]
-        colors[i] = (base * (1 - t) + red * t).astype(np.uint8)
-        
-    return colors
+
+    return colormap.sequential(dist_norm, "uv_distortion")
 
 def get_uv_texel_density_colors(mesh: trimesh.Trimesh, resolution: int = 1024) -> np.ndarray:
     """Возвращает цвета граней для визуализации плотности текселей."""
-    uv = _extract_uv(mesh)
-    if uv is None:
+    geom = _as_geometry(mesh)
+    if geom.area_uv is None:
         return None
-        
-    faces = mesh.faces
-    area_3d = mesh.area_faces
-    
-    if uv.shape[0] == mesh.vertices.shape[0]:
-        uv_faces = uv[faces]
-    else:
-        uv_faces = uv.reshape((-1, 3, 2))
-        
-    u = uv_faces[:, :, 0]
-    v = uv_faces[:, :, 1]
-    area_uv = 0.5 * np.abs(u[:,0]*(v[:,1]-v[:,2]) + u[:,1]*(v[:,2]-v[:,0]) + u[:,2]*(v[:,0]-v[:,1]))
-    
+
+    area_3d = geom.area_3d
+    area_uv = geom.area_uv
+    n_faces = len(area_3d)
+
     total_pixels = resolution * resolution
-    densities_sq = np.zeros(len(faces))
+    densities_sq = np.zeros(n_faces)
     valid = area_3d > 1e-12
     densities_sq[valid] = (total_pixels * area_uv[valid]) / area_3d[valid]
     densities = np.sqrt(np.clip(densities_sq, 0, None))
-    
+
     if len(densities[valid]) == 0:
-        return np.full((len(faces), 4), [180, 180, 180, 150], dtype=np.uint8)
-        
+        return np.full((n_faces, 4), [180, 180, 180, 150], dtype=np.uint8)
+
     avg = np.mean(densities[valid])
     if avg < 1e-6:
-        return np.full((len(faces), 4), [180, 180, 180, 150], dtype=np.uint8)
-        
+        return np.full((n_faces, 4), [180, 180, 180, 150], dtype=np.uint8)
+
     # Отклонение от среднего
     diff = (densities - avg) / (avg + 1e-6)
     diff = np.clip(diff, -1.0, 1.0)
-    
-    colors = np.zeros((len(faces), 4), dtype=np.uint8)
-    base = np.array([180, 180, 180, 150], dtype=np.uint8)
-    red = np.array([255, 0, 0, 200], dtype=np.uint8)
-    blue = np.array([0, 64, 255, 200], dtype=np.uint8)
-    
-    for i in range(len(faces)):
-        val = diff[i]
-        if val < 0:
-            t = -val
-            colors[i] = (base * (1 - t) + red * t).astype(np.uint8)
-        elif val > 0:
-            t = val
-            colors[i] = (base * (1 - t) + blue * t).astype(np.uint8)
-        else:
-            colors[i] = base
-            
-    return colors
 
-def generate_uv_svg_from_path(path: str, size: int = 1024, stroke: int = 1, mode: str = "original") -> str:
-    obj = trimesh.load(path, force="scene", skip_materials=False)
-    tris = []
-    colors_list = []
-    
-    def process_geom(g):
-        uv = _extract_uv(g)
-        if uv is None:
-            return None, None
-        
-        f = g.faces
-        n_verts = g.vertices.shape[0]
-        n_faces = f.shape[0]
-        n_corners = n_faces * 3
-        n_uv = uv.shape[0]
-        
-        if n_uv == n_verts:
-            uvf = uv[f]
-        elif n_uv == n_corners:
-            uvf = uv.reshape((-1, 3, 2))
-        else:
-            return None, None
-            
-        colors = None
-        if mode == "overlap":
-            colors = get_uv_overlap_colors(g)
-        elif mode == "distortion":
-            colors = get_uv_distortion_colors(g)
-        elif mode == "texel_density":
-            colors = get_uv_texel_density_colors(g)
-            
-        return uvf, colors
+    return colormap.diverging(diff, "texel_density")
 
-    if isinstance(obj, trimesh.Trimesh):
-        uvf, colors = process_geom(obj)
-        if uvf is not None:
-            tris.append(uvf)
-            if colors is not None:
-                colors_list.append(colors)
-    elif hasattr(obj, "geometry"):
-        for g in obj.geometry.values():
-            if not isinstance(g, trimesh.Trimesh):
-                continue
-            uvf, colors = process_geom(g)
-            if uvf is not None:
-                tris.append(uvf)
-                if colors is not None:
-                    colors_list.append(colors)
-    else:
-        raise ValueError("unsupported_format")
-        
-    if not tris:
-        raise ValueError("no_uv")
-        
-    all_tris = np.concatenate(tris, axis=0)
-    all_colors = np.concatenate(colors_list, axis=0) if colors_list else None
-    
-    # Фильтрация по маске конечных координат (как в оригинале)
-    u = all_tris[..., 0]
-    v = all_tris[..., 1]
-    finite = np.isfinite(u) & np.isfinite(v)
-    mask = finite.all(axis=1)
-    
-    filtered_tris = all_tris[mask]
-    filtered_colors = all_colors[mask] if all_colors is not None else None
-    
-    if filtered_tris.shape[0] == 0:
-        raise ValueError("no_uv")
-        
-    # Нормализация и создание SVG (вызываем базовую функцию, но передаем подготовленные данные)
-    # Но generate_uv_svg ожидает меш. Чтобы не создавать фейковый меш, я просто скопирую логику отрисовки.
-    
-    mins = filtered_tris.min(axis=(0, 1))
-    maxs = filtered_tris.max(axis=(0, 1))
-    span = maxs - mins
-    span[span == 0] = 1.0
-    norm = (filtered_tris - mins) / span
-    
-    w = float(size)
-    h = float(size)
-    pts = norm.copy()
-    pts[..., 0] = pts[..., 0] * (w - 2.0) + 1.0
-    pts[..., 1] = (1.0 - pts[..., 1]) * (h - 2.0) + 1.0
-    
-    header = f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">'
-    bg = f'<rect x="0" y="0" width="{size}" height="{size}" fill="#111"/>'
-    lines = []
-    
-    for i, tri in enumerate(pts):
-        x1, y1 = tri[0]
-        x2, y2 = tri[1]
-        x3, y3 = tri[2]
-        
-        fill = "none"
-        if filtered_colors is not None:
-            c = filtered_colors[i]
-            fill = f"rgb({int(c[0])},{int(c[1])},{int(c[2])})"
-            if len(c) > 3:
-                fill = f"rgba({int(c[0])},{int(c[1])},{int(c[2])},{c[3]/255.0:.2f})"
-        
-        path = f'<path d="M {x1:.2f} {y1:.2f} L {x2:.2f} {y2:.2f} L {x3:.2f} {y3:.2f} Z" stroke="#33d17a" stroke-width="{stroke}" fill="{fill}"/>'
-        lines.append(path)
-        
-    grid = []
-    for i in range(11):
-        t = i / 10.0
-        gx = t * (w - 2.0) + 1.0
-        gy = t * (h - 2.0) + 1.0
-        grid.append(f'<line x1="{gx:.2f}" y1="1" x2="{gx:.2f}" y2="{h-1:.2f}" stroke="#333" stroke-width="1"/>')
-        grid.append(f'<line x1="1" y1="{gy:.2f}" x2="{w-1:.2f}" y2="{gy:.2f}" stroke="#333" stroke-width="1"/>')
-        
-    return header + bg + "".join(grid) + "".join(lines) + "</svg>"
+def generate_uv_svg_from_path(path: str, size: int = 1024, stroke: int = 1, mode: str = "original") -> str:
+    return AnalysisContext(path).uv_svg(size=size, stroke=stroke, mode=mode)
 
 def save_uv_svg_from_path(path: str, out_path: str, size: int = 1024, stroke: int = 1, mode: str = "original") -> bool:
     try:
-        svg = generate_uv_svg_from_path(path, size=size, stroke=stroke, mode=mode)
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(svg)
-        return True
+        ctx = AnalysisContext(path)
     except Exception as e:
         print(f"UV SVG Error (mode {mode}): {e}")
         return False
+    return ctx.save_uv_svg(out_path, size=size, stroke=stroke, mode=mode)
 
-def compute_uv_overlap(mesh: trimesh.Trimesh) -> float:
-    uv = _extract_uv(mesh)
-    if uv is None:
-        return 0.0
-    
-    faces = mesh.faces
-    if uv.shape[0] == mesh.vertices.shape[0]:
-        uv_faces = uv[faces]
-    else:
-        uv_faces = uv.reshape((-1, 3, 2))
-        if uv_faces.shape[0] != faces.shape[0]:
-            return 0.0
-
-    polygons = []
-    for f_uv in uv_faces:
-        try:
-            poly = Polygon(f_uv)
-            if poly.is_valid and poly.area > 1e-9:
-                polygons.append(poly)
-        except:
-            continue
+def save_uv_tiles_from_path(path: str, out_dir: str, mode: str = "original", max_zoom: int = uv_tiles.MAX_ZOOM) -> bool:
+    try:
+        ctx = AnalysisContext(path)
+    except Exception as e:
+        print(f"UV tiles Error (mode {mode}): {e}")
+        return False
+    return ctx.save_uv_tiles(out_dir, mode=mode, max_zoom=max_zoom)
 
-    if not polygons:
+def compute_uv_overlap(mesh: trimesh.Trimesh, method: str = "auto", resolution: int = UV_OVERLAP_RESOLUTION) -> float:
+    geom = _as_geometry(mesh)
+    uv_faces = geom.uv_faces
+    if uv_faces is None:
         return 0.0
-    
-    try:
-        # Суммарная площадь всех полигонов (с учетом наложений)
-        total_area = sum(p.area for p in polygons)
-        if total_area < 1e-12:
-            return 0.0
 
-        # Площадь объединения (без наложений)
-        union_poly = unary_union(polygons)
-        union_area = union_poly.area
+    if geom.overlap_method(method) == "raster":
+        return float(geom.uv_coverage(resolution).overlap_ratio)
 
-        overlap_ratio = max(0.0, (total_area - union_area) / total_area)
-        return float(overlap_ratio)
-    except Exception as e:
-        print(f"Overlap calculation error: {e}")
-        return 0.0
+    return uv_overlap.overlap_ratio(uv_faces, geom.uv_overlaps)
 
 def load_mesh_raw(path: str):
     return trimesh.load(path, force="scene", skip_materials=False)
 
+def write_mesh_cache(path: str, content_hash: str | None = None):
+    """Разбирает модель и сохраняет массивы ее геометрий в бинарный кэш.
+
+    Если кэш blob с тем же содержимым уже построен, модель заново не разбирается.
+    """
+    if content_hash and mesh_cache.load(path, content_hash) is not None:
+        return
+    save_mesh_cache(AnalysisContext(path, use_mesh_cache=False, content_hash=content_hash))
+
+
+def save_mesh_cache(ctx: "AnalysisContext"):
+    """Сохраняет массивы уже разобранной модели в бинарный кэш."""
+    mesh_cache.save(ctx.path, [
+        {
+            "vertices": geom.mesh.vertices.view(np.ndarray),
+            "faces": geom.mesh.faces.view(np.ndarray),
+            "uv": geom.uv,
+            "area_3d": geom.area_3d,
+        }
+        for geom in ctx.geometries
+    ], ctx.content_hash)
+
 def compute_uv_overlap_from_path(path: str) -> float:
     try:
-        obj = load_mesh_raw(path)
-        if isinstance(obj, trimesh.Scene):
-            max_overlap = 0.0
-            for g in obj.geometry.values():
-                if isinstance(g, trimesh.Trimesh):
-                    overlap = compute_uv_overlap(g)
-                    max_overlap = max(max_overlap, overlap)
-            return max_overlap
-        else:
-            return compute_uv_overlap(obj)
+        return AnalysisContext(path).uv_overlap()
     except Exception as e:
         print(f"Overlap error: {e}")
         return 0.0
 
 def compute_uv_distortion(mesh: trimesh.Trimesh) -> float:
-    uv = _extract_uv(mesh)
-    if uv is None:
+    geom = _as_geometry(mesh)
+    if geom.area_uv is None:
         return 0.0
 
-    faces = mesh.faces
-    vertices = mesh.vertices
-    
-    if uv.shape[0] == vertices.shape[0]:
-        uv_faces = uv[faces]
-    else:
-        uv_faces = uv.reshape((-1, 3, 2))
-        if uv_faces.shape[0] != faces.shape[0]:
-            return 0.0
-
-    area_3d = mesh.area_faces
-
-    u = uv_faces[:, :, 0]
-    v = uv_faces[:, :, 1]
-    area_uv = 0.5 * np.abs(
-        u[:, 0] * (v[:, 1] - v[:, 2]) + 
-        u[:, 1] * (v[:, 2] - v[:, 0]) + 
-        u[:, 2] * (v[:, 0] - v[:, 1])
-    )
+    area_3d = geom.area_3d
+    area_uv = geom.area_uv
 
     valid_mask = area_3d > 1e-12
     if not np.any(valid_mask):
         return 0.0
-    
+
     area_3d = area_3d[valid_mask]
     area_uv = area_uv[valid_mask]
 
     sum_3d = np.sum(area_3d)
     sum_uv = np.sum(area_uv)
-    
+
     if sum_uv < 1e-12:
         return 1.0
 
@@ -614,54 +446,28 @@ def compute_uv_distortion(mesh: trimesh.Trimesh) -> float:
     distortions = np.abs(np.log(np.clip(ratios, 1e-5, 1e5)))
 
     mean_distortion = np.average(distortions, weights=area_3d)
-    
+
     return float(mean_distortion)
 
 def compute_uv_distortion_from_path(path: str) -> float:
     try:
-        obj = load_mesh_raw(path)
-        if isinstance(obj, trimesh.Scene):
-            max_dist = 0.0
-            for g in obj.geometry.values():
-                if isinstance(g, trimesh.Trimesh):
-                    dist = compute_uv_distortion(g)
-                    max_dist = max(max_dist, dist)
-            return max_dist
-        else:
-            return compute_uv_distortion(obj)
+        return AnalysisContext(path).uv_distortion()
     except Exception as e:
         print(f"Distortion error: {e}")
         return 0.0
 
 def compute_texel_density(mesh: trimesh.Trimesh, resolution: int = 1024) -> Dict[str, float]:
-    uv = _extract_uv(mesh)
-    if uv is None:
+    geom = _as_geometry(mesh)
+    if geom.area_uv is None:
         return {"avg_density": 0.0, "uniformity": 0.0}
 
-    faces = mesh.faces
-    vertices = mesh.vertices
-    
-    if uv.shape[0] == vertices.shape[0]:
-        uv_faces = uv[faces]
-    else:
-        uv_faces = uv.reshape((-1, 3, 2))
-        if uv_faces.shape[0] != faces.shape[0]:
-            return {"avg_density": 0.0, "uniformity": 0.0}
-
-    area_3d = mesh.area_faces
-
-    u = uv_faces[:, :, 0]
-    v = uv_faces[:, :, 1]
-    area_uv = 0.5 * np.abs(
-        u[:, 0] * (v[:, 1] - v[:, 2]) + 
-        u[:, 1] * (v[:, 2] - v[:, 0]) + 
-        u[:, 2] * (v[:, 0] - v[:, 1])
-    )
+    area_3d = geom.area_3d
+    area_uv = geom.area_uv
 
     valid_mask = area_3d > 1e-12
     if not np.any(valid_mask):
         return {"avg_density": 0.0, "uniformity": 0.0}
-    
+
     area_3d = area_3d[valid_mask]
     area_uv = area_uv[valid_mask]
 
@@ -669,12 +475,12 @@ def compute_texel_density(mesh: trimesh.Trimesh, resolution: int = 1024) -> Dict
     densities_sq = (total_pixels * area_uv) / area_3d
 
     densities = np.sqrt(np.clip(densities_sq, 0, None))
-    
+
     avg_density = np.average(densities, weights=area_3d)
     std_density = np.sqrt(np.average((densities - avg_density)**2, weights=area_3d))
 
     uniformity = std_density / avg_density if avg_density > 1e-6 else 0.0
-    
+
     return {
         "avg_density": float(avg_density),
         "uniformity": float(uniformity)
@@ -682,28 +488,191 @@ def compute_texel_density(mesh: trimesh.Trimesh, resolution: int = 1024) -> Dict
 
 def compute_texel_density_from_path(path: str, resolution: int = 1024) -> Dict[str, float]:
     try:
-        obj = load_mesh_raw(path)
-        if isinstance(obj, trimesh.Scene):
+        return AnalysisContext(path).texel_density(resolution)
+    except Exception as e:
+        print(f"Texel Density error: {e}")
+        return {"avg_density": 0.0, "uniformity": 0.0}
+
+class AnalysisContext:
+    """Модель, загруженная один раз на анализ.
+
+    Сцена парсится в конструкторе, а объединенный меш и производные массивы
+    каждой геометрии (UV, площади) считаются лениво и переиспользуются всеми
+    метриками и визуализациями.
+    """
+
+    def __init__(self, path: str, uv_overlap_method: str = "auto", use_mesh_cache: bool = True,
+                 content_hash: str | None = None):
+        self.path = path
+        self.uv_overlap_method = uv_overlap_method
+        self.content_hash = content_hash
+        self._load(use_mesh_cache)
+
+    def _load(self, use_mesh_cache: bool):
+        # Бинарный кэш (если он уже построен) открывается через mmap вместо разбора файла
+        self.cached_arrays = mesh_cache.load(self.path, self.content_hash) if use_mesh_cache else None
+        self.scene = load_mesh_raw(self.path) if self.cached_arrays is None else None
+
+    def __getstate__(self):
+        if self.cached_arrays is not None:
+            # Процессы пула сами открывают кэш через mmap: страницы файлов общие, без копирования
+            return {"path": self.path, "uv_overlap_method": self.uv_overlap_method,
+                    "content_hash": self.content_hash}
+        # В процессы пула уходят только геометрии и уже посчитанные массивы, без сцены
+        self.prepare()
+        state = self.__dict__.copy()
+        state.pop("scene", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if "geometries" not in state:
+            self._load(use_mesh_cache=True)
+
+    def prepare(self, merged: bool = True):
+        """Считает производные массивы заранее, чтобы не повторять это в каждом процессе.
+
+        merged=False - без объединенного меша: задачам над UV он не нужен.
+        """
+        for geom in self.geometries:
+            if geom.area_uv is not None:
+                geom.area_3d
+        if merged:
+            self.merged.area_3d
+
+    def with_options(self, uv_overlap_method: str) -> "AnalysisContext":
+        """Тот же контекст с другими настройками анализа.
+
+        Сцена, геометрии и посчитанные массивы общие с исходным контекстом,
+        поэтому перед этим стоит вызвать prepare().
+        """
+        view = object.__new__(AnalysisContext)
+        view.__dict__.update(self.__dict__)
+        view.uv_overlap_method = uv_overlap_method
+        return view
+
+    @property
+    def has_uv(self) -> bool:
+        return any(geom.uv_faces is not None for geom in self.geometries)
+
+    @cached_property
+    def geometries(self) -> List[GeometryData]:
+        if self.cached_arrays is not None:
+            return [GeometryData.from_arrays(**arrays) for arrays in self.cached_arrays]
+        obj = self.scene
+        if isinstance(obj, trimesh.Trimesh):
+            return [GeometryData(obj)]
+        if hasattr(obj, "geometry"):
+            return [GeometryData(g) for g in obj.geometry.values() if isinstance(g, trimesh.Trimesh)]
+        raise ValueError("unsupported_format")
+
+    @cached_property
+    def merged(self) -> GeometryData:
+        geoms = self.geometries
+        if len(geoms) == 1:
+            return geoms[0]
+        if self.cached_arrays is not None:
+            if not geoms:
+                raise ValueError("empty_scene")
+            offsets = np.cumsum([0] + [len(g.mesh.vertices) for g in geoms[:-1]])
+            return GeometryData.from_arrays(
+                vertices=np.concatenate([g.mesh.vertices for g in geoms]),
+                faces=np.concatenate([g.mesh.faces + offset for g, offset in zip(geoms, offsets)]),
+                uv=None,
+                area_3d=np.concatenate([g.area_3d for g in geoms]),
+            )
+        return GeometryData(_merge_geometry(self.scene))
+
+    @property
+    def mesh(self) -> trimesh.Trimesh:
+        return self.merged.mesh
+
+    def uv_triangles(self, mode: str = "original") -> Tuple[np.ndarray, np.ndarray | None]:
+        """UV треугольники всех геометрий и цвета граней для режима визуализации."""
+        tris = []
+        colors_list = []
+        for geom in self.geometries:
+            if geom.uv_faces is None:
+                continue
+            colors = None
+            if mode == "overlap":
+                colors = get_uv_overlap_colors(geom, method=self.uv_overlap_method)
+            elif mode == "distortion":
+                colors = get_uv_distortion_colors(geom)
+            elif mode == "texel_density":
+                colors = get_uv_texel_density_colors(geom)
+            tris.append(geom.uv_faces)
+            if colors is not None:
+                colors_list.append(colors)
+
+        if not tris:
+            raise ValueError("no_uv")
+
+        all_tris = np.concatenate(tris, axis=0)
+        all_colors = np.concatenate(colors_list, axis=0) if colors_list else None
+        return all_tris, all_colors
+
+    def uv_svg(self, size: int = 1024, stroke: int = 1, mode: str = "original") -> str:
+        tris, colors = self.uv_triangles(mode)
+        return uv_svg.render_uv_svg(tris, colors, size, stroke)
+
+    def save_uv_svg(self, out_path: str, size: int = 1024, stroke: int = 1, mode: str = "original") -> bool:
+        try:
+            tris, colors = self.uv_triangles(mode)
+            uv_svg.save_uv_svg(out_path, tris, colors, size, stroke)
+            return True
+        except Exception as e:
+            print(f"UV SVG Error (mode {mode}): {e}")
+            return False
+
+    def save_uv_tiles(self, out_dir: str, mode: str = "original", max_zoom: int = uv_tiles.MAX_ZOOM) -> bool:
+        try:
+            tris, colors = self.uv_triangles(mode)
+            uv_tiles.save_uv_tiles(out_dir, tris, colors, max_zoom)
+            return True
+        except Exception as e:
+            print(f"UV tiles Error (mode {mode}): {e}")
+            return False
+
+    def uv_overlap(self) -> float:
+        try:
+            max_overlap = 0.0
+            for geom in self.geometries:
+                max_overlap = max(max_overlap, compute_uv_overlap(geom, method=self.uv_overlap_method))
+            return max_overlap
+        except Exception as e:
+            print(f"Overlap error: {e}")
+            return 0.0
+
+    def uv_distortion(self) -> float:
+        try:
+            max_dist = 0.0
+            for geom in self.geometries:
+                max_dist = max(max_dist, compute_uv_distortion(geom))
+            return max_dist
+        except Exception as e:
+            print(f"Distortion error: {e}")
+            return 0.0
+
+    def texel_density(self, resolution: int = 1024) -> Dict[str, float]:
+        try:
             all_densities = []
             all_areas = []
             all_uniformities = []
-            for g in obj.geometry.values():
-                if isinstance(g, trimesh.Trimesh):
-                    res = compute_texel_density(g, resolution)
-                    area = g.area
-                    if area > 1e-12:
-                        all_densities.append(res["avg_density"])
-                        all_areas.append(area)
-                        all_uniformities.append(res["uniformity"])
-            
+            for geom in self.geometries:
+                res = compute_texel_density(geom, resolution)
+                area = float(np.sum(geom.area_3d))
+                if area > 1e-12:
+                    all_densities.append(res["avg_density"])
+                    all_areas.append(area)
+                    all_uniformities.append(res["uniformity"])
+
             if not all_areas:
                 return {"avg_density": 0.0, "uniformity": 0.0}
-                
+
             avg = np.average(all_densities, weights=all_areas)
             unif = np.average(all_uniformities, weights=all_areas)
             return {"avg_density": float(avg), "uniformity": float(unif)}
-        else:
-            return compute_texel_density(obj, resolution)
-    except Exception as e:
-        print(f"Texel Density error: {e}")
-        return {"avg_density": 0.0, "uniformity": 0.0}
+        except Exception as e:
+            print(f"Texel Density error: {e}")
+            return {"avg_density": 0.0, "uniformity": 0.0}
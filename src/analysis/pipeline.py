@@ -0,0 +1,460 @@
+import os
+import resource
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from src.analysis.thresholds import evaluate
+from src.analysis.executor import submit_all
+from src.analysis.result_cache import result_cache
+from src.analysis.context_cache import context_cache
+from src.analysis import uv_tiles
+from src import monitoring
+from src.analysis.mesh_utils import (
+    get_model_path,
+    get_model_dir,
+    compute_metrics,
+    save_recolored_mesh,
+    save_density_mesh,
+    save_mesh_cache,
+    write_mesh_cache,
+)
+
+# Артефакт -> (имя файла, поле со ссылкой в отчете)
+ARTIFACTS = {
+    "recolored": ("recolored.glb", "recolored_model_url"),
+    "density": ("density.glb", "density_model_url"),
+    "uv": ("uv_layout.svg", "uv_image_url"),
+    "uv_overlap": ("uv_overlap.svg", "uv_overlap_url"),
+    "uv_distortion": ("uv_distortion.svg", "uv_distortion_url"),
+    "uv_texel_density": ("uv_texel_density.svg", "uv_texel_density_url"),
+    "uv_tiles": ("uv_tiles", "uv_tiles_url"),
+}
+
+# Артефакт UV -> режим визуализации
+UV_MODES = {
+    "uv": "original",
+    "uv_overlap": "overlap",
+    "uv_distortion": "distortion",
+    "uv_texel_density": "texel_density",
+}
+# Шаблон адреса тайла внутри каталога uv_tiles
+TILE_PATH = "{mode}/{z}/{x}/{y}.png"
+
+# Метрика, которую можно запросить -> поля отчета, которые она заполняет
+METRICS = {
+    "faces": ("faces",),
+    "density": ("density",),
+    "uv_overlap": ("uv_overlap",),
+    "uv_distortion": ("uv_distortion",),
+    "texel_density": ("texel_density", "texel_uniformity"),
+}
+# UV метрика -> метод AnalysisContext
+UV_METRICS = {
+    "uv_overlap": "uv_overlap",
+    "uv_distortion": "uv_distortion",
+    "texel_density": "texel_density",
+}
+# Артефакты, которые можно запросить. При uv_format="tiles" UV артефакты - режимы пирамиды тайлов
+VISUALS = ("recolored", "density", *UV_MODES)
+# Артефакты-файлы, которые можно построить по первому запросу (тайлы строятся только при анализе)
+LAZY_ARTIFACTS = VISUALS
+LAZY_URL = "/analysis/artifacts/{user_id}/{stored_name}/{name}?uv_overlap_method={method}"
+
+
+# Задача compute_analysis -> этап в событиях прогресса
+STAGES = {
+    "recolored": "inversion_repair",
+    "density": "density_coloring",
+    "uv": "uv_layout",
+    "uv_overlap": "uv_overlap_layout",
+    "uv_distortion": "uv_distortion_layout",
+    "uv_texel_density": "uv_texel_density_layout",
+    "uv_overlap_value": "overlap",
+    "uv_distortion_value": "distortion",
+    "texel_density_value": "texel_density",
+}
+# Задача расчета UV метрики -> поле отчета
+VALUE_TASKS = {
+    "uv_overlap_value": "uv_overlap",
+    "uv_distortion_value": "uv_distortion",
+    "texel_density_value": "texel_density",
+}
+
+# progress(event, data): получатель событий хода анализа
+Progress = Callable[[str, dict], None]
+
+
+def _no_progress(event: str, data: dict):
+    pass
+
+
+def _record_stage(stage: str, size: str, seconds: float, peak_rss: int | None = None):
+    monitoring.STAGE_SECONDS.observe(seconds, stage=stage, size_class=size)
+    if peak_rss is None:
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    monitoring.STAGE_PEAK_RSS.set_max(peak_rss, stage=stage)
+
+
+class AnalysisError(Exception):
+    pass
+
+
+# Задачи-сохранения мешей: работают с объединенной геометрией модели
+MESH_WRITERS = {
+    "recolored": save_recolored_mesh,
+    "density": save_density_mesh,
+}
+
+
+def _context_task(path: str, uv_overlap_method: str, content_hash: str | None, op: str, args: tuple):
+    """Задача пула над моделью: op - имя из MESH_WRITERS или метод AnalysisContext.
+
+    В процесс передаются только путь и настройки: модель открывается там из
+    mesh_cache через mmap и остается в context_cache процесса для следующих задач.
+    """
+    ctx = context_cache.get(path, uv_overlap_method=uv_overlap_method, content_hash=content_hash,
+                            merged=op in MESH_WRITERS)
+    if op in MESH_WRITERS:
+        return MESH_WRITERS[op](ctx.merged, *args)
+    return getattr(ctx, op)(*args)
+
+
+def _task_result(future, error: str, default):
+    """Результат задачи пула или default, если задача упала (ошибка печатается)."""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"{error}: {e}")
+        return default
+
+
+def compute_analysis(path: str, out_dir: str, uv_overlap_method: str = "auto", uv_format: str = "svg",
+                     metrics=None, artifacts=None, progress: Progress | None = None,
+                     content_hash: str | None = None) -> dict:
+    """Считает метрики и пишет артефакты в out_dir. Не зависит от game_type/usage_area.
+
+    uv_format="tiles" вместо четырех SVG строит пирамиды PNG-тайлов в каталоге uv_tiles.
+    metrics и artifacts - имена из METRICS и VISUALS, которые нужно посчитать (None - все).
+    progress(event, data) получает события "stage" по мере завершения этапов и "metrics"
+    с частичными метриками, как только они готовы. content_hash - blob модели, по нему
+    находится общий mesh_cache.
+    """
+    metrics = set(METRICS) if metrics is None else set(metrics)
+    artifacts = set(VISUALS) if artifacts is None else set(artifacts)
+    progress = progress or _no_progress
+    started = time.monotonic()
+    try:
+        # Повторные анализы той же модели берут уже разобранную сцену из памяти
+        ctx = context_cache.get(path, uv_overlap_method=uv_overlap_method, content_hash=content_hash)
+        mesh = ctx.merged
+    except Exception:
+        raise AnalysisError("Failed to load model")
+    # Число граней и площадь уже посчитаны при загрузке, поэтому они ничего не стоят
+    faces, density = compute_metrics(mesh)
+    size = monitoring.size_class(faces)
+    monitoring.ANALYSIS_FACES.observe(faces)
+    _record_stage("load", size, time.monotonic() - started)
+    progress("stage", {"stage": "load", "ok": True, "elapsed": time.monotonic() - started})
+    ready = {name: value for name, value in (("faces", faces), ("density", density)) if name in metrics}
+    if ready:
+        progress("metrics", ready)
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    def out(name: str) -> str:
+        return os.path.join(out_dir, ARTIFACTS[name][0])
+
+    def task(op: str, *args):
+        return _context_task, (path, uv_overlap_method, content_hash, op, args)
+
+    # Все артефакты и UV метрики независимы друг от друга: считаем их параллельно
+    tasks = {}
+    if "recolored" in artifacts:
+        tasks["recolored"] = task("recolored", out("recolored"))
+    if "density" in artifacts:
+        tasks["density"] = task("density", out("density"))
+    zoom = uv_tiles.zoom_for(faces)
+    uv_names = [name for name in UV_MODES if name in artifacts] if ctx.has_uv else []
+    for name in uv_names:
+        mode = UV_MODES[name]
+        if uv_format == "tiles":
+            tasks[name] = task("save_uv_tiles", os.path.join(out("uv_tiles"), mode), mode, zoom)
+        else:
+            tasks[name] = task("save_uv_svg", out(name), 1024, 1, mode)
+    if ctx.has_uv:
+        for name in UV_METRICS:
+            if name in metrics:
+                tasks[f"{name}_value"] = task(UV_METRICS[name])
+    if tasks and ctx.cached_arrays is None:
+        # Процессы пула открывают модель из mesh_cache: если его еще нет, пишем из уже разобранной
+        try:
+            save_mesh_cache(ctx)
+        except Exception as e:
+            print(f"Mesh cache error: {e}")
+
+    timings = {}
+
+    def on_done(name: str, future):
+        ok = future.exception() is None and future.result() is not False
+        if name in timings:
+            _record_stage(STAGES[name], size, *timings[name])
+        progress("stage", {"stage": STAGES[name], "ok": ok, "elapsed": time.monotonic() - started})
+        if name in VALUE_TASKS and future.exception() is None:
+            value = future.result()
+            if name == "texel_density_value":
+                progress("metrics", {"texel_density": value["avg_density"], "texel_uniformity": value["uniformity"]})
+            else:
+                progress("metrics", {VALUE_TASKS[name]: value})
+
+    results = submit_all(tasks, on_done=on_done, timings=timings) if tasks else {}
+    if any(isinstance(future.exception(), BrokenProcessPool) for future in results.values()):
+        # Пул не поднялся и после пересоздания: это сбой сервиса, а не модели
+        raise AnalysisError("Analysis workers are unavailable")
+
+    built = {}
+    for name in ("recolored", "density"):
+        if name not in results:
+            continue
+        try:
+            results[name].result()
+            built[name] = ARTIFACTS[name][0]
+        except Exception as e:
+            print(f"Error creating {name} mesh: {e}")
+
+    uv_present = results["uv"].result() if "uv" in results else ctx.has_uv
+
+    values = {
+        "faces": faces,
+        "density": density,
+        "uv_overlap": 0.0,
+        "uv_distortion": 0.0,
+        "texel_density": 0.0,
+        "texel_uniformity": 0.0,
+    }
+    tiles = None
+
+    if uv_present:
+        # Визуализации, которые не удалось построить, в отчет не попадают
+        uv_built = [name for name in uv_names if _task_result(results[name], f"Error creating {name}", False)]
+        if uv_format == "tiles":
+            if uv_built:
+                built["uv_tiles"] = ARTIFACTS["uv_tiles"][0]
+                tiles = {
+                    "modes": [UV_MODES[name] for name in uv_built],
+                    "tile_size": uv_tiles.TILE_SIZE,
+                    "max_zoom": zoom,
+                }
+        else:
+            for name in uv_built:
+                built[name] = ARTIFACTS[name][0]
+        # Метрика, которую не удалось посчитать, остается 0.0, остальной отчет сохраняется
+        if "uv_overlap" in metrics:
+            values["uv_overlap"] = _task_result(results["uv_overlap_value"], "Overlap error", 0.0)
+        if "uv_distortion" in metrics:
+            values["uv_distortion"] = _task_result(results["uv_distortion_value"], "Distortion error", 0.0)
+        if "texel_density" in metrics:
+            texel_res = _task_result(results["texel_density_value"], "Texel density error", None)
+            if texel_res is not None:
+                values["texel_density"] = texel_res["avg_density"]
+                values["texel_uniformity"] = texel_res["uniformity"]
+
+    monitoring.ANALYSIS_SECONDS.observe(time.monotonic() - started, size_class=size)
+    return {
+        "metrics": {field: values[field] for name in METRICS if name in metrics for field in METRICS[name]},
+        "uv_present": uv_present,
+        "uv_tiles": tiles,
+        "artifacts": built,
+        "computed": {"metrics": sorted(metrics), "artifacts": sorted(artifacts)},
+    }
+
+
+def _missing(cached: dict | None, metrics: set, artifacts: set) -> tuple[set, set]:
+    """Что из запрошенного еще не считалось для этой записи кэша."""
+    if cached is None:
+        return metrics, artifacts
+    computed = cached.get("computed")
+    if computed is None:
+        # Записи без "computed" - полный анализ
+        return set(), set()
+    return metrics - set(computed["metrics"]), artifacts - set(computed["artifacts"])
+
+
+def merge_analysis(old: dict | None, new: dict) -> dict:
+    """Дополняет результат прошлых расчетов новыми метриками и артефактами."""
+    if old is None:
+        return new
+    tiles = new["uv_tiles"] or old.get("uv_tiles")
+    if old.get("uv_tiles") and new["uv_tiles"]:
+        modes = set(old["uv_tiles"]["modes"]) | set(new["uv_tiles"]["modes"])
+        tiles = {**new["uv_tiles"], "modes": [mode for mode in UV_MODES.values() if mode in modes]}
+    computed = old.get("computed") or {"metrics": list(METRICS), "artifacts": list(VISUALS)}
+    return {
+        "metrics": {**old["metrics"], **new["metrics"]},
+        "uv_present": new["uv_present"],
+        "uv_tiles": tiles,
+        "artifacts": {**old["artifacts"], **new["artifacts"]},
+        "computed": {
+            "metrics": sorted(set(computed["metrics"]) | set(new["computed"]["metrics"])),
+            "artifacts": sorted(set(computed["artifacts"]) | set(new["computed"]["artifacts"])),
+        },
+    }
+
+
+def build_report(user_id: int, stored_name: str, params: dict, analysis: dict, previous: dict | None = None) -> dict:
+    """Сравнивает метрики с порогами профиля и собирает отчет со ссылками на артефакты.
+
+    Метрики и ссылки прошлого отчета (previous), которые в этот раз не считались, сохраняются.
+    """
+    metrics = {**(previous or {}).get("metrics", {}), **analysis["metrics"]}
+    try:
+        verdict = evaluate(metrics, params["game_type"], params["usage_area"])
+    except KeyError as e:
+        raise AnalysisError(f"Invalid parameter: {str(e)}")
+
+    payload = {
+        "params": params,
+        "metrics": metrics,
+        "limits": verdict["limits"],
+        "result": verdict["result"],
+        "uv_present": analysis["uv_present"],
+    }
+    for name, (_, url_key) in ARTIFACTS.items():
+        if previous and url_key in previous:
+            payload[url_key] = previous[url_key]
+    if previous and previous.get("uv_tiles"):
+        payload["uv_tiles"] = previous["uv_tiles"]
+
+    # Непостроенные артефакты отдаются ссылкой, по которой их построят при первом запросе
+    lazy_prefix = LAZY_URL.split("{", 1)[0]
+    tile_modes = (analysis.get("uv_tiles") or {}).get("modes", [])
+    for name in LAZY_ARTIFACTS:
+        url_key = ARTIFACTS[name][1]
+        if name in analysis["artifacts"]:
+            continue
+        if name in UV_MODES and (not analysis["uv_present"] or UV_MODES[name] in tile_modes):
+            continue
+        if url_key not in payload or payload[url_key].startswith(lazy_prefix):
+            payload[url_key] = LAZY_URL.format(user_id=user_id, stored_name=stored_name, name=name,
+                                               method=params.get("uv_overlap_method", "auto"))
+
+    t = int(time.time())
+    for name, filename in analysis["artifacts"].items():
+        url_key = ARTIFACTS[name][1]
+        if name == "uv_tiles":
+            filename = f"{filename}/{TILE_PATH}"
+        payload[url_key] = f"/models/{user_id}/{stored_name}/{filename}?t={t}"
+    if analysis.get("uv_tiles"):
+        payload["uv_tiles"] = analysis["uv_tiles"]
+
+    return payload
+
+
+def build_mesh_cache(path: str, content_hash: str | None = None):
+    """Фоновый шаг после загрузки: разбор модели в бинарный кэш в пуле процессов.
+
+    Кэш общий для blob: повторная загрузка того же файла его не перестраивает.
+    """
+    timings = {}
+    try:
+        submit_all({"mesh_cache": (write_mesh_cache, (path, content_hash))}, timings=timings)["mesh_cache"].result()
+        monitoring.STAGE_SECONDS.observe(timings["mesh_cache"][0], stage="mesh_cache", size_class="all")
+    except Exception as e:
+        print(f"Mesh cache error: {e}")
+
+
+# Блокировки записей result_cache и число их владельцев: запись исчезает вместе с последним
+_entry_locks: dict[str, threading.Lock] = {}
+_entry_holders: dict[str, int] = {}
+_entry_locks_guard = threading.Lock()
+
+
+def _acquire_entry(key: str) -> threading.Lock:
+    with _entry_locks_guard:
+        lock = _entry_locks.setdefault(key, threading.Lock())
+        _entry_holders[key] = _entry_holders.get(key, 0) + 1
+    lock.acquire()
+    return lock
+
+
+def _release_entry(key: str, lock: threading.Lock):
+    lock.release()
+    with _entry_locks_guard:
+        _entry_holders[key] -= 1
+        if not _entry_holders[key]:
+            del _entry_holders[key]
+            del _entry_locks[key]
+
+
+def ensure_analysis(path: str, out_dir: str, uv_overlap_method: str, uv_format: str,
+                    metrics, artifacts, content_hash: str | None = None, progress: Progress | None = None) -> dict:
+    """Берет результат из кэша, досчитывает то, чего в нем нет, и раскладывает артефакты в out_dir.
+
+    Кэш адресуется содержимым, поэтому модели с одним blob (content_hash)
+    получают одни и те же артефакты жесткими ссылками без повторного расчета.
+    Чтение, дописывание и запись записи идут под ее блокировкой: параллельный
+    анализ того же ключа ждет и досчитывает только то, чего в записи еще нет.
+    """
+    try:
+        key = result_cache.key_for(path, variant=f"overlap-{uv_overlap_method}-{uv_format}", digest=content_hash)
+    except OSError:
+        raise AnalysisError("Failed to load model")
+
+    lock = _acquire_entry(key)
+    try:
+        analysis = result_cache.get(key)
+        if analysis is not None:
+            try:
+                result_cache.restore(key, analysis, out_dir)
+            except OSError as e:
+                # Запись вытеснили между get и restore: считаем заново
+                print(f"Analysis cache error: {e}")
+                analysis = None
+        todo_metrics, todo_artifacts = _missing(analysis, set(metrics), set(artifacts))
+        if todo_metrics or todo_artifacts:
+            fresh = compute_analysis(path, out_dir, uv_overlap_method, uv_format, todo_metrics, todo_artifacts,
+                                     progress, content_hash)
+            analysis = merge_analysis(analysis, fresh)
+            try:
+                result_cache.put(key, analysis, out_dir)
+            except Exception as e:
+                print(f"Analysis cache error: {e}")
+    finally:
+        _release_entry(key, lock)
+    return analysis
+
+
+def run_analysis(user_id: int, stored_name: str, params: dict, content_hash: str | None = None,
+                 previous: dict | None = None, progress: Progress | None = None) -> dict:
+    """Анализ модели. Синхронный и CPU-тяжелый: запускать вне event loop.
+
+    Считается только то, что запрошено в params["metrics"]/params["artifacts"];
+    результат дописывается в прошлый отчет. С lazy_artifacts по умолчанию
+    не строится ни один артефакт: отчет получает ссылки на materialize_artifact.
+    """
+    path = get_model_path(user_id, stored_name)
+    out_dir = get_model_dir(user_id, stored_name)
+    metrics = METRICS if params.get("metrics") is None else params["metrics"]
+    artifacts = params.get("artifacts")
+    if artifacts is None:
+        artifacts = () if params.get("lazy_artifacts") else VISUALS
+    analysis = ensure_analysis(path, out_dir, params.get("uv_overlap_method", "auto"), params.get("uv_format", "svg"),
+                               metrics, artifacts, content_hash, progress)
+    return build_report(user_id, stored_name, params, analysis, previous)
+
+
+def materialize_artifact(user_id: int, stored_name: str, name: str, uv_overlap_method: str = "auto",
+                         content_hash: str | None = None) -> str | None:
+    """Строит один артефакт из LAZY_ARTIFACTS при первом запросе и возвращает путь к файлу.
+
+    Файл в каталоге модели мог быть построен другим методом, поэтому артефакт
+    всегда берется через ensure_analysis: запись кэша этого метода раскладывается
+    заново, а считается он только если его там нет.
+    None - артефакт построить нельзя (например, у модели нет UV).
+    Синхронная: запускать вне event loop.
+    """
+    target = os.path.join(get_model_dir(user_id, stored_name), ARTIFACTS[name][0])
+    analysis = ensure_analysis(get_model_path(user_id, stored_name), get_model_dir(user_id, stored_name),
+                               uv_overlap_method, "svg", (), (name,), content_hash)
+    return target if name in analysis["artifacts"] else None
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from src.config import settings
+
+# Увеличивать при любом изменении расчета метрик или вида артефактов:
+# старые записи кэша перестанут совпадать по ключу и со временем вытеснятся
+ANALYSIS_VERSION = "5"
+
+ENTRY_FILE = "entry.json"
+# Размер записи в байтах, хранится в entry.json рядом с результатом анализа
+SIZE_FIELD = "cache_bytes"
+HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def link_or_copy(src: str, dst: str):
+    """Кладет файл по пути dst жесткой ссылкой (или копией), атомарно заменяя старый."""
+    # rename между двумя ссылками на один inode ничего не делает, поэтому такой случай пропускаем
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def link_artifact(src: str, dst: str):
+    """Как link_or_copy, но артефакт может быть и каталогом (например, пирамида тайлов).
+
+    Каталог собирается рядом во временном и подменяет старый целиком.
+    """
+    if not os.path.isdir(src):
+        link_or_copy(src, dst)
+        return
+    tmp = f"{dst}.{uuid.uuid4().hex}.tmp"
+    try:
+        for root, _, files in os.walk(src):
+            target = os.path.join(tmp, os.path.relpath(root, src))
+            os.makedirs(target, exist_ok=True)
+            for name in files:
+                link_or_copy(os.path.join(root, name), os.path.join(target, name))
+        shutil.rmtree(dst, ignore_errors=True)
+        os.replace(tmp, dst)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def _tree_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def _entry_size(entry_dir: str) -> int:
+    """Размер записи из ее entry.json; у старых записей без него - обход каталога."""
+    entry_file = os.path.join(entry_dir, ENTRY_FILE)
+    try:
+        with open(entry_file, "r", encoding="utf-8") as f:
+            size = json.load(f).get(SIZE_FIELD)
+        if isinstance(size, int):
+            return size + os.path.getsize(entry_file)
+    except (OSError, ValueError, AttributeError):
+        pass
+    return _tree_size(entry_dir)
+
+
+class ResultCache:
+    """Кэш метрик и артефактов анализа, адресуемый по содержимому файла.
+
+    Запись лежит в каталоге {root}/{key[:2]}/{key}/: entry.json с метриками
+    и файлы артефактов. Общий размер ограничен max_bytes, при превышении
+    удаляются записи, к которым дольше всего не обращались.
+
+    Размеры записей хранятся в entry.json и в индексе в памяти: каталог
+    обходится целиком только один раз, при первом обращении. Записи, которые
+    сейчас раскладываются в каталог модели, не вытесняются.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hashes: Dict[tuple, str] = {}
+        # key -> размер записи в байтах, от давно не использованных к свежим
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        # key -> число restore, которые сейчас читают запись
+        self._restoring: Dict[str, int] = {}
+
+    def key_for(self, path: str, variant: str = "", digest: str | None = None) -> str:
+        """Ключ записи: хэш файла, вариант расчета (например, метод перекрытий UV) и версия.
+
+        Если хэш уже известен (digest), файл не читается.
+        """
+        if digest is None:
+            st = os.stat(path)
+            stamp = (path, st.st_size, st.st_mtime_ns)
+            with self._lock:
+                digest = self._hashes.get(stamp)
+            if digest is None:
+                digest = file_sha256(path)
+                self._remember(stamp, digest)
+        if variant:
+            return f"{digest}-{variant}-v{ANALYSIS_VERSION}"
+        return f"{digest}-v{ANALYSIS_VERSION}"
+
+    def remember_hash(self, path: str, digest: str):
+        """Запоминает уже посчитанный хэш файла (например, при загрузке), чтобы не читать его заново."""
+        st = os.stat(path)
+        self._remember((path, st.st_size, st.st_mtime_ns), digest)
+
+    def _remember(self, stamp: tuple, digest: str):
+        with self._lock:
+            if len(self._hashes) > 4096:
+                self._hashes.clear()
+            self._hashes[stamp] = digest
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _load_index(self):
+        """Строит индекс размеров по каталогу кэша. Вызывать под self._lock."""
+        if self._index is not None:
+            return
+        entries = []
+        for shard in os.scandir(self.root) if os.path.isdir(self.root) else []:
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.is_dir() or entry.name.endswith(".tmp"):
+                    continue
+                size = _entry_size(entry.path)
+                entries.append((entry.stat().st_mtime, entry.name, size))
+        entries.sort()
+        self._index = OrderedDict((key, size) for _, key, size in entries)
+        self._total = sum(self._index.values())
+
+    def get(self, key: str) -> Optional[dict]:
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILE), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry.pop(SIZE_FIELD, None)
+        for filename in entry.get("artifacts", {}).values():
+            if not os.path.exists(os.path.join(entry_dir, filename)):
+                return None
+        try:
+            # mtime каталога - порядок вытеснения после перезапуска
+            os.utime(entry_dir)
+        except OSError:
+            pass
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self._index.move_to_end(key)
+        return entry
+
+    def restore(self, key: str, entry: dict, out_dir: str):
+        """Раскладывает артефакты записи в каталог модели.
+
+        Пока идет раскладка, запись не вытесняется. OSError - запись пропала
+        (например, удалена другим процессом): ее стоит считать промахом.
+        """
+        entry_dir = self._entry_dir(key)
+        os.makedirs(out_dir, exist_ok=True)
+        with self._lock:
+            self._restoring[key] = self._restoring.get(key, 0) + 1
+        try:
+            for filename in entry.get("artifacts", {}).values():
+                link_artifact(os.path.join(entry_dir, filename), os.path.join(out_dir, filename))
+        finally:
+            with self._lock:
+                self._restoring[key] -= 1
+                if not self._restoring[key]:
+                    del self._restoring[key]
+
+    def put(self, key: str, entry: dict, out_dir: str):
+        """Сохраняет результат анализа; артефакты берутся из каталога модели."""
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp_dir)
+        try:
+            for filename in entry.get("artifacts", {}).values():
+                link_artifact(os.path.join(out_dir, filename), os.path.join(tmp_dir, filename))
+            size = _tree_size(tmp_dir)
+            with open(os.path.join(tmp_dir, ENTRY_FILE), "w", encoding="utf-8") as f:
+                json.dump({**entry, SIZE_FIELD: size}, f)
+            size += os.path.getsize(os.path.join(tmp_dir, ENTRY_FILE))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        with self._lock:
+            self._load_index()
+            self._total += size - self._index.pop(key, 0)
+            self._index[key] = size
+        self.evict()
+
+    def evict(self):
+        """Удаляет давно не использованные записи, пока размер кэша больше max_bytes."""
+        victims = []
+        with self._lock:
+            self._load_index()
+            # Самую свежую запись не трогаем: ее только что положил текущий анализ
+            for key in list(self._index)[:-1]:
+                if self._total <= self.max_bytes:
+                    break
+                if key in self._restoring:
+                    continue
+                self._total -= self._index.pop(key)
+                entry_dir = self._entry_dir(key)
+                # Переименование атомарно: get сразу видит промах, удаление - уже вне блокировки
+                doomed = f"{entry_dir}.{uuid.uuid4().hex}.tmp"
+                try:
+                    os.replace(entry_dir, doomed)
+                except OSError:
+                    continue
+                victims.append(doomed)
+        for path in victims:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._index = None
+            self._total = 0
+
+
+result_cache = ResultCache(settings.ANALYSIS_CACHE_DIR, settings.ANALYSIS_CACHE_MAX_BYTES)
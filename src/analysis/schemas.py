@@ -1,12 +1,23 @@
-from typing import Literal, Optional, Dict, Any
+from typing import Literal, Optional, Dict, Any, List
 from pydantic import BaseModel, field_validator
 
 GameType = Literal["low-poly", "indie", "aa", "aaa", "cinematic"]
 UsageArea = Literal["background", "prop", "hero"]
+UvOverlapMethod = Literal["auto", "exact", "raster"]
+UvFormat = Literal["svg", "tiles"]
+Metric = Literal["faces", "density", "uv_overlap", "uv_distortion", "texel_density"]
+Artifact = Literal["recolored", "density", "uv", "uv_overlap", "uv_distortion", "uv_texel_density"]
 
 class AnalyzeParams(BaseModel):
     game_type: GameType
     usage_area: UsageArea
+    uv_overlap_method: UvOverlapMethod = "auto"
+    uv_format: UvFormat = "svg"
+    # Что посчитать; None - все метрики и все артефакты (кроме режима lazy_artifacts)
+    metrics: Optional[List[Metric]] = None
+    artifacts: Optional[List[Artifact]] = None
+    # Не строить артефакты при анализе (если artifacts не указан): они строятся при первом запросе ссылки
+    lazy_artifacts: bool = False
     extra_params: Optional[Dict[str, Any]] = None
 
     @field_validator("game_type", mode="before")
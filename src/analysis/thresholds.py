@@ -1,4 +1,4 @@
-from typing import Dict, Tuple
+from typing import Any, Dict, Tuple
 
 Thresholds = Dict[str, Dict[str, Dict[str, float]]]
 
@@ -38,3 +38,42 @@ def get_thresholds(game_type: str, usage_area: str) -> Tuple[int, float]:
     if not ua:
         raise KeyError("usage_area")
     return int(ua["max_faces"]), float(ua["max_density"])
+
+def evaluate(metrics: Dict[str, Any], game_type: str, usage_area: str) -> Dict[str, Dict[str, Any]]:
+    """Сравнивает метрики с порогами профиля. Сами метрики от профиля не зависят.
+
+    Проверки выполняются только для метрик, которые есть в metrics.
+    """
+    max_faces, max_density = get_thresholds(game_type, usage_area)
+    limits = {
+        "max_faces": max_faces,
+        "max_density": max_density,
+        "max_uv_overlap": 0.0,
+        "max_uv_distortion": 0.5,
+        "max_texel_uniformity": 0.2
+    }
+    checks = {
+        "faces_ok": ("faces", max_faces),
+        "density_ok": ("density", max_density),
+        "uv_overlap_ok": ("uv_overlap", 0.001),
+        "uv_distortion_ok": ("uv_distortion", 0.5),
+        "texel_uniformity_ok": ("texel_uniformity", 0.2),
+    }
+    # Метрики, которые не считались, не проверяются
+    result = {name: metrics[key] <= limit for name, (key, limit) in checks.items() if key in metrics}
+    return {"limits": limits, "result": result}
+
+def evaluate_all(metrics: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Матрица game_type -> usage_area -> {limits, result, passed} по всем профилям.
+
+    passed=None - профиль не оценен: ни одной проверяемой метрики нет.
+    """
+    matrix = {}
+    for game_type, areas in THRESHOLDS.items():
+        matrix[game_type] = {}
+        for usage_area in areas:
+            verdict = evaluate(metrics, game_type, usage_area)
+            # all() от пустого набора проверок - True, а это не "прошел"
+            verdict["passed"] = all(verdict["result"].values()) if verdict["result"] else None
+            matrix[game_type][usage_area] = verdict
+    return matrix
@@ -0,0 +1,239 @@
+from typing import Iterator, NamedTuple
+
+import numpy as np
+import shapely
+
+# Сколько пар-кандидатов обрабатывать за один проход, чтобы ограничить память
+PAIR_CHUNK = 1 << 20
+# Не больше стольких ячеек сетки по стороне
+GRID_MAX_CELLS = 1024
+# Пересечения и треугольники меньшей площади не считаются
+AREA_EPS = 1e-12
+
+
+class TooManyPairs(Exception):
+    """Кандидатов широкой фазы больше бюджета: точный расчет был бы квадратичным."""
+
+    def __init__(self, count: int):
+        super().__init__(f"too_many_candidate_pairs: {count}")
+        self.count = count
+
+
+class OverlapPairs(NamedTuple):
+    """Пары пересекающихся UV треугольников (i < j) и площади их пересечений."""
+    pairs: np.ndarray
+    areas: np.ndarray
+
+
+def _orient_ccw(tris: np.ndarray) -> np.ndarray:
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    return np.where((cross < 0)[:, None, None], tris[:, ::-1], tris)
+
+
+def candidate_pairs(tris: np.ndarray, chunk: int = PAIR_CHUNK, max_pairs: int | None = None) -> Iterator[np.ndarray]:
+    """Широкая фаза: равномерная сетка по ограничивающим прямоугольникам треугольников.
+
+    Выдает порциями массивы пар (i, j), i < j, с пересекающимися прямоугольниками.
+    Пара выдается один раз: в ячейке, где лежит нижний левый угол пересечения
+    прямоугольников. Если пар записей в ячейках больше max_pairs (сложенные
+    друг на друга или повторяющиеся развертки), до первой порции бросает TooManyPairs.
+    """
+    n = len(tris)
+    if n < 2:
+        return
+    lo = tris.min(axis=1)
+    hi = tris.max(axis=1)
+    origin = lo.min(axis=0)
+    span = float((hi.max(axis=0) - origin).max())
+    if span <= 0:
+        return
+    # Ячейка порядка типичного размера треугольника, но не мельче span / GRID_MAX_CELLS
+    extent = float(np.median((hi - lo).max(axis=1)))
+    cell = max(extent, span / GRID_MAX_CELLS)
+    cols = int(span / cell) + 1
+
+    c0 = np.minimum(((lo - origin) / cell).astype(np.int64), cols - 1)
+    c1 = np.minimum(((hi - origin) / cell).astype(np.int64), cols - 1)
+    box = c1 - c0 + 1
+    sizes = box[:, 0] * box[:, 1]
+
+    # Каждый треугольник заносится во все накрытые им ячейки
+    entry_face = np.repeat(np.arange(n, dtype=np.int64), sizes)
+    offsets = np.arange(sizes.sum(), dtype=np.int64) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    dy, dx = np.divmod(offsets, box[entry_face, 0])
+    entry_cell = (c0[entry_face, 1] + dy) * cols + (c0[entry_face, 0] + dx)
+    del offsets, dx, dy
+
+    order = np.argsort(entry_cell, kind="stable")
+    entry_cell = entry_cell[order]
+    entry_face = entry_face[order]
+    starts = np.flatnonzero(np.r_[True, entry_cell[1:] != entry_cell[:-1]])
+    ends = np.r_[starts[1:], len(entry_cell)]
+    group_end = np.repeat(ends, ends - starts)
+    # Запись p образует пары со всеми следующими записями своей ячейки
+    pair_counts = group_end - np.arange(len(entry_cell)) - 1
+
+    bounds = np.cumsum(pair_counts)
+    total = int(bounds[-1]) if len(bounds) else 0
+    if max_pairs is not None and total > max_pairs:
+        raise TooManyPairs(total)
+    first = 0
+    emitted = 0
+    while emitted < total:
+        stop = max(first + 1, int(np.searchsorted(bounds, emitted + chunk, side="right")))
+        counts = pair_counts[first:stop]
+        left = np.repeat(np.arange(first, stop, dtype=np.int64), counts)
+        right = left + 1 + np.arange(counts.sum(), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        emitted = int(bounds[stop - 1])
+        first = stop
+
+        i = entry_face[left]
+        j = entry_face[right]
+        cell_id = entry_cell[left]
+        corner = np.maximum(lo[i], lo[j])
+        overlap = (corner <= np.minimum(hi[i], hi[j])).all(axis=1)
+        corner_cell = np.minimum(((corner - origin) / cell).astype(np.int64), cols - 1)
+        owner = corner_cell[:, 1] * cols + corner_cell[:, 0] == cell_id
+        keep = overlap & owner & (i != j)
+        if keep.any():
+            pairs = np.column_stack((i[keep], j[keep]))
+            pairs.sort(axis=1)
+            yield pairs
+
+
+def separated(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Узкая фаза: теорема о разделяющей оси для пар треугольников (M, 3, 2).
+
+    Осями служат нормали шести ребер. Касание по ребру или вершине считается
+    разделением: такие треугольники не перекрываются по площади.
+    """
+    # Покомпонентно: свертки по оси длины 3 в NumPy заметно медленнее
+    ax, ay = a[..., 0], a[..., 1]
+    bx, by = b[..., 0], b[..., 1]
+    result = np.zeros(len(a), dtype=bool)
+    for tri in (a, b):
+        for k in range(3):
+            nx = tri[:, k, 1] - tri[:, (k + 1) % 3, 1]
+            ny = tri[:, (k + 1) % 3, 0] - tri[:, k, 0]
+            pa = [ax[:, v] * nx + ay[:, v] * ny for v in range(3)]
+            pb = [bx[:, v] * nx + by[:, v] * ny for v in range(3)]
+            a_min = np.minimum(np.minimum(pa[0], pa[1]), pa[2])
+            a_max = np.maximum(np.maximum(pa[0], pa[1]), pa[2])
+            b_min = np.minimum(np.minimum(pb[0], pb[1]), pb[2])
+            b_max = np.maximum(np.maximum(pb[0], pb[1]), pb[2])
+            gap = 1e-12 * (np.maximum(np.abs(a_min), np.abs(a_max)) + np.maximum(np.abs(b_min), np.abs(b_max)))
+            result |= a_max <= b_min + gap
+            result |= b_max <= a_min + gap
+    return result
+
+
+def intersection_area(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Площадь пересечения пар треугольников, ориентированных против часовой стрелки.
+
+    Треугольник a отсекается тремя полуплоскостями b (Сазерленд - Ходжмен)
+    для всех пар сразу. Многоугольник хранится в массиве фиксированной длины:
+    каждое отсечение добавляет не больше одной вершины.
+    """
+    m = len(a)
+    rows = np.arange(m)
+    poly = a.astype(np.float64)
+    count = np.full(m, 3, dtype=np.int64)
+    for k in range(3):
+        p = b[:, k]
+        q = b[:, (k + 1) % 3]
+        d = q - p
+        size = poly.shape[1]
+        valid = np.arange(size)[None, :] < count[:, None]
+        nxt = (np.arange(size)[None, :] + 1) % np.maximum(count, 1)[:, None]
+        cur = poly
+        following = poly[rows[:, None], nxt]
+        # Знаковое расстояние до ребра b: >= 0 - внутри
+        side_cur = d[:, None, 0] * (cur[..., 1] - p[:, None, 1]) - d[:, None, 1] * (cur[..., 0] - p[:, None, 0])
+        side_nxt = side_cur[rows[:, None], nxt]
+        inside_cur = side_cur >= 0
+        inside_nxt = side_nxt >= 0
+        crosses = valid & (inside_cur != inside_nxt)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = side_cur / (side_cur - side_nxt)
+        t = np.where(crosses, t, 0.0)
+        point = cur + t[..., None] * (following - cur)
+
+        # На каждую вершину два слота: сама вершина и точка пересечения ребра
+        out = np.stack((cur, point), axis=2).reshape((m, 2 * size, 2))
+        keep = np.stack((valid & inside_cur, crosses), axis=2).reshape((m, 2 * size))
+        order = np.argsort(~keep, axis=1, kind="stable")[:, :size + 1]
+        poly = out[rows[:, None], order]
+        count = np.minimum(keep.sum(axis=1), size + 1)
+
+    # Пустые слоты заполняем первой вершиной: в формуле площади они дают ноль
+    size = poly.shape[1]
+    pad = np.arange(size)[None, :] >= count[:, None]
+    poly = np.where(pad[..., None], poly[:, :1], poly)
+    x = poly[..., 0]
+    y = poly[..., 1]
+    area = 0.5 * (x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1)
+    return np.where(count >= 3, np.maximum(area, 0.0), 0.0)
+
+
+def _face_areas(uv_faces: np.ndarray) -> np.ndarray:
+    a, b, c = uv_faces[:, 0], uv_faces[:, 1], uv_faces[:, 2]
+    return 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+
+
+def find_overlaps(uv_faces: np.ndarray, chunk: int = PAIR_CHUNK, max_pairs: int | None = None) -> OverlapPairs:
+    """Все пары UV треугольников, перекрывающихся по площади больше AREA_EPS.
+
+    max_pairs - бюджет пар-кандидатов (см. candidate_pairs), сверх него TooManyPairs.
+    """
+    uv_faces = np.asarray(uv_faces, dtype=np.float64)
+    area = _face_areas(uv_faces)
+    usable = np.flatnonzero(np.isfinite(uv_faces).all(axis=(1, 2)) & (area > AREA_EPS))
+    tris = _orient_ccw(uv_faces[usable])
+
+    found_pairs = []
+    found_areas = []
+    for pairs in candidate_pairs(tris, chunk, max_pairs):
+        ta = tris[pairs[:, 0]]
+        tb = tris[pairs[:, 1]]
+        hit = ~separated(ta, tb)
+        if not hit.any():
+            continue
+        pairs = pairs[hit]
+        areas = intersection_area(ta[hit], tb[hit])
+        positive = areas > AREA_EPS
+        found_pairs.append(usable[pairs[positive]])
+        found_areas.append(areas[positive])
+
+    if not found_pairs:
+        return OverlapPairs(np.zeros((0, 2), dtype=np.int64), np.zeros(0, dtype=np.float64))
+    return OverlapPairs(np.concatenate(found_pairs), np.concatenate(found_areas))
+
+
+def overlap_ratio(uv_faces: np.ndarray, overlaps: OverlapPairs) -> float:
+    """(сумма площадей - площадь объединения) / сумма площадей по найденным парам.
+
+    Треугольники вне пар ни с кем не перекрываются и в разность не входят.
+    Если каждая грань входит не больше чем в одну пару, тройных наложений нет
+    и разность равна сумме площадей пересечений. Иначе объединение строится
+    только по граням из пар.
+    """
+    uv_faces = np.asarray(uv_faces, dtype=np.float64)
+    area = _face_areas(uv_faces)
+    total = float(area[np.isfinite(area) & (area > AREA_EPS)].sum())
+    if total < AREA_EPS or len(overlaps.pairs) == 0:
+        return 0.0
+
+    faces, degree = np.unique(overlaps.pairs, return_counts=True)
+    if degree.max() == 1:
+        excess = float(overlaps.areas.sum())
+    else:
+        polygons = shapely.polygons(uv_faces[faces])
+        excess = float(area[faces].sum()) - float(shapely.area(shapely.union_all(polygons)))
+    return min(1.0, max(0.0, excess / total))
+
+
+def face_overlap_mask(n_faces: int, overlaps: OverlapPairs) -> np.ndarray:
+    mask = np.zeros(n_faces, dtype=bool)
+    mask[overlaps.pairs.reshape(-1)] = True
+    return mask
@@ -0,0 +1,153 @@
+from typing import Iterator, NamedTuple, Tuple
+
+import numpy as np
+
+# Сколько пар (пиксель, грань) проверять за один проход, чтобы ограничить память
+RASTER_CHUNK = 1 << 22
+# Не больше стольких покрытых пикселей на всю развертку (однократное покрытие растра 2048).
+# Сложенные друг на друга острова покрывают растр многократно: для них разрешение понижается
+RASTER_MAX_SAMPLES = 1 << 22
+RASTER_MIN_RESOLUTION = 16
+
+
+class Coverage(NamedTuple):
+    counts: np.ndarray
+    overlap_ratio: float
+    face_overlap: np.ndarray
+
+
+def to_pixels(uv_faces: np.ndarray, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Переводит UV треугольники в координаты растра по их общему ограничивающему прямоугольнику.
+
+    Возвращает треугольники (N, 3, 2) и маску треугольников с конечными координатами.
+    """
+    finite = np.isfinite(uv_faces).all(axis=(1, 2))
+    pts = np.zeros_like(uv_faces, dtype=np.float64)
+    if not finite.any():
+        return pts, finite
+    valid = uv_faces[finite]
+    mins = valid.min(axis=(0, 1))
+    span = valid.max(axis=(0, 1)) - mins
+    span[span == 0] = 1.0
+    pts[finite] = (valid - mins) / span * np.array([width, height], dtype=np.float64)
+    return pts, finite
+
+
+def _edge_coefficients(p: np.ndarray, q: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Коэффициенты A, B, C функции ребра A * x + B * y + C (> 0 слева от p -> q) и флаг правила заполнения.
+
+    Коэффициенты считаются от упорядоченной пары концов и затем меняют знак,
+    поэтому у двух треугольников с общим ребром значения в любой точке
+    отличаются ровно знаком: пиксель на ребре не учитывается дважды.
+    """
+    swap = (p[:, 0] > q[:, 0]) | ((p[:, 0] == q[:, 0]) & (p[:, 1] > q[:, 1]))
+    lo = np.where(swap[:, None], q, p)
+    hi = np.where(swap[:, None], p, q)
+    sign = np.where(swap, -1.0, 1.0)
+    a = sign * (lo[:, 1] - hi[:, 1])
+    b = sign * (hi[:, 0] - lo[:, 0])
+    c = sign * (lo[:, 0] * hi[:, 1] - lo[:, 1] * hi[:, 0])
+    # Ровно одно из двух направлений ребра считается "верхним или левым"
+    dx = q[:, 0] - p[:, 0]
+    dy = q[:, 1] - p[:, 1]
+    top_left = (dy < 0) | ((dy == 0) & (dx > 0))
+    return a, b, c, top_left
+
+
+def rasterize(tris: np.ndarray, width: int, height: int, chunk: int = RASTER_CHUNK) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Сканирующее преобразование треугольников в пиксельной сетке width x height.
+
+    Пиксель покрыт треугольником, если его центр лежит внутри. Выдает пары
+    массивов (индекс пикселя, индекс треугольника) порциями не больше chunk.
+    """
+    tris = np.asarray(tris, dtype=np.float64)
+    a = tris[:, 0]
+    b = tris[:, 1]
+    c = tris[:, 2]
+    area2 = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    # Приводим все треугольники к одной ориентации
+    flip = area2 < 0
+    b, c = np.where(flip[:, None], c, b), np.where(flip[:, None], b, c)
+    edges = [_edge_coefficients(p, q) for p, q in ((a, b), (b, c), (c, a))]
+
+    x0 = np.clip(np.ceil(tris[..., 0].min(axis=1) - 0.5), 0, width).astype(np.int64)
+    x1 = np.clip(np.floor(tris[..., 0].max(axis=1) - 0.5), -1, width - 1).astype(np.int64)
+    y0 = np.clip(np.ceil(tris[..., 1].min(axis=1) - 0.5), 0, height).astype(np.int64)
+    y1 = np.clip(np.floor(tris[..., 1].max(axis=1) - 0.5), -1, height - 1).astype(np.int64)
+    box_w = np.maximum(x1 - x0 + 1, 0)
+    box_h = np.maximum(y1 - y0 + 1, 0)
+    sizes = np.where(area2 != 0, box_w * box_h, 0)
+
+    candidates = np.flatnonzero(sizes)
+    if len(candidates) == 0:
+        return
+    bounds = np.cumsum(sizes[candidates])
+    start = 0
+    while start < len(candidates):
+        # Берем столько треугольников, сколько помещается в chunk (но хотя бы один)
+        base = bounds[start - 1] if start > 0 else 0
+        stop = max(start + 1, int(np.searchsorted(bounds, base + chunk, side="right")))
+        idx = candidates[start:stop]
+        start = stop
+
+        counts = sizes[idx]
+        face = np.repeat(idx, counts)
+        offsets = np.arange(counts.sum(), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        w = np.repeat(box_w[idx], counts)
+        py, px = np.divmod(offsets, w)
+        px += np.repeat(x0[idx], counts)
+        py += np.repeat(y0[idx], counts)
+        cx = px + 0.5
+        cy = py + 0.5
+
+        inside = np.ones(len(face), dtype=bool)
+        for ea, eb, ec, tl in edges:
+            e = np.repeat(ea[idx], counts) * cx
+            e += np.repeat(eb[idx], counts) * cy
+            e += np.repeat(ec[idx], counts)
+            inside &= (e > 0) | ((e == 0) & np.repeat(tl[idx], counts))
+
+        yield (py * width + px)[inside], face[inside]
+
+
+def _sample_resolution(uv_faces: np.ndarray, finite: np.ndarray, resolution: int, max_samples: int) -> int:
+    """Разрешение, при котором сумма площадей треугольников в пикселях не больше max_samples."""
+    tris, _ = to_pixels(uv_faces, 1, 1)
+    tris = tris[finite]
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    area = 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]))
+    samples = float(area.sum()) * resolution * resolution
+    if samples <= max_samples:
+        return resolution
+    return max(RASTER_MIN_RESOLUTION, int(resolution * np.sqrt(max_samples / samples)))
+
+
+def uv_coverage(uv_faces: np.ndarray, resolution: int, max_samples: int = RASTER_MAX_SAMPLES) -> Coverage:
+    """Растровая оценка перекрытий UV за один проход.
+
+    counts - сколько треугольников покрывает каждый пиксель, overlap_ratio -
+    доля покрытия, приходящаяся на наложения (аналог (сумма площадей - площадь
+    объединения) / сумма площадей), face_overlap - грани, попавшие в пиксели
+    с наложением. Если треугольники вместе покрывают больше max_samples
+    пикселей, разрешение понижается (counts тогда меньше resolution x resolution).
+    """
+    n_faces = len(uv_faces)
+    finite = np.isfinite(uv_faces).all(axis=(1, 2))
+    resolution = _sample_resolution(uv_faces, finite, resolution, max_samples)
+    tris, finite = to_pixels(uv_faces, resolution, resolution)
+    face_index = np.flatnonzero(finite)
+    counts = np.zeros(resolution * resolution, dtype=np.int32)
+    parts = []
+    for pix, face in rasterize(tris[finite], resolution, resolution):
+        counts += np.bincount(pix, minlength=counts.size).astype(np.int32)
+        parts.append((pix.astype(np.int32), face.astype(np.int32)))
+
+    face_overlap = np.zeros(n_faces, dtype=bool)
+    for pix, face in parts:
+        face_overlap[face_index[face[counts[pix] > 1]]] = True
+
+    total = int(counts.sum())
+    if total == 0:
+        return Coverage(counts, 0.0, face_overlap)
+    union = int(np.count_nonzero(counts))
+    return Coverage(counts, (total - union) / total, face_overlap)
@@ -0,0 +1,121 @@
+import io
+import os
+import uuid
+from typing import Iterator, List, TextIO, Tuple
+
+import numpy as np
+
+# Сколько треугольников форматировать за один вызов
+SVG_CHUNK = 20000
+STROKE_COLOR = "#33d17a"
+
+# Вершины после M идут как неявные L: "M x1 y1 x2 y2 x3 y3Z"
+_TRIANGLE = "M%.2f %.2f %.2f %.2f %.2f %.2fZ"
+
+
+def _fill(color: np.ndarray) -> str:
+    # Предполагаем, что color - это [R, G, B] или [R, G, B, A]
+    if len(color) > 3:
+        return f"rgba({int(color[0])},{int(color[1])},{int(color[2])},{color[3]/255.0:.2f})"
+    return f"rgb({int(color[0])},{int(color[1])},{int(color[2])})"
+
+
+def layout(tris: np.ndarray, colors: np.ndarray | None, size: int) -> Tuple[np.ndarray, np.ndarray | None]:
+    """UV треугольники в координаты SVG (ось V направлена вверх) с полем в 1 пиксель.
+
+    Треугольники с нечисловыми координатами отбрасываются вместе с их цветами.
+    """
+    mask = np.isfinite(tris).all(axis=(1, 2))
+    tris = tris[mask]
+    colors = colors[mask] if colors is not None else None
+    if tris.shape[0] == 0:
+        raise ValueError("no_uv")
+
+    mins = tris.min(axis=(0, 1))
+    span = tris.max(axis=(0, 1)) - mins
+    span[span == 0] = 1.0
+    pts = (tris - mins) / span
+    pts[..., 0] = pts[..., 0] * (size - 2.0) + 1.0
+    pts[..., 1] = (1.0 - pts[..., 1]) * (size - 2.0) + 1.0
+
+    # Одна ориентация у всех треугольников: в составном пути с правилом nonzero
+    # наложения одного цвета закрашиваются, а не вырезаются
+    a, b, c = pts[:, 0], pts[:, 1], pts[:, 2]
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    pts = np.where((cross < 0)[:, None, None], pts[:, ::-1], pts)
+    return pts, colors
+
+
+def _groups(colors: np.ndarray | None, n: int) -> List[Tuple[str, np.ndarray]]:
+    """Индексы треугольников по цветам заливки, в порядке первого появления цвета."""
+    if colors is None:
+        return [("none", np.arange(n))]
+    colors = np.asarray(colors)
+    if colors.dtype == np.uint8 and colors.shape[1] <= 4:
+        # RGBA упаковываем в одно число: unique по скаляру быстрее, чем по строкам
+        key = np.zeros((len(colors), 4), dtype=np.uint8)
+        key[:, :colors.shape[1]] = colors
+        key = key.view(np.uint32).reshape(-1)
+    else:
+        key = colors
+    _, first, inverse = np.unique(key, axis=0 if key.ndim > 1 else None, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.cumsum(np.bincount(inverse))
+    groups = []
+    for g in np.argsort(first):
+        start = bounds[g - 1] if g > 0 else 0
+        groups.append((_fill(colors[first[g]]), order[start:bounds[g]]))
+    return groups
+
+
+def _path_data(pts: np.ndarray, chunk: int) -> Iterator[str]:
+    for start in range(0, len(pts), chunk):
+        part = pts[start:start + chunk]
+        yield (_TRIANGLE * len(part)) % tuple(part.reshape(-1).tolist())
+
+
+def write_svg(out: TextIO, pts: np.ndarray, colors: np.ndarray | None, size: int, stroke: int, chunk: int = SVG_CHUNK):
+    """Пишет SVG порциями: фон, сетку и по одному составному пути на цвет заливки."""
+    w = float(size)
+    h = float(size)
+    out.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" viewBox="0 0 {size} {size}">')
+    out.write(f'<rect x="0" y="0" width="{size}" height="{size}" fill="#111"/>')
+    for i in range(11):
+        t = i / 10.0
+        gx = t * (w - 2.0) + 1.0
+        gy = t * (h - 2.0) + 1.0
+        out.write(f'<line x1="{gx:.2f}" y1="1" x2="{gx:.2f}" y2="{h-1:.2f}" stroke="#333" stroke-width="1"/>')
+        out.write(f'<line x1="1" y1="{gy:.2f}" x2="{w-1:.2f}" y2="{gy:.2f}" stroke="#333" stroke-width="1"/>')
+
+    out.write(f'<g stroke="{STROKE_COLOR}" stroke-width="{stroke}">')
+    for fill, idx in _groups(colors, len(pts)):
+        out.write(f'<path fill="{fill}" d="')
+        for data in _path_data(pts[idx], chunk):
+            out.write(data)
+        out.write('"/>')
+    out.write("</g></svg>")
+
+
+def render_uv_svg(tris: np.ndarray, colors: np.ndarray | None, size: int = 1024, stroke: int = 1) -> str:
+    pts, colors = layout(tris, colors, size)
+    buf = io.StringIO()
+    write_svg(buf, pts, colors, size, stroke)
+    return buf.getvalue()
+
+
+def save_uv_svg(path: str, tris: np.ndarray, colors: np.ndarray | None, size: int = 1024, stroke: int = 1):
+    """Пишет SVG прямо в файл, не собирая документ в памяти."""
+    # Ошибки входных данных должны возникать до того, как файл открыт на запись
+    pts, colors = layout(tris, colors, size)
+    # Файл может быть жесткой ссылкой на запись кэша результатов: пишем во временный
+    # и подменяем, а не перезаписываем общий inode
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            write_svg(f, pts, colors, size, stroke)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,140 @@
+import os
+import shutil
+import struct
+import uuid
+import zlib
+
+import numpy as np
+
+from src.analysis import uv_raster
+
+TILE_SIZE = 256
+# На последнем уровне изображение TILE_SIZE * 2 ** max_zoom пикселей по стороне
+MIN_ZOOM = 2
+MAX_ZOOM = 4
+# Сколько пикселей последнего уровня нужно в среднем на треугольник
+PIXELS_PER_FACE = 16
+PNG_LEVEL = 6
+
+BACKGROUND = np.array([17, 17, 17], dtype=np.float64)
+STROKE = np.array([0x33, 0xD1, 0x7A], dtype=np.uint8)
+# Сколько точек ребер рисовать за один проход
+EDGE_CHUNK = 1 << 22
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def zoom_for(n_faces: int) -> int:
+    """Наименьший уровень, на котором треугольнику в среднем достается PIXELS_PER_FACE пикселей."""
+    zoom = MIN_ZOOM
+    while zoom < MAX_ZOOM and (TILE_SIZE << zoom) ** 2 < n_faces * PIXELS_PER_FACE:
+        zoom += 1
+    return zoom
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+
+def encode_png(rgb: np.ndarray, level: int = PNG_LEVEL) -> bytes:
+    """RGB uint8 (H, W, 3) в PNG: 8 бит на канал, без фильтров строк, сжатие zlib."""
+    height, width = rgb.shape[:2]
+    raw = np.zeros((height, 1 + width * 3), dtype=np.uint8)
+    raw[:, 1:] = rgb.reshape((height, width * 3))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join((
+        _PNG_SIGNATURE,
+        _png_chunk(b"IHDR", header),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), level)),
+        _png_chunk(b"IEND", b""),
+    ))
+
+
+def _draw_edges(image: np.ndarray, tris: np.ndarray):
+    """Ребра треугольников цветом STROKE: точки с шагом не больше пикселя вдоль каждого ребра."""
+    height, width = image.shape[:2]
+    start = tris.reshape((-1, 2))
+    end = np.roll(tris, -1, axis=1).reshape((-1, 2))
+    steps = np.ceil(np.abs(end - start).max(axis=1)).astype(np.int64) + 1
+    bounds = np.cumsum(steps)
+    first = 0
+    done = 0
+    while first < len(steps):
+        stop = max(first + 1, int(np.searchsorted(bounds, done + EDGE_CHUNK, side="right")))
+        counts = steps[first:stop]
+        edge = np.repeat(np.arange(first, stop), counts)
+        k = np.arange(counts.sum(), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        t = (k / np.maximum(np.repeat(counts, counts) - 1, 1))[:, None]
+        pts = start[edge] + t * (end[edge] - start[edge])
+        x = np.clip(pts[:, 0].astype(np.int64), 0, width - 1)
+        y = np.clip(pts[:, 1].astype(np.int64), 0, height - 1)
+        image[y, x] = STROKE
+        done = int(bounds[stop - 1])
+        first = stop
+
+
+def render_image(uv_faces: np.ndarray, colors: np.ndarray | None, size: int) -> np.ndarray:
+    """Растровое изображение UV-развертки size x size (ось V вверх) в RGB uint8.
+
+    С цветами граней треугольники заливаются этими цветами поверх фона, без
+    цветов рисуются только ребра. Ребра в цветных режимах не рисуются: на
+    плотных развертках они закрыли бы заливку.
+    """
+    image = np.empty((size, size, 3), dtype=np.uint8)
+    image[:] = BACKGROUND.astype(np.uint8)
+    tris, finite = uv_raster.to_pixels(uv_faces, size, size)
+    index = np.flatnonzero(finite)
+    tris = tris[finite]
+    tris[..., 1] = size - tris[..., 1]
+    if len(tris) == 0:
+        raise ValueError("no_uv")
+
+    if colors is None:
+        _draw_edges(image, tris)
+        return image
+
+    colors = np.asarray(colors)[index]
+    if colors.shape[1] > 3:
+        alpha = colors[:, 3:4].astype(np.float64) / 255.0
+    else:
+        alpha = np.ones((len(colors), 1))
+    fill = (BACKGROUND * (1.0 - alpha) + colors[:, :3] * alpha).astype(np.uint8)
+    flat = image.reshape((-1, 3))
+    # Порции идут в порядке граней: как и в SVG, более поздняя грань рисуется поверх
+    for pix, face in uv_raster.rasterize(tris, size, size):
+        flat[pix] = fill[face]
+    return image
+
+
+def _downsample(image: np.ndarray) -> np.ndarray:
+    h, w = image.shape[:2]
+    blocks = image.reshape((h // 2, 2, w // 2, 2, 3)).astype(np.uint16)
+    return (blocks.sum(axis=(1, 3)) // 4).astype(np.uint8)
+
+
+def save_uv_tiles(out_dir: str, uv_faces: np.ndarray, colors: np.ndarray | None, max_zoom: int = MAX_ZOOM) -> int:
+    """Пирамида PNG-тайлов {out_dir}/{z}/{x}/{y}.png для уровней 0..max_zoom.
+
+    Уровень max_zoom растеризуется, остальные получаются уменьшением вдвое.
+    Каталог заменяется целиком после записи всех тайлов. Возвращает max_zoom.
+    """
+    image = render_image(uv_faces, colors, TILE_SIZE << max_zoom)
+    tmp_dir = f"{out_dir}.{uuid.uuid4().hex}.tmp"
+    try:
+        for z in range(max_zoom, -1, -1):
+            n = 1 << z
+            for x in range(n):
+                column = os.path.join(tmp_dir, str(z), str(x))
+                os.makedirs(column)
+                for y in range(n):
+                    tile = image[y * TILE_SIZE:(y + 1) * TILE_SIZE, x * TILE_SIZE:(x + 1) * TILE_SIZE]
+                    with open(os.path.join(column, f"{y}.png"), "wb") as f:
+                        f.write(encode_png(tile))
+            if z > 0:
+                image = _downsample(image)
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.replace(tmp_dir, out_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return max_zoom
@@ -0,0 +1,165 @@
+from typing import Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import breadth_first_order, connected_components
+
+
+def face_adjacency(faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Пары граней с общим ребром, признак несогласованной намотки пары и маска граней на границе.
+
+    Ребро считается общим, если оно встречается ровно у двух граней, как в
+    trimesh.graph.face_adjacency. Намотка пары несогласована, если общее ребро
+    пройдено обеими гранями в одном направлении. Грань на границе - у нее есть
+    ребро, которое встречается не ровно два раза: тело с такими гранями не замкнуто.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    n_faces = len(faces)
+    edges = faces[:, [0, 1, 1, 2, 2, 0]].reshape((-1, 2))
+    edges_face = np.repeat(np.arange(n_faces, dtype=np.int64), 3)
+    forward = edges[:, 0] < edges[:, 1]
+
+    lo = edges.min(axis=1)
+    hi = edges.max(axis=1)
+    key = lo * (int(faces.max(initial=0)) + 1) + hi
+
+    order = np.argsort(key, kind="stable")
+    key_sorted = key[order]
+    starts = np.flatnonzero(np.r_[True, key_sorted[1:] != key_sorted[:-1]])
+    counts = np.diff(np.r_[starts, len(key_sorted)])
+    edge_counts = np.empty(len(edges), dtype=np.int64)
+    edge_counts[order] = np.repeat(counts, counts)
+    open_faces = np.zeros(n_faces, dtype=bool)
+    open_faces[edges_face[edge_counts != 2]] = True
+
+    shared = starts[counts == 2]
+    first = order[shared]
+    second = order[shared + 1]
+    pairs = np.column_stack((edges_face[first], edges_face[second]))
+    inconsistent = forward[first] == forward[second]
+
+    nondegenerate = pairs[:, 0] != pairs[:, 1]
+    return pairs[nondegenerate], inconsistent[nondegenerate], open_faces
+
+
+def winding_flips(faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Маска граней, которые нужно развернуть для согласованной намотки.
+
+    Для каждой компоненты связности графа смежности граней ориентация берется
+    от грани с наименьшим индексом и распространяется по дереву обхода в ширину.
+    Четность разворотов вдоль дерева считается удвоением указателей, без
+    Python-циклов по граням. Кроме маски возвращает номер компоненты каждой
+    грани и маску граней на границе (см. face_adjacency).
+    """
+    n_faces = len(faces)
+    pairs, inconsistent, open_faces = face_adjacency(faces)
+    flips = np.zeros(n_faces, dtype=bool)
+    if n_faces == 0:
+        return flips, np.zeros(0, dtype=np.int64), open_faces
+    adjacency = coo_matrix(
+        (np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])),
+        shape=(n_faces, n_faces),
+    )
+    _, labels = connected_components(adjacency, directed=False)
+    if not np.any(inconsistent):
+        return flips, labels, open_faces
+
+    # Корень каждой компоненты соединяем с фиктивной вершиной n_faces,
+    # чтобы обойти весь лес одним поиском в ширину
+    roots = np.full(labels.max() + 1, n_faces, dtype=np.int64)
+    np.minimum.at(roots, labels, np.arange(n_faces, dtype=np.int64))
+
+    rows = np.r_[pairs[:, 0], np.full(len(roots), n_faces)]
+    cols = np.r_[pairs[:, 1], roots]
+    graph = coo_matrix(
+        (np.ones(len(rows), dtype=np.int8), (rows, cols)),
+        shape=(n_faces + 1, n_faces + 1),
+    ).tocsr()
+    _, predecessors = breadth_first_order(graph, n_faces, directed=False, return_predecessors=True)
+    parent = predecessors[:n_faces].astype(np.int64)
+
+    # Несогласованность ребра дерева (грань, родитель) ищем бинарным поиском по парам
+    width = n_faces + 1
+    pair_keys = np.r_[pairs[:, 0] * width + pairs[:, 1], pairs[:, 1] * width + pairs[:, 0]]
+    pair_values = np.r_[inconsistent, inconsistent]
+    order = np.argsort(pair_keys, kind="stable")
+    pair_keys = pair_keys[order]
+    pair_values = pair_values[order]
+
+    is_child = parent < n_faces
+    is_child &= parent >= 0
+    child = np.flatnonzero(is_child)
+    pos = np.searchsorted(pair_keys, child * width + parent[child])
+    parity = np.zeros(n_faces, dtype=bool)
+    parity[child] = pair_values[pos]
+
+    pointer = np.where(is_child, parent, np.arange(n_faces, dtype=np.int64))
+    while True:
+        jumped = pointer[pointer]
+        if np.array_equal(jumped, pointer):
+            break
+        parity ^= parity[pointer]
+        pointer = jumped
+    flips[:] = parity
+    return flips, labels, open_faces
+
+
+def signed_volume(vertices: np.ndarray, faces: np.ndarray) -> float:
+    return float(np.sum(face_volumes(vertices, faces)))
+
+
+def face_volumes(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Вклад каждой грани в ориентированный объем тела (тетраэдр с вершиной в начале координат)."""
+    tri = vertices[faces]
+    return np.einsum("ij,ij->i", tri[:, 0], np.cross(tri[:, 1], tri[:, 2])) / 6.0
+
+
+def orient_faces(vertices: np.ndarray, faces: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Согласует намотку граней и разворачивает замкнутые тела нормалями наружу.
+
+    Повторяет trimesh.repair.fix_winding + fix_normals по каждому телу отдельно:
+    знак объема считается для каждой компоненты связности, поэтому вывернутое
+    тело не переворачивает соседние. Возвращает новые грани и маску развернутых граней.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    flips, labels, open_faces = winding_flips(faces)
+    oriented = np.where(flips[:, None], faces[:, ::-1], faces)
+    if len(faces) == 0:
+        return oriented, flips
+    n_bodies = int(labels.max()) + 1
+    volumes = np.bincount(labels, weights=face_volumes(np.asarray(vertices, dtype=np.float64), oriented),
+                          minlength=n_bodies)
+    closed = np.bincount(labels, weights=open_faces, minlength=n_bodies) == 0
+    inside_out = (closed & (volumes < 0.0))[labels]
+    flips = flips ^ inside_out
+    oriented = np.where(inside_out[:, None], oriented[:, ::-1], oriented)
+    return oriented, flips
+
+
+def inverted_face_mask(faces: np.ndarray, old_normals: np.ndarray, flips: np.ndarray) -> np.ndarray:
+    """Грани, нормаль которых после исправления смотрит против исходной.
+
+    Исходная нормаль берется по отсортированному набору вершин грани, причем
+    для дубликатов побеждает последняя грань, как в прежнем словаре.
+    """
+    n_faces = len(faces)
+    if n_faces == 0:
+        return np.zeros(0, dtype=bool)
+    keys = np.sort(faces, axis=1)
+    width = int(keys.max(initial=0)) + 1
+    if width ** 3 < 2 ** 63:
+        keys = (keys[:, 0] * width + keys[:, 1]) * width + keys[:, 2]
+    else:
+        keys = np.unique(keys, axis=0, return_inverse=True)[1].reshape(-1)
+
+    # Стабильная сортировка сохраняет порядок дубликатов: последняя грань группы - ее конец
+    order = np.argsort(keys, kind="stable")
+    keys_sorted = keys[order]
+    group = np.cumsum(np.r_[False, keys_sorted[1:] != keys_sorted[:-1]])
+    ends = np.flatnonzero(np.r_[keys_sorted[1:] != keys_sorted[:-1], True])
+    last = np.empty(n_faces, dtype=np.int64)
+    last[order] = order[ends][group]
+
+    new_normals = np.where(flips[:, None], -old_normals, old_normals)
+    joined = old_normals[last]
+    return np.einsum("ij,ij->i", joined, new_normals) < -0.5
@@ -3,7 +3,8 @@ from typing import Annotated
 from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.authorization.security import verify_password, get_tokens, refresh_token, get_password_hash
+from src.authorization.security import verify_password, get_tokens, refresh_token, get_password_hash, HashingBusy
+from src.config import settings
 from src.database import schemas
 from src.database.db_main import get_session
 from src.database.repositories import AuthRepository
@@ -15,6 +16,11 @@ router = APIRouter(
 )
 
 
+def _busy() -> HTTPException:
+    return HTTPException(status_code=429, detail="Too many login attempts, retry later",
+                         headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)})
+
+
 async def get_auth_repo(session: AsyncSession = Depends(get_session)) -> AuthRepository:
     return AuthRepository(session)
 
@@ -23,7 +29,11 @@ async def get_auth_repo(session: AsyncSession = Depends(get_session)) -> AuthRep
 async def login(data: schemas.AuthAddSchema, repo: AuthRepository = Depends(get_auth_repo)):
     user = await repo.get_by_login(data.login)
 
-    if not user or not await verify_password(data.password, user.password):
+    try:
+        verified = bool(user) and await verify_password(data.password, user.password)
+    except HashingBusy:
+        raise _busy()
+    if not verified:
         raise HTTPException(status_code=401, detail="Incorrect login or password")
 
     response = await get_tokens(user.id)
@@ -46,7 +56,10 @@ async def register(data: schemas.AuthAddSchema, repo: AuthRepository = Depends(g
     if existing:
         raise HTTPException(status_code=409, detail="User already exists")
 
-    password_hash = await get_password_hash(data.password)
+    try:
+        password_hash = await get_password_hash(data.password)
+    except HashingBusy:
+        raise _busy()
     user = await repo.create_user(login=data.login, password_hash=password_hash)
 
     response = await get_tokens(user.id)
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 from passlib.context import CryptContext
@@ -7,8 +9,70 @@ from fastapi import Request
 from fastapi.responses import JSONResponse
 
 from src.config import settings
+from src import monitoring
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+
+def make_pwd_context(time_cost: int = settings.ARGON2_TIME_COST,
+                     memory_cost: int = settings.ARGON2_MEMORY_COST,
+                     parallelism: int = settings.ARGON2_PARALLELISM) -> CryptContext:
+    return CryptContext(schemes=["argon2"], deprecated="auto",
+                        argon2__time_cost=time_cost,
+                        argon2__memory_cost=memory_cost,
+                        argon2__parallelism=parallelism)
+
+
+pwd_context = make_pwd_context()
+
+
+class HashingBusy(Exception):
+    """Очередь хэширования паролей заполнена."""
+
+
+class PasswordHasher:
+    """Хэширование и проверка паролей в отдельном пуле потоков.
+
+    argon2 занимает десятки миллисекунд CPU и в корутине блокировал бы цикл событий.
+    argon2-cffi отпускает GIL, поэтому потоки считают параллельно. Если ожидающих
+    запросов уже max_queue, новый сразу получает HashingBusy, а не встает в очередь.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, max_queue: int):
+        self.context = context
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password_hash")
+        # Меняется только из цикла событий, блокировка не нужна
+        self.pending = 0
+
+    async def _run(self, op: str, fn, *args):
+        if self.pending >= self.max_queue:
+            PASSWORD_HASH_REJECTED.inc(op=op)
+            raise HashingBusy()
+        self.pending += 1
+        try:
+            with PASSWORD_HASH_SECONDS.time(op=op):
+                return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", self.context.verify, plain_password, hashed_password)
+
+    async def hash(self, plain_password: str) -> str:
+        return await self._run("hash", self.context.hash, plain_password)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+PASSWORD_HASH_SECONDS = monitoring.Histogram(
+    "password_hash_seconds", "Password hash/verify time including pool queueing", ("op",))
+PASSWORD_HASH_REJECTED = monitoring.Counter(
+    "password_hash_rejected_total", "Password hash/verify requests rejected by the queue limit", ("op",))
+PASSWORD_HASH_PENDING = monitoring.Gauge(
+    "password_hash_pending", "Password hash/verify requests running or queued")
+
+password_hasher = PasswordHasher(pwd_context, settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+monitoring.COLLECTORS.append(lambda: PASSWORD_HASH_PENDING.set(password_hasher.pending))
 
 auth_config = AuthXConfig()
 auth_config.JWT_SECRET_KEY = settings.JWT_SECRET_KEY
@@ -22,11 +86,11 @@ security = AuthX(config=auth_config)
 
 
 async def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return await password_hasher.verify(plain_password, hashed_password)
 
 
 async def get_password_hash(plain_password: str) -> str:
-    return pwd_context.hash(plain_password)
+    return await password_hasher.hash(plain_password)
 
 
 async def get_tokens(uid: Mapped[int]):
@@ -3,6 +3,31 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     JWT_SECRET_KEY: str
     DATABASE_URL: str
+    ANALYSIS_WORKERS: int = 2
+    # None - по числу ядер, 0 - без пула процессов
+    ANALYSIS_PROCESSES: int | None = None
+    ANALYSIS_CACHE_DIR: str = "analysis_cache"
+    ANALYSIS_CACHE_MAX_BYTES: int = 10 * 1024 ** 3
+    # Общий бюджет памяти на разобранные модели (байты массивов NumPy). Кэш свой в каждом
+    # процессе: API и каждый процесс пула получают по ANALYSIS_CONTEXT_CACHE_BYTES / (процессов пула + 1)
+    ANALYSIS_CONTEXT_CACHE_BYTES: int = 1024 ** 3
+    MAX_UPLOAD_BYTES: int = 1024 ** 3
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    UPLOAD_SESSIONS_DIR: str = "upload_sessions"
+    BLOB_STORE_DIR: str = "blobs"
+    UPLOAD_SESSION_CHUNK_SIZE: int = 8 * 1024 * 1024
+    UPLOAD_SESSION_TTL: int = 24 * 3600
+    # Размер страницы списка моделей по умолчанию и наибольший
+    MODELS_PAGE_SIZE: int = 100
+    MODELS_PAGE_MAX: int = 1000
+    # Стоимость argon2 для новых хэшей (старые проверяются со своими параметрами из хэша)
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 64 * 1024  # КиБ
+    ARGON2_PARALLELISM: int = 4
+    # Пул потоков для хэширования паролей и предел ожидающих запросов, сверх него - 429
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_RETRY_AFTER: int = 1
 
     model_config = SettingsConfigDict(env_file=".env")
 
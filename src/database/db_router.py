@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from sqlalchemy import inspect, text
 
 from src.database.db_main import engine
 from src.database import models
@@ -6,8 +7,43 @@ from src.database import models
 router = APIRouter(prefix="/database", tags=["Database"])
 
 
-@router.post("/init")
-async def create_tables():
+def _add_missing_columns(conn):
+    """Добавляет в уже существующие таблицы колонки, которые появились в моделях позже.
+
+    Так добавляются только nullable колонки без значения по умолчанию: у старых
+    строк в них будет NULL (например, content_hash моделей, загруженных до
+    хранилища blob, - такие модели работают с файлом напрямую).
+    """
+    inspector = inspect(conn)
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable or column.server_default is not None:
+                raise RuntimeError(f"Cannot add column {table.name}.{column.name} automatically")
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+
+def _create_missing_indexes(conn):
+    # create_all не трогает уже существующие таблицы: новые индексы добавляем отдельно
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+async def init_database():
+    """Создает недостающие таблицы, колонки и индексы. Вызывается при старте приложения."""
     async with engine.begin() as conn:
         await conn.run_sync(models.Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+
+
+@router.post("/init")
+async def create_tables():
+    await init_database()
     return {"OK": True}
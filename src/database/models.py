@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import JSON, ForeignKey
+from sqlalchemy import JSON, ForeignKey, Index, String
 from src.database.db_main import Base
 
 
@@ -13,9 +13,16 @@ class AuthModel(Base):
 
 class ModelsModel(Base):
     __tablename__ = "models_database"
+    __table_args__ = (
+        # Список моделей пользователя по id (keyset-пагинация) и поиск по началу имени
+        Index("ix_models_database_user_id_id", "user_id", "id"),
+        Index("ix_models_database_user_id_name", "user_id", "name"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("auth_database.id"))
     name: Mapped[str]
     stored_name: Mapped[str]
+    # sha256 файла: модели с одинаковым содержимым ссылаются на один blob
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
     report: Mapped[dict | None] = mapped_column(JSON, nullable=True)
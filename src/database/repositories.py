@@ -1,5 +1,5 @@
-from typing import Generic, TypeVar, Optional
-from sqlalchemy import select
+from typing import Generic, TypeVar, Optional, Sequence
+from sqlalchemy import select, func, update, delete, Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import AuthModel, ModelsModel
@@ -49,28 +49,67 @@ class ModelsRepository(BaseRepository[ModelsModel]):
         result = await self.session.execute(select(ModelsModel).where(ModelsModel.id == id))
         return result.scalar_one_or_none()
 
-    async def get_by_user(self, user_id: int):
-        result = await self.session.execute(select(ModelsModel.id, ModelsModel.name).where(ModelsModel.user_id == user_id))
+    async def get_owned(self, model_id: int, user_id: int, *fields: str,
+                        report_keys: Sequence[str] = ()) -> Optional[Row]:
+        """Только нужные поля модели пользователя; None, если модели нет или она чужая.
+
+        fields - имена колонок ModelsModel. report_keys - ключи верхнего уровня отчета,
+        которые достаются из JSON в самой базе: отчет целиком не читается и не разбирается.
+        Значения доступны как row.<поле> и row._mapping[<ключ отчета>].
+        """
+        columns = [getattr(ModelsModel, field) for field in fields]
+        columns += [ModelsModel.report[key].label(key) for key in report_keys]
+        result = await self.session.execute(
+            select(*columns).where(ModelsModel.id == model_id, ModelsModel.user_id == user_id)
+        )
+        return result.one_or_none()
+
+    async def get_owned_by_stored_name(self, stored_name: str, user_id: int, *fields: str) -> Optional[Row]:
+        """Как get_owned, но модель ищется по имени файла (stored_name) в ссылках на артефакты."""
+        columns = [getattr(ModelsModel, field) for field in fields] or [ModelsModel.id]
+        result = await self.session.execute(
+            select(*columns).where(ModelsModel.stored_name == stored_name, ModelsModel.user_id == user_id)
+        )
+        return result.one_or_none()
+
+    async def get_by_user(self, user_id: int, limit: int | None = None, after_id: int | None = None,
+                          name_prefix: str | None = None):
+        """id и имена моделей пользователя по возрастанию id.
+
+        Страница - limit строк с id больше after_id (keyset: индекс user_id, id,
+        без OFFSET). name_prefix отбирает имена, начинающиеся с него (с учетом регистра):
+        условие записано диапазоном, чтобы работал индекс user_id, name.
+        """
+        query = select(ModelsModel.id, ModelsModel.name).where(ModelsModel.user_id == user_id)
+        if after_id is not None:
+            query = query.where(ModelsModel.id > after_id)
+        if name_prefix:
+            query = query.where(ModelsModel.name >= name_prefix, ModelsModel.name < name_prefix + "\U0010ffff")
+        query = query.order_by(ModelsModel.id).limit(limit)
+        result = await self.session.execute(query)
         return result.all()
 
-    async def create_model(self, user_id: int, name: str, stored_name: str, report: dict | None = None) -> ModelsModel:
-        model = ModelsModel(user_id=user_id, name=name, stored_name=stored_name, report=report)
+    async def count_by_hash(self, content_hash: str) -> int:
+        result = await self.session.execute(
+            select(func.count()).select_from(ModelsModel).where(ModelsModel.content_hash == content_hash)
+        )
+        return result.scalar_one()
+
+    async def create_model(self, user_id: int, name: str, stored_name: str, report: dict | None = None,
+                           content_hash: str | None = None) -> ModelsModel:
+        model = ModelsModel(user_id=user_id, name=name, stored_name=stored_name, report=report, content_hash=content_hash)
         await self.add(model)
         await self.session.commit()
         return model
 
-    async def update_report(self, model_id: int, report: dict) -> Optional[ModelsModel]:
-        model = await self.get_by_id(model_id)
-        if not model:
-            return None
-        model.report = report
+    async def update_report(self, model_id: int, report: dict) -> bool:
+        result = await self.session.execute(
+            update(ModelsModel).where(ModelsModel.id == model_id).values(report=report)
+        )
         await self.session.commit()
-        return model
+        return result.rowcount > 0
 
     async def delete_model(self, model_id: int) -> bool:
-        model = await self.get_by_id(model_id)
-        if not model:
-            return False
-        await self.session.delete(model)
+        result = await self.session.execute(delete(ModelsModel).where(ModelsModel.id == model_id))
         await self.session.commit()
-        return True
+        return result.rowcount > 0
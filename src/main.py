@@ -1,18 +1,43 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from src.authorization.auth_router import router as auth_router
 from src.upload.upload_router import router as upload_router
 from src.analysis.analysis_router import router as analysis_router
-from src.database.db_router import router as db_router
+from src.database.db_router import router as db_router, init_database
+from src.analysis.jobs import job_manager
+from src.analysis import executor
+from src.authorization.security import password_hasher
+from src import monitoring
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Индексы из __table_args__ появляются и в уже существующей базе
+    await init_database()
+    executor.warm_up()
+    yield
+    job_manager.shutdown()
+    executor.shutdown()
+    password_hasher.shutdown()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(auth_router)
 app.include_router(upload_router)
 app.include_router(analysis_router)
 
 app.mount("/models", StaticFiles(directory="models"), name="models")
 
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Текстовый формат Prometheus: длительности этапов анализа, размеры моделей, латентность API
+    return PlainTextResponse(monitoring.render(), media_type="text/plain; version=0.0.4")
+
 origins = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
@@ -24,5 +49,6 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["Authorization", "X-Refresh-Token"]
+    expose_headers=["Authorization", "X-Refresh-Token", "X-Next-Cursor"]
 )
+app.add_middleware(monitoring.LatencyMiddleware)
@@ -0,0 +1,202 @@
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# Метрики процесса в текстовом формате Prometheus (без prometheus_client).
+# Значения живут в памяти процесса API; время задач из пула процессов
+# меряется в самих процессах и записывается здесь (см. executor.submit_all).
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+FACE_BUCKETS = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7)
+
+# Классы размера модели по числу граней: (верхняя граница, имя)
+SIZE_CLASSES = ((10_000, "small"), (100_000, "medium"), (1_000_000, "large"), (math.inf, "huge"))
+
+
+def size_class(faces: int) -> str:
+    for limit, name in SIZE_CLASSES:
+        if faces < limit:
+            return name
+    return SIZE_CLASSES[-1][1]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_max(self, value: float, **labels):
+        """Запоминает наибольшее из виденных значений (например, пик памяти)."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = max(self._values.get(key, value), value)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (счетчики по корзинам без накопления, сумма, количество)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def time(self, **labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s, n)) for k, (c, s, n) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+REGISTRY: List[_Metric] = []
+# Функции, которые перед выгрузкой обновляют метрики из чужих счетчиков (например, кэшей)
+COLLECTORS: List[Callable[[], None]] = []
+
+
+def render() -> str:
+    for collect in COLLECTORS:
+        collect()
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "analysis_stage_seconds", "Duration of analysis pipeline stages", ("stage", "size_class"))
+STAGE_PEAK_RSS = Gauge(
+    "analysis_stage_peak_rss_bytes", "Peak resident memory of the process that ran the stage", ("stage",))
+ANALYSIS_SECONDS = Histogram(
+    "analysis_seconds", "Duration of a whole analysis run", ("size_class",))
+ANALYSIS_FACES = Histogram(
+    "analysis_faces", "Face count of analyzed models", buckets=FACE_BUCKETS)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time until response headers, per router", ("router", "method", "status"))
+
+
+class LatencyMiddleware:
+    """ASGI middleware: время до начала ответа по роутерам.
+
+    Меряется до заголовков, а не до конца тела, чтобы потоки SSE не искажали латентность.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Роутер - первый сегмент шаблона пути (/analysis, /upload, ...)
+                path = getattr(scope.get("route"), "path", "")
+                router = path.strip("/").split("/")[0] or "other"
+                REQUEST_SECONDS.observe(time.perf_counter() - started, router=router,
+                                        method=scope["method"], status=message["status"])
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
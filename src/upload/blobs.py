@@ -0,0 +1,79 @@
+import asyncio
+import os
+import shutil
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+from src.analysis import mesh_cache
+from src.analysis.result_cache import link_or_copy
+from src.config import settings
+
+
+# Блокировки по хэшу и число их владельцев: запись исчезает вместе с последним
+_locks: Dict[str, asyncio.Lock] = {}
+_holders: Dict[str, int] = {}
+
+
+def blob_path(content_hash: str) -> str:
+    return os.path.join(settings.BLOB_STORE_DIR, content_hash[:2], content_hash)
+
+
+@asynccontextmanager
+async def hash_lock(content_hash: str) -> AsyncIterator[None]:
+    """Сериализует работу с одним blob в процессе.
+
+    Под ней идут store + link + запись модели в базу и, с другой стороны,
+    удаление модели + подсчет ссылок + release: иначе release может удалить
+    blob между store и link новой загрузки того же файла.
+    """
+    lock = _locks.setdefault(content_hash, asyncio.Lock())
+    _holders[content_hash] = _holders.get(content_hash, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _holders[content_hash] -= 1
+        if not _holders[content_hash]:
+            del _holders[content_hash]
+            del _locks[content_hash]
+
+
+def store(src_path: str, content_hash: str) -> str:
+    """Кладет файл в хранилище по его sha256 и возвращает путь к blob.
+
+    Если такой blob уже есть, src_path просто удаляется. Вызывать вне event loop
+    и под hash_lock.
+    """
+    path = blob_path(content_hash)
+    if os.path.exists(path):
+        os.remove(src_path)
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.replace(src_path, tmp_path)
+    except OSError:
+        # Другая файловая система: переносим копией
+        link_or_copy(src_path, tmp_path)
+        os.remove(src_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def link_model_file(content_hash: str, save_path: str):
+    """Файл модели - жесткая ссылка на blob (или копия, если ссылку сделать нельзя)."""
+    link_or_copy(blob_path(content_hash), save_path)
+
+
+def release(content_hash: str):
+    """Удаляет blob, на который больше не ссылается ни одна модель, и его mesh_cache.
+
+    Уже созданные файлы моделей - отдельные ссылки на тот же inode и не пострадают.
+    Вызывать под hash_lock.
+    """
+    try:
+        os.remove(blob_path(content_hash))
+    except FileNotFoundError:
+        pass
+    shutil.rmtree(mesh_cache.cache_dir(blob_path(content_hash), content_hash), ignore_errors=True)
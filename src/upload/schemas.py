@@ -0,0 +1,10 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class CreateUploadSession(BaseModel):
+    filename: str
+    size: int = Field(ge=1)
+
+class CompleteUpload(BaseModel):
+    # Если указан, sha256 собранного файла должен с ним совпасть
+    sha256: Optional[str] = None
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import math
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import List, Optional
+
+from src.config import settings
+
+SESSION_FILE = "session.json"
+CHUNK_SUFFIX = ".chunk"
+COPY_BUFFER = 1024 * 1024
+
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _session_dir(user_id: int, upload_id: str) -> Optional[str]:
+    # upload_id приходит из URL: допускаем только наш формат, чтобы не выйти за пределы каталога
+    if not _UPLOAD_ID.match(upload_id):
+        return None
+    return os.path.join(settings.UPLOAD_SESSIONS_DIR, str(user_id), upload_id)
+
+
+def chunk_path(user_id: int, upload_id: str, index: int) -> str:
+    return os.path.join(_session_dir(user_id, upload_id), f"{index}{CHUNK_SUFFIX}")
+
+
+def create_session(user_id: int, filename: str, size: int) -> dict:
+    """Заводит сессию загрузки: каталог с описанием и будущими частями файла."""
+    chunk_size = settings.UPLOAD_SESSION_CHUNK_SIZE
+    session = {
+        "upload_id": uuid.uuid4().hex,
+        "filename": filename,
+        "size": size,
+        "chunk_size": chunk_size,
+        "total_chunks": max(1, math.ceil(size / chunk_size)),
+        "created_at": time.time(),
+    }
+    session_dir = _session_dir(user_id, session["upload_id"])
+    os.makedirs(session_dir)
+    with open(os.path.join(session_dir, SESSION_FILE), "w", encoding="utf-8") as f:
+        json.dump(session, f)
+    return session
+
+
+def load_session(user_id: int, upload_id: str) -> Optional[dict]:
+    session_dir = _session_dir(user_id, upload_id)
+    if session_dir is None:
+        return None
+    try:
+        with open(os.path.join(session_dir, SESSION_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def chunk_length(session: dict, index: int) -> int:
+    """Ожидаемый размер части: все части по chunk_size, кроме последней."""
+    if index < 0 or index >= session["total_chunks"]:
+        raise ValueError(f"Chunk index must be in [0, {session['total_chunks'] - 1}]")
+    if index < session["total_chunks"] - 1:
+        return session["chunk_size"]
+    return session["size"] - session["chunk_size"] * (session["total_chunks"] - 1)
+
+
+def received_chunks(user_id: int, upload_id: str) -> List[int]:
+    session_dir = _session_dir(user_id, upload_id)
+    received = []
+    for name in os.listdir(session_dir):
+        if name.endswith(CHUNK_SUFFIX):
+            received.append(int(name[:-len(CHUNK_SUFFIX)]))
+    return sorted(received)
+
+
+def assemble(user_id: int, upload_id: str, session: dict, save_path: str) -> str:
+    """Склеивает части в save_path и возвращает sha256 файла.
+
+    Части копируются буфером фиксированного размера во временный файл,
+    который затем атомарно переименовывается. Вызывать вне event loop.
+    """
+    missing = sorted(set(range(session["total_chunks"])) - set(received_chunks(user_id, upload_id)))
+    if missing:
+        raise ValueError(f"Missing chunks: {missing[:20]}")
+
+    tmp_path = f"{save_path}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as dst:
+            for index in range(session["total_chunks"]):
+                with open(chunk_path(user_id, upload_id, index), "rb") as src:
+                    while buf := src.read(COPY_BUFFER):
+                        digest.update(buf)
+                        dst.write(buf)
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest.hexdigest()
+
+
+def remove_session(user_id: int, upload_id: str):
+    session_dir = _session_dir(user_id, upload_id)
+    if session_dir is not None:
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def prune_sessions(ttl: int):
+    """Удаляет брошенные сессии старше ttl секунд."""
+    root = settings.UPLOAD_SESSIONS_DIR
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - ttl
+    for user in os.scandir(root):
+        if not user.is_dir():
+            continue
+        for entry in os.scandir(user.path):
+            try:
+                if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                continue
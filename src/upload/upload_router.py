@@ -1,19 +1,30 @@
+import asyncio
+import hashlib
 import os
 import uuid
 import shutil
+from typing import AsyncIterator
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, UploadFile, File, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.analysis.pipeline import build_mesh_cache
+from src.analysis.result_cache import result_cache
 from src.authorization.security import security
+from src.config import settings
 from src.database.db_main import get_session
 from src.database.repositories import ModelsRepository
+from src.upload import blobs, sessions
+from src.upload.schemas import CreateUploadSession, CompleteUpload
 
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
 ALLOWED_EXT = (".obj", ".fbx", ".glb", ".gltf")
 UPLOAD_ROOT = "models"
 
+# Сессии, которые сейчас собираются: повторный complete не должен создать вторую модель
+_completing: set = set()
+
 
 async def get_models_repo(session: AsyncSession = Depends(get_session)) -> ModelsRepository:
     return ModelsRepository(session)
@@ -23,17 +34,186 @@ async def get_current_user_id(token=Depends(security.access_token_required)):
     return int(token.sub)
 
 
+async def write_stream(chunks: AsyncIterator[bytes], save_path: str, max_bytes: int, min_bytes: int = 0) -> str:
+    """Пишет поток байтов на диск порциями и возвращает его sha256.
+
+    Запись идет во временный файл рядом с save_path в потоках, вне event loop,
+    и в конце атомарно переименовывается. Если данных больше max_bytes,
+    запись прерывается с 413, если меньше min_bytes - с 400; временный файл
+    при этом удаляется.
+    """
+    tmp_path = f"{save_path}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+    f = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File too large. Max size: {max_bytes} bytes")
+            digest.update(chunk)
+            await asyncio.to_thread(f.write, chunk)
+        if size < min_bytes:
+            raise HTTPException(status_code=400, detail=f"Incomplete data: got {size} of {min_bytes} bytes")
+        await asyncio.to_thread(f.close)
+        await asyncio.to_thread(os.replace, tmp_path, save_path)
+    except BaseException:
+        await asyncio.to_thread(f.close)
+        if os.path.exists(tmp_path):
+            await asyncio.to_thread(os.remove, tmp_path)
+        raise
+    return digest.hexdigest()
+
+
+def _store_model_file(save_path: str, content_hash: str):
+    """Переносит файл в хранилище blob и оставляет на его месте жесткую ссылку."""
+    blobs.store(save_path, content_hash)
+    blobs.link_model_file(content_hash, save_path)
+    # Хэш уже известен: анализу не придется перечитывать файл для ключа кэша
+    result_cache.remember_hash(save_path, content_hash)
+
+
+async def _create_from_blob(repo: ModelsRepository, save_path: str, digest: str, **fields):
+    """Кладет файл в хранилище blob и создает запись модели.
+
+    Оба шага идут под блокировкой хэша: удаление другой модели с тем же
+    содержимым не освободит blob, пока новая запись не попала в базу.
+    """
+    model_dir = os.path.dirname(save_path)
+    async with blobs.hash_lock(digest):
+        try:
+            await asyncio.to_thread(_store_model_file, save_path, digest)
+        except Exception as e:
+            shutil.rmtree(model_dir, ignore_errors=True)
+            raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+        return await repo.create_model(content_hash=digest, **fields)
+
+
+async def _read_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+def _check_extension(filename: str) -> str:
+    original_name = filename.lower()
+    if not original_name.endswith(ALLOWED_EXT):
+        raise HTTPException(status_code=400, detail="Invalid file format. Allowed: .obj, .fbx, .glb, .gltf")
+    return os.path.splitext(original_name)[1]
+
+
 @router.post("/")
 async def upload_model(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     user_id: int = Depends(get_current_user_id),
     repo: ModelsRepository = Depends(get_models_repo),
 ):
-    original_name = file.filename.lower()
-    if not original_name.endswith(ALLOWED_EXT):
-        raise HTTPException(status_code=400, detail="Invalid file format. Allowed: .obj, .fbx, .glb, .gltf")
+    extension = _check_extension(file.filename)
+    stored_name = f"{uuid.uuid4().hex}{extension}"
+
+    model_dir = os.path.join(UPLOAD_ROOT, str(user_id), stored_name)
+    os.makedirs(model_dir, exist_ok=True)
 
-    extension = os.path.splitext(original_name)[1]
+    save_path = os.path.join(model_dir, stored_name)
+
+    try:
+        digest = await write_stream(_read_upload(file), save_path, settings.MAX_UPLOAD_BYTES)
+    except HTTPException:
+        shutil.rmtree(model_dir, ignore_errors=True)
+        raise
+    except Exception as e:
+        shutil.rmtree(model_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+
+    new_model = await _create_from_blob(repo, save_path, digest, user_id=user_id, name=file.filename,
+                                        stored_name=stored_name)
+    # Разбор модели в бинарный кэш - после ответа, чтобы анализы не разбирали файл заново
+    background_tasks.add_task(build_mesh_cache, save_path, digest)
+
+    return {
+        "id": new_model.id,
+        "name": new_model.name,
+        "url": f"/models/{user_id}/{stored_name}/{stored_name}",
+    }
+
+
+@router.post("/sessions", status_code=201)
+async def create_upload_session(
+    body: CreateUploadSession,
+    user_id: int = Depends(get_current_user_id),
+):
+    """Начинает возобновляемую загрузку: файл передается частями по chunk_size байт."""
+    _check_extension(body.filename)
+    if body.size > settings.MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large. Max size: {settings.MAX_UPLOAD_BYTES} bytes")
+    await asyncio.to_thread(sessions.prune_sessions, settings.UPLOAD_SESSION_TTL)
+    return await asyncio.to_thread(sessions.create_session, user_id, body.filename, body.size)
+
+
+async def _get_upload_session(user_id: int, upload_id: str) -> dict:
+    session = await asyncio.to_thread(sessions.load_session, user_id, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+
+@router.put("/sessions/{upload_id}/chunks/{index}")
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    user_id: int = Depends(get_current_user_id),
+):
+    """Принимает одну часть в теле запроса. Части можно слать в любом порядке и параллельно,
+    повторная отправка части заменяет ее."""
+    session = await _get_upload_session(user_id, upload_id)
+    try:
+        expected = sessions.chunk_length(session, index)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    path = sessions.chunk_path(user_id, upload_id, index)
+    digest = await write_stream(request.stream(), path, max_bytes=expected, min_bytes=expected)
+    return {"index": index, "size": expected, "sha256": digest}
+
+
+@router.get("/sessions/{upload_id}")
+async def get_upload_session(
+    upload_id: str,
+    user_id: int = Depends(get_current_user_id),
+):
+    session = await _get_upload_session(user_id, upload_id)
+    received = await asyncio.to_thread(sessions.received_chunks, user_id, upload_id)
+    return {
+        **session,
+        "received": received,
+        "missing": session["total_chunks"] - len(received),
+    }
+
+
+@router.post("/sessions/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    body: CompleteUpload | None = None,
+    user_id: int = Depends(get_current_user_id),
+    repo: ModelsRepository = Depends(get_models_repo),
+):
+    """Собирает файл из частей в каталог модели и создает запись модели."""
+    session = await _get_upload_session(user_id, upload_id)
+    extension = _check_extension(session["filename"])
+    if upload_id in _completing:
+        raise HTTPException(status_code=409, detail="Upload is already being completed")
+    _completing.add(upload_id)
+    try:
+        return await _complete_upload(user_id, upload_id, session, extension, body, repo, background_tasks)
+    finally:
+        _completing.discard(upload_id)
+
+
+async def _complete_upload(user_id: int, upload_id: str, session: dict, extension: str,
+                           body: CompleteUpload | None, repo: ModelsRepository,
+                           background_tasks: BackgroundTasks) -> dict:
     stored_name = f"{uuid.uuid4().hex}{extension}"
 
     model_dir = os.path.join(UPLOAD_ROOT, str(user_id), stored_name)
@@ -42,33 +222,50 @@ async def upload_model(
     save_path = os.path.join(model_dir, stored_name)
 
     try:
-        file_bytes = await file.read()
-        with open(save_path, "wb") as f:
-            f.write(file_bytes)
+        digest = await asyncio.to_thread(sessions.assemble, user_id, upload_id, session, save_path)
+    except ValueError as e:
+        shutil.rmtree(model_dir, ignore_errors=True)
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
+        shutil.rmtree(model_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
 
-    new_model = await repo.create_model(
-        user_id=user_id,
-        name=file.filename,
-        stored_name=stored_name,
-    )
+    if body is not None and body.sha256 and body.sha256.lower() != digest:
+        # Части остаются в сессии: клиент может перезалить испорченные и повторить
+        shutil.rmtree(model_dir, ignore_errors=True)
+        raise HTTPException(status_code=422, detail="Checksum mismatch")
+
+    new_model = await _create_from_blob(repo, save_path, digest, user_id=user_id, name=session["filename"],
+                                        stored_name=stored_name)
+    await asyncio.to_thread(sessions.remove_session, user_id, upload_id)
+    background_tasks.add_task(build_mesh_cache, save_path, digest)
 
     return {
         "id": new_model.id,
         "name": new_model.name,
         "url": f"/models/{user_id}/{stored_name}/{stored_name}",
+        "sha256": digest,
     }
 
 
+@router.delete("/sessions/{upload_id}")
+async def abort_upload_session(
+    upload_id: str,
+    user_id: int = Depends(get_current_user_id),
+):
+    await _get_upload_session(user_id, upload_id)
+    await asyncio.to_thread(sessions.remove_session, user_id, upload_id)
+    return {"ok": True}
+
+
 @router.delete("/{model_id}")
 async def delete_model(
     model_id: int,
     user_id: int = Depends(get_current_user_id),
     repo: ModelsRepository = Depends(get_models_repo),
 ):
-    model = await repo.get_by_id(model_id)
-    if not model or model.user_id != user_id:
+    model = await repo.get_owned(model_id, user_id, "stored_name", "content_hash")
+    if not model:
         raise HTTPException(status_code=404, detail="Model not found")
 
     model_dir = os.path.join(UPLOAD_ROOT, str(user_id), model.stored_name)
@@ -81,7 +278,16 @@ async def delete_model(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
 
-    deleted = await repo.delete_model(model_id)
-    if not deleted:
-        raise HTTPException(status_code=404, detail="Model not found")
+    content_hash = model.content_hash
+    if not content_hash:
+        if not await repo.delete_model(model_id):
+            raise HTTPException(status_code=404, detail="Model not found")
+        return {"ok": True}
+    # Blob удаляется вместе с последней моделью, которая на него ссылается;
+    # подсчет ссылок и release - под той же блокировкой, что и загрузка
+    async with blobs.hash_lock(content_hash):
+        if not await repo.delete_model(model_id):
+            raise HTTPException(status_code=404, detail="Model not found")
+        if await repo.count_by_hash(content_hash) == 0:
+            await asyncio.to_thread(blobs.release, content_hash)
     return {"ok": True}
@@ -0,0 +1,81 @@
+import os
+import sys
+
+# Настройки читаются при импорте src.config: для тестов база и ключ не нужны,
+# а пул процессов выключен, чтобы задачи анализа шли в том же процессе
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-" + "x" * 32)
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("ANALYSIS_PROCESSES", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """TestClient приложения в пустом рабочем каталоге со своей базой SQLite.
+
+    Каталоги моделей, blob и кэшей в настройках относительные, поэтому тест
+    работает в tmp_path. Хэширование паролей дешевое, чтобы тесты шли быстро.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+
+    from src.analysis import jobs
+    from src.authorization import security
+    from src.database import db_main, db_router
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("models")
+    # NullPool: у каждого TestClient свой цикл событий, соединения между ними не переиспользуются
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    monkeypatch.setattr(db_main, "engine", engine)
+    monkeypatch.setattr(db_main, "new_session", sessions)
+    monkeypatch.setattr(db_router, "engine", engine)
+    monkeypatch.setattr(jobs, "new_session", sessions)
+    # Менеджер задач - один на процесс, а id моделей и пользователей в каждой базе начинаются с 1
+    for name in ("_jobs", "_tasks", "_model_locks", "_model_holders"):
+        monkeypatch.setattr(jobs.job_manager, name, {})
+    hasher = security.PasswordHasher(security.make_pwd_context(1, 8, 1), 2, 32)
+    monkeypatch.setattr(security, "password_hasher", hasher)
+
+    from src.main import app
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        hasher.shutdown()
+
+
+def register(client, login: str = "user", password: str = "password") -> dict:
+    """Регистрирует пользователя и возвращает заголовки с его access token."""
+    response = client.post("/authorization/register", json={"login": login, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": response.headers["Authorization"]}
+
+
+def upload_model(client, headers: dict, tmp_path, faces: int = 200, name: str = "grid.glb") -> int:
+    """Загружает синтетическую UV-сетку и возвращает id модели."""
+    from benchmarks import synthetic
+
+    path = synthetic.export(str(tmp_path / name), synthetic.uv_grid(faces))
+    with open(path, "rb") as f:
+        response = client.post("/upload/", files={"file": (name, f.read())}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def wait_job(client, headers: dict, job_id: str, timeout: float = 30.0) -> dict:
+    """Опрашивает задачу анализа, пока она не завершится."""
+    import time
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/analysis/jobs/{job_id}", headers=headers).json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks import synthetic
+from src.analysis import mesh_utils
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    return synthetic.export(str(tmp_path / "grid.glb"), synthetic.uv_grid(400))
+
+
+def test_file_is_parsed_once_for_all_metrics(model_path, monkeypatch):
+    """Все метрики и визуализации одного контекста используют одну разобранную сцену."""
+    calls = []
+    load = mesh_utils.load_mesh_raw
+    monkeypatch.setattr(mesh_utils, "load_mesh_raw", lambda path: calls.append(path) or load(path))
+    ctx = mesh_utils.AnalysisContext(model_path, use_mesh_cache=False)
+    ctx.uv_overlap()
+    ctx.uv_distortion()
+    ctx.texel_density()
+    ctx.uv_svg(mode="overlap")
+    mesh_utils.compute_metrics(ctx.mesh)
+    assert calls == [model_path]
+
+
+def test_context_matches_per_path_functions(model_path):
+    ctx = mesh_utils.AnalysisContext(model_path, use_mesh_cache=False)
+    assert ctx.uv_overlap() == pytest.approx(mesh_utils.compute_uv_overlap_from_path(model_path))
+    assert ctx.uv_distortion() == pytest.approx(mesh_utils.compute_uv_distortion_from_path(model_path))
+    assert ctx.texel_density() == pytest.approx(mesh_utils.compute_texel_density_from_path(model_path))
+    assert ctx.uv_svg() == mesh_utils.generate_uv_svg_from_path(model_path)
+
+
+def test_uv_grid_defects_are_measured(model_path):
+    ctx = mesh_utils.AnalysisContext(model_path, use_mesh_cache=False)
+    assert ctx.has_uv
+    assert 0.0 < ctx.uv_overlap() < 1.0
+    assert ctx.uv_distortion() > 0.0
@@ -0,0 +1,44 @@
+from conftest import register, upload_model, wait_job
+
+PARAMS = {"game_type": "indie", "usage_area": "prop"}
+
+
+def test_analyze_runs_in_background_and_saves_report(client, tmp_path):
+    headers = register(client)
+    model_id = upload_model(client, headers, tmp_path)
+    response = client.post(f"/analysis/models/{model_id}/analyze", json=PARAMS, headers=headers)
+    assert response.status_code == 202
+    assert response.json()["status"] == "queued"
+
+    job = wait_job(client, headers, response.json()["job_id"])
+    assert job["status"] == "done", job.get("error")
+    assert job["model_id"] == model_id
+    assert job["started_at"] <= job["finished_at"]
+    assert job["report"]["metrics"]["faces"] == 200
+
+    saved = client.get(f"/analysis/models/{model_id}/analysis", headers=headers).json()
+    assert saved["metrics"] == job["report"]["metrics"]
+    jobs = client.get(f"/analysis/models/{model_id}/jobs", headers=headers).json()
+    assert [j["job_id"] for j in jobs] == [job["job_id"]]
+
+
+def test_jobs_are_private(client, tmp_path):
+    owner = register(client)
+    other = register(client, "other")
+    model_id = upload_model(client, owner, tmp_path)
+    assert client.post(f"/analysis/models/{model_id}/analyze", json=PARAMS, headers=other).status_code == 404
+
+    job_id = client.post(f"/analysis/models/{model_id}/analyze", json=PARAMS, headers=owner).json()["job_id"]
+    wait_job(client, owner, job_id)
+    assert client.get(f"/analysis/jobs/{job_id}", headers=other).status_code == 404
+    assert client.get(f"/analysis/jobs/{job_id}/events", headers=other).status_code == 404
+    assert client.get(f"/analysis/models/{model_id}/jobs", headers=other).json() == []
+
+
+def test_invalid_profile_is_rejected_before_queueing(client, tmp_path):
+    headers = register(client)
+    model_id = upload_model(client, headers, tmp_path)
+    response = client.post(f"/analysis/models/{model_id}/analyze", json={"game_type": "mmo", "usage_area": "prop"},
+                           headers=headers)
+    assert response.status_code in (400, 422)
+    assert client.get(f"/analysis/models/{model_id}/jobs", headers=headers).json() == []
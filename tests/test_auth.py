@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from conftest import register
+from src.authorization import security
+from src.config import settings
+
+
+def test_busy_hasher_returns_429_with_retry_after(client, monkeypatch):
+    register(client)
+    monkeypatch.setattr(security.password_hasher, "max_queue", 0)
+    for path, login in (("/authorization/login", "user"), ("/authorization/register", "user2")):
+        response = client.post(path, json={"login": login, "password": "password"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == str(settings.PASSWORD_HASH_RETRY_AFTER)
+
+
+def test_login_verifies_in_pool(client):
+    register(client)
+    assert client.post("/authorization/login", json={"login": "user", "password": "password"}).status_code == 200
+    assert client.post("/authorization/login", json={"login": "user", "password": "wrong"}).status_code == 401
+
+
+def test_hasher_rejects_over_queue_limit():
+    hasher = security.PasswordHasher(security.make_pwd_context(1, 8, 1), 1, 2)
+
+    async def run():
+        started = asyncio.Event()
+        release = asyncio.Event()
+        loop = asyncio.get_running_loop()
+
+        def slow(value):
+            loop.call_soon_threadsafe(started.set)
+            asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+            return value
+
+        first = asyncio.create_task(hasher._run("hash", slow, 1))
+        await started.wait()
+        # Второй ждет в очереди пула, третий уже не помещается в лимит
+        second = asyncio.create_task(hasher._run("hash", lambda: 2))
+        await asyncio.sleep(0)
+        assert hasher.pending == 2
+        with pytest.raises(security.HashingBusy):
+            await hasher._run("hash", lambda: 3)
+        release.set()
+        assert await first == 1 and await second == 2
+        assert hasher.pending == 0
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,63 @@
+import asyncio
+import os
+
+from benchmarks import synthetic
+from src.analysis import mesh_cache, mesh_utils
+from src.upload import blobs
+
+
+def test_release_waits_for_store_and_link(tmp_path, monkeypatch):
+    """Удаление последней модели не освобождает blob посреди загрузки того же файла."""
+    monkeypatch.setattr(blobs.settings, "BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    h = "ab" * 32
+    first = tmp_path / "first"
+    first.write_bytes(b"model")
+    blobs.store(str(first), h)
+    second = tmp_path / "second"
+    second.write_bytes(b"model")
+    linked = str(tmp_path / "linked")
+
+    async def upload(started: asyncio.Event):
+        async with blobs.hash_lock(h):
+            started.set()
+            blobs.store(str(second), h)
+            await asyncio.sleep(0.01)
+            blobs.link_model_file(h, linked)
+
+    async def delete():
+        async with blobs.hash_lock(h):
+            if not os.path.exists(linked):
+                blobs.release(h)
+
+    async def main():
+        started = asyncio.Event()
+        task = asyncio.create_task(upload(started))
+        await started.wait()
+        await delete()
+        await task
+
+    asyncio.run(main())
+    assert os.path.exists(blobs.blob_path(h))
+    assert os.path.samefile(blobs.blob_path(h), linked)
+    assert not blobs._locks
+
+
+def test_mesh_cache_shared_by_content_hash(tmp_path, monkeypatch):
+    """Модели с одним blob используют один mesh_cache, release удаляет его вместе с blob."""
+    monkeypatch.setattr(blobs.settings, "BLOB_STORE_DIR", str(tmp_path / "blobs"))
+    h = "cd" * 32
+    src = synthetic.export(str(tmp_path / "upload.glb"), synthetic.uv_grid(200))
+    blobs.store(src, h)
+    paths = [str(tmp_path / f"{i}.glb") for i in range(2)]
+    for path in paths:
+        blobs.link_model_file(h, path)
+
+    mesh_utils.write_mesh_cache(paths[0], h)
+    shared = mesh_cache.cache_dir(paths[0], h)
+    assert os.path.isdir(shared)
+    assert mesh_cache.load(paths[1], h) is not None
+    assert not os.path.exists(mesh_cache.cache_dir(paths[1]))
+    assert mesh_utils.AnalysisContext(paths[1], content_hash=h).cached_arrays is not None
+
+    blobs.release(h)
+    assert not os.path.exists(shared)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from src.analysis import colormap
+
+
+def _reference(values, palette, diverging):
+    """Покомпонентное смешивание по одной грани, как до векторизации."""
+    pal = colormap.get_palette(palette)
+    out = []
+    for v in values:
+        v = 0.0 if np.isnan(v) else float(v)
+        if diverging:
+            v = min(max(v, -1.0), 1.0)
+            target = pal.low if v < 0 else pal.high
+        else:
+            v = min(max(v, 0.0), 1.0)
+            target = pal.high
+        t = abs(v)
+        out.append([int(b * (1.0 - t) + c * t) for b, c in zip(pal.base.tolist(), target.tolist())])
+    return np.array(out, dtype=np.uint8)
+
+
+VALUES = np.concatenate([np.linspace(-1.5, 1.5, 301), [np.nan, -0.0, 1e-9, -1e-9]])
+
+
+@pytest.mark.parametrize("palette", sorted(colormap.PALETTES))
+def test_vectorized_matches_per_face_blend(palette):
+    assert np.array_equal(colormap.diverging(VALUES, palette), _reference(VALUES, palette, True))
+    assert np.array_equal(colormap.sequential(VALUES, palette), _reference(VALUES, palette, False))
+
+
+def test_custom_palette_and_shape():
+    palette = colormap.make_palette([0, 0, 0, 255], [255, 0, 0, 255], [0, 0, 255, 255])
+    colors = colormap.diverging(np.array([-1.0, 0.0, 0.5]), palette)
+    assert colors.dtype == np.uint8 and colors.shape == (3, 4)
+    assert colors.tolist() == [[255, 0, 0, 255], [0, 0, 0, 255], [0, 0, 127, 255]]
+    assert colormap.diverging(np.zeros(0), palette).shape == (0, 4)
+
+
+def test_unknown_palette():
+    with pytest.raises(ValueError):
+        colormap.sequential(np.zeros(3), "no-such-palette")
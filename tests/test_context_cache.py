@@ -0,0 +1,78 @@
+from benchmarks import synthetic
+from src.analysis import context_cache as context_cache_module, mesh_utils
+from src.analysis.context_cache import ContextCache
+from src.analysis.executor import pool_size
+from src.config import settings
+
+
+def test_budget_is_split_between_processes():
+    expected = settings.ANALYSIS_CONTEXT_CACHE_BYTES // (pool_size() + 1)
+    assert context_cache_module.context_cache.max_bytes == expected
+
+
+def test_uv_tasks_do_not_build_merged_mesh(tmp_path):
+    path = synthetic.export(str(tmp_path / "grid.glb"), synthetic.uv_grid(200))
+    cache = ContextCache(1024 ** 3)
+    ctx = cache.get(path, merged=False)
+    assert "merged" not in ctx.__dict__
+    assert ctx.uv_overlap() >= 0.0
+    assert "merged" not in ctx.__dict__
+    # Для сохранения мешей объединенный меш строится по требованию
+    assert cache.get(path).merged.mesh.faces.shape[0] > 0
+
+
+def _models(tmp_path, count):
+    return [synthetic.export(str(tmp_path / f"m{i}.glb"), synthetic.uv_grid(200, seed=i)) for i in range(count)]
+
+
+def test_hit_reuses_parsed_model(tmp_path):
+    path, = _models(tmp_path, 1)
+    cache = ContextCache(1024 ** 3)
+    first = cache.get(path)
+    second = cache.get(path, uv_overlap_method="raster")
+    assert second.geometries is first.geometries
+    assert second.uv_overlap_method == "raster" and first.uv_overlap_method == "auto"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_are_evicted_over_budget(tmp_path):
+    paths = _models(tmp_path, 3)
+    cache = ContextCache(1024 ** 3)
+    one = context_cache_module.context_bytes(cache.get(paths[0]))
+    cache.clear()
+    cache.max_bytes = int(one * 2.5)
+    for path in paths[:2]:
+        cache.get(path)
+    cache.get(paths[0])
+    cache.get(paths[2])
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+    assert stats["bytes"] <= cache.max_bytes
+    # Вытеснена давно не использованная m1, m0 осталась: повторный get - попадание
+    hits = cache.hits
+    cache.get(paths[0])
+    assert cache.hits == hits + 1
+
+    # Запись больше бюджета остается, пока она самая свежая
+    cache.max_bytes = 1
+    cache.get(paths[1])
+    assert cache.stats()["entries"] == 1
+
+
+def test_changed_file_replaces_entry(tmp_path):
+    path, = _models(tmp_path, 1)
+    cache = ContextCache(1024 ** 3)
+    first = cache.get(path)
+    synthetic.export(path, synthetic.uv_grid(800))
+    second = cache.get(path)
+    assert second.geometries is not first.geometries
+    assert cache.stats()["entries"] == 1
+
+
+def test_memory_mapped_arrays_are_not_counted(tmp_path):
+    path, = _models(tmp_path, 1)
+    parsed = mesh_utils.AnalysisContext(path, use_mesh_cache=False)
+    mesh_utils.save_mesh_cache(parsed)
+    mapped = mesh_utils.AnalysisContext(path)
+    assert mapped.cached_arrays is not None
+    assert context_cache_module.context_bytes(mapped) < context_cache_module.context_bytes(parsed)
@@ -0,0 +1,60 @@
+import asyncio
+import sqlite3
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database import db_router
+
+# Схема models_database до хранилища blob и индексов пагинации
+LEGACY_SCHEMA = """
+CREATE TABLE auth_database (id INTEGER PRIMARY KEY, login VARCHAR NOT NULL, password VARCHAR NOT NULL);
+CREATE TABLE models_database (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES auth_database (id),
+    name VARCHAR NOT NULL,
+    stored_name VARCHAR NOT NULL,
+    report JSON
+);
+INSERT INTO auth_database VALUES (1, 'a', 'x');
+INSERT INTO models_database VALUES (1, 1, 'old.glb', 'old.glb', NULL);
+"""
+
+
+def _init(db_path, monkeypatch):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    monkeypatch.setattr(db_router, "engine", engine)
+
+    async def run():
+        try:
+            await db_router.init_database()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_init_database_migrates_existing_schema(tmp_path, monkeypatch):
+    db_path = tmp_path / "legacy.db"
+    with sqlite3.connect(db_path) as con:
+        con.executescript(LEGACY_SCHEMA)
+
+    _init(db_path, monkeypatch)
+    # Повторный запуск при старте ничего не ломает
+    _init(db_path, monkeypatch)
+
+    with sqlite3.connect(db_path) as con:
+        columns = {row[1] for row in con.execute("PRAGMA table_info(models_database)")}
+        indexes = {row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        rows = con.execute("SELECT id, content_hash FROM models_database").fetchall()
+    assert "content_hash" in columns
+    assert {"ix_models_database_content_hash", "ix_models_database_user_id_id",
+            "ix_models_database_user_id_name"} <= indexes
+    assert rows == [(1, None)]
+
+
+def test_init_database_creates_fresh_schema(tmp_path, monkeypatch):
+    db_path = tmp_path / "fresh.db"
+    _init(db_path, monkeypatch)
+    with sqlite3.connect(db_path) as con:
+        tables = {row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {"auth_database", "models_database"} <= tables
@@ -0,0 +1,69 @@
+import os
+
+from src.analysis import executor
+
+
+def crash_once(marker: str) -> int:
+    """Первый вызов убивает процесс пула, как OOM killer; следующие работают."""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return os.getpid()
+
+
+def test_broken_pool_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(executor.settings, "ANALYSIS_PROCESSES", 1)
+    monkeypatch.setattr(executor, "_pool", None)
+    try:
+        first = executor.get_pool()
+        done = []
+        futures = executor.submit_all({"task": (crash_once, (str(tmp_path / "marker"),))},
+                                      on_done=lambda name, future: done.append(name))
+        assert futures["task"].result() > 0
+        assert done == ["task"]
+        assert executor.get_pool() is not first
+        # Новый пул продолжает работать для следующих задач
+        assert executor.submit_all({"next": (os.getpid, ())})["next"].result() > 0
+    finally:
+        executor.shutdown()
+
+
+def test_second_break_is_reported_to_caller(tmp_path, monkeypatch):
+    monkeypatch.setattr(executor.settings, "ANALYSIS_PROCESSES", 1)
+    monkeypatch.setattr(executor, "_pool", None)
+    try:
+        futures = executor.submit_all({"task": (os._exit, (1,))})
+        assert isinstance(futures["task"].exception(), executor.BrokenProcessPool)
+    finally:
+        executor.shutdown()
+
+
+def test_pool_and_inline_give_same_analysis(tmp_path, monkeypatch):
+    from benchmarks import synthetic
+    from src.analysis import pipeline
+    from src.analysis.context_cache import context_cache
+
+    path = synthetic.export(str(tmp_path / "grid.glb"), synthetic.uv_grid(400))
+    monkeypatch.setattr(executor.settings, "ANALYSIS_PROCESSES", 0)
+    inline = pipeline.compute_analysis(path, str(tmp_path / "inline"))
+
+    context_cache.clear()
+    monkeypatch.setattr(executor.settings, "ANALYSIS_PROCESSES", 2)
+    monkeypatch.setattr(executor, "_pool", None)
+    try:
+        pooled = pipeline.compute_analysis(path, str(tmp_path / "pool"))
+    finally:
+        executor.shutdown()
+        context_cache.clear()
+    assert pooled["metrics"] == inline["metrics"]
+    for name in ("uv_layout.svg", "uv_overlap.svg", "uv_distortion.svg"):
+        with open(tmp_path / "inline" / name) as a, open(tmp_path / "pool" / name) as b:
+            assert a.read() == b.read()
+
+
+def test_timings_are_measured_where_tasks_run():
+    timings = {}
+    futures = executor.submit_all({"sleep": (executor._ping, ())}, timings=timings)
+    assert futures["sleep"].result() == os.getpid()
+    seconds, peak_rss = timings["sleep"]
+    assert seconds >= 0.05 and peak_rss > 0
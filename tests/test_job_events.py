@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+from conftest import register, upload_model, wait_job
+from src.analysis import jobs
+
+
+def _read_events(client, headers, job_id, **extra):
+    """Читает поток SSE до конца и возвращает события как (id, event, data)."""
+    with client.stream("GET", f"/analysis/jobs/{job_id}/events", headers={**headers, **extra}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        text = response.read().decode()
+    events = []
+    for block in text.split("\n\n"):
+        if not block or block.startswith(":"):
+            continue
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _finished_job(client, tmp_path):
+    headers = register(client)
+    model_id = upload_model(client, headers, tmp_path)
+    response = client.post(f"/analysis/models/{model_id}/analyze",
+                           json={"game_type": "indie", "usage_area": "prop"}, headers=headers)
+    job = wait_job(client, headers, response.json()["job_id"])
+    return headers, job
+
+
+def test_stream_replays_progress_and_ends_with_report(client, tmp_path):
+    headers, job = _finished_job(client, tmp_path)
+    events = _read_events(client, headers, job["job_id"])
+    assert [e[0] for e in events] == list(range(1, len(events) + 1))
+    assert events[0][1:] == ("status", {"status": "queued"})
+    assert events[-1][1:] == ("status", {"status": "done"})
+    names = [e[1] for e in events]
+    assert "stage" in names and "metrics" in names
+    report = next(data for _, event, data in events if event == "report")
+    assert report["metrics"] == job["report"]["metrics"]
+    partial = {}
+    for _, event, data in events:
+        if event == "metrics":
+            partial.update(data)
+    assert partial["faces"] == job["report"]["metrics"]["faces"]
+
+
+def test_last_event_id_resumes_stream(client, tmp_path):
+    headers, job = _finished_job(client, tmp_path)
+    events = _read_events(client, headers, job["job_id"])
+    resumed = _read_events(client, headers, job["job_id"], **{"Last-Event-ID": str(events[4][0])})
+    assert resumed == events[5:]
+    assert _read_events(client, headers, job["job_id"], **{"Last-Event-ID": str(events[-1][0])}) == []
+
+
+def test_waiting_stream_gets_live_events_and_keepalives():
+    manager = jobs.JobManager(1)
+    job = jobs.AnalysisJob(id="j", user_id=1, model_id=1)
+
+    async def run():
+        received = []
+
+        async def consume():
+            async for event in manager.events(job, keepalive=0.05):
+                received.append(event if event is None else event["event"])
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.12)
+        manager._publish(job, "stage", {"stage": "load"})
+        await asyncio.sleep(0)
+        job.status = jobs.JOB_DONE
+        manager._publish(job, "status", {"status": job.status})
+        await asyncio.wait_for(task, 1)
+        return received
+
+    received = asyncio.run(run())
+    assert received[:2] == [None, None]
+    assert received[-2:] == ["stage", "status"]
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from src.analysis import jobs
+
+
+class FakeRepository:
+    reports: dict = {}
+
+    def __init__(self, session):
+        pass
+
+    async def get_owned(self, model_id, user_id, *fields):
+        return SimpleNamespace(report=self.reports.get(model_id)) if model_id in self.reports else None
+
+    async def update_report(self, model_id, report):
+        self.reports[model_id] = report
+        return True
+
+
+@asynccontextmanager
+async def fake_session():
+    yield None
+
+
+def add_metric(name, previous=None, progress=None):
+    time.sleep(0.05)
+    return {"metrics": {**(previous or {}).get("metrics", {}), name: 1}}
+
+
+def test_jobs_on_same_model_keep_each_others_results(monkeypatch):
+    """Параллельные задачи одной модели дописывают отчет по очереди, а не затирают его."""
+    monkeypatch.setattr(jobs, "ModelsRepository", FakeRepository)
+    monkeypatch.setattr(jobs, "new_session", fake_session)
+    FakeRepository.reports = {1: None}
+    manager = jobs.JobManager(max_workers=2)
+
+    async def main():
+        submitted = [manager.submit(7, 1, add_metric, name) for name in ("faces", "density")]
+        await asyncio.gather(*list(manager._tasks.values()))
+        return submitted
+
+    try:
+        submitted = asyncio.run(main())
+    finally:
+        manager.shutdown()
+    assert all(job.status == jobs.JOB_DONE for job in submitted)
+    assert FakeRepository.reports[1]["metrics"] == {"faces": 1, "density": 1}
+    assert not manager._model_locks
+
+
+def test_event_history_is_capped_and_keeps_terminal_events(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_EVENTS", 5)
+    job = jobs.AnalysisJob(id="j", user_id=1, model_id=1)
+    for i in range(20):
+        jobs.JobManager._publish(job, "stage", {"i": i})
+    job.status = jobs.JOB_DONE
+    jobs.JobManager._publish(job, "status", {"status": job.status})
+    assert [e["id"] for e in job.events] == [17, 18, 19, 20, 21]
+    assert job.events[-1]["data"] == {"status": jobs.JOB_DONE}
+
+    async def replay(after):
+        return [event["id"] async for event in jobs.JobManager(1).events(job, after=after)]
+
+    # Клиент, отставший дальше истории, получает то, что осталось; id не сдвигаются
+    assert asyncio.run(replay(3)) == [17, 18, 19, 20, 21]
+    assert asyncio.run(replay(19)) == [20, 21]
+
+
+def test_finished_jobs_are_pruned_on_read(monkeypatch):
+    manager = jobs.JobManager(max_workers=1)
+    job = jobs.AnalysisJob(id="old", user_id=1, model_id=1, status=jobs.JOB_DONE)
+    job.finished_at = time.time() - jobs.JOB_TTL - 1
+    manager._jobs[job.id] = job
+    assert manager.get("old", 1) is None
+    assert not manager._jobs
@@ -0,0 +1,55 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from src.analysis import analysis_router
+from src.analysis.executor import BrokenProcessPool
+
+STORED_NAME = "0" * 32 + ".glb"
+
+
+class FakeRepository:
+    async def get_owned_by_stored_name(self, stored_name, user_id, *fields):
+        return SimpleNamespace(content_hash=None) if user_id == 1 else None
+
+
+def _get(user_id=1, current_user_id=1):
+    return asyncio.run(analysis_router.get_lazy_artifact(user_id, STORED_NAME, "density", "auto",
+                                                         current_user_id, FakeRepository()))
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(analysis_router.get_model_dir(1, STORED_NAME))
+
+
+@pytest.mark.parametrize("error, status", [
+    (BrokenProcessPool("pool died"), 503),
+    (FileNotFoundError("entry evicted"), 503),
+    (ValueError("bad mesh"), 500),
+])
+def test_build_errors_map_to_http_errors(model_dir, monkeypatch, error, status):
+    calls = []
+
+    def materialize(*args):
+        calls.append(args)
+        raise error
+
+    monkeypatch.setattr(analysis_router, "materialize_artifact", materialize)
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            _get()
+        assert exc.value.status_code == status
+    # Упавшее построение не переиспользуется следующим запросом
+    assert len(calls) == 2
+    assert not analysis_router._materializing
+
+
+def test_other_users_get_404(model_dir):
+    with pytest.raises(HTTPException) as exc:
+        _get(user_id=1, current_user_id=2)
+    assert exc.value.status_code == 404
@@ -0,0 +1,52 @@
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks import load_test, synthetic
+
+
+def test_parse_users():
+    assert load_test.parse_users("browser=8,analyst=2") == {"browser": 8, "analyst": 2}
+    with pytest.raises(SystemExit):
+        load_test.parse_users("admin=1")
+
+
+def test_report_splits_idle_and_busy():
+    stats = load_test.Stats()
+    for ms in range(1, 101):
+        stats.record("GET /a", ms / 1000, ok=ms != 100)
+    stats.analyses_running = 1
+    stats.record("GET /a", 1.0, ok=True)
+    report = stats.report(elapsed=10.0)["GET /a"]
+    assert (report["count"], report["errors"], report["rps"]) == (101, 1, 10.1)
+    assert report["idle"]["n"] == 100 and report["busy"]["n"] == 1
+    assert report["idle"]["p50_ms"] == pytest.approx(50.5)
+    assert report["busy"]["p99_ms"] == pytest.approx(1000.0)
+
+
+def test_scenarios_run_against_app(client, tmp_path, monkeypatch):
+    """Сценарии виртуальных пользователей проходят без ошибок на самом приложении."""
+    asset = synthetic.export(str(tmp_path / "asset.glb"), synthetic.uv_grid(200))
+    sleep = asyncio.sleep
+    # Опрос задачи раз в полсекунды тесту не нужен
+    monkeypatch.setattr(asyncio, "sleep", lambda delay: sleep(min(delay, 0.01)))
+
+    async def run():
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            stats = load_test.Stats()
+            analyst = load_test.VirtualUser(http, stats, "analyst", 0.0)
+            browser = load_test.VirtualUser(http, stats, "browser", 0.0)
+            await analyst.analyze(asset, {"game_type": "aaa", "usage_area": "hero"})
+            await browser.browse()
+            return stats
+
+    stats = asyncio.run(run())
+    assert dict(stats.errors) == {
+        # Первый вход еще не зарегистрированного пользователя
+        "POST /authorization/login": 2,
+    }
+    assert stats.analyses_running == 0
+    assert "GET /analysis/jobs/{id}" in stats.samples
+    assert "GET /models/{file}" in stats.samples
@@ -0,0 +1,67 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks import synthetic
+from conftest import register
+from src.analysis import mesh_cache, mesh_utils
+from src.config import settings
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    return synthetic.export(str(tmp_path / "scene.glb"), synthetic.uv_grid(300), synthetic.icosphere(80))
+
+
+def test_cache_roundtrip_is_memory_mapped(model_path):
+    mesh_utils.write_mesh_cache(model_path)
+    arrays = mesh_cache.load(model_path)
+    assert arrays is not None
+    parsed = mesh_utils.AnalysisContext(model_path, use_mesh_cache=False)
+    assert len(arrays) == len(parsed.geometries)
+    for cached, geom in zip(arrays, parsed.geometries):
+        assert isinstance(cached["vertices"], np.memmap)
+        assert np.array_equal(cached["vertices"], geom.mesh.vertices)
+        assert np.array_equal(cached["faces"], geom.mesh.faces)
+        assert np.allclose(cached["area_3d"], geom.area_3d)
+
+
+def test_cached_context_skips_parsing_and_gives_same_metrics(model_path, monkeypatch):
+    parsed = mesh_utils.AnalysisContext(model_path, use_mesh_cache=False)
+    mesh_utils.save_mesh_cache(parsed)
+    monkeypatch.setattr(mesh_utils, "load_mesh_raw", lambda path: pytest.fail("model parsed again"))
+    cached = mesh_utils.AnalysisContext(model_path)
+    assert cached.scene is None
+    assert cached.uv_overlap() == pytest.approx(parsed.uv_overlap())
+    assert cached.uv_distortion() == pytest.approx(parsed.uv_distortion())
+    assert mesh_utils.compute_metrics(cached.mesh) == mesh_utils.compute_metrics(parsed.mesh)
+
+
+def test_changed_file_or_version_invalidates_cache(model_path, monkeypatch):
+    mesh_utils.write_mesh_cache(model_path)
+    monkeypatch.setattr(mesh_cache, "MESH_CACHE_VERSION", mesh_cache.MESH_CACHE_VERSION + 1)
+    assert mesh_cache.load(model_path) is None
+    monkeypatch.undo()
+
+    assert mesh_cache.load(model_path) is not None
+    with open(model_path, "ab") as f:
+        f.write(b"\0")
+    assert mesh_cache.load(model_path) is None
+    assert mesh_cache.load(model_path + ".missing") is None
+
+
+def test_upload_builds_cache_shared_by_blob(client, tmp_path):
+    headers = register(client)
+    path = synthetic.export(str(tmp_path / "grid.glb"), synthetic.uv_grid(200))
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    urls = [client.post("/upload/", files={"file": (name, data)}, headers=headers).json()["url"]
+            for name in ("a.glb", "b.glb")]
+    # Фоновая задача загрузки построила один кэш рядом с blob, общий для обеих моделей
+    assert os.path.isdir(mesh_cache.cache_dir(path, digest))
+    assert sorted(os.listdir(os.path.join(settings.BLOB_STORE_DIR, digest[:2]))) == [digest, f"{digest}.mesh"]
+    for url in urls:
+        assert mesh_cache.load(url.lstrip("/"), digest) is not None
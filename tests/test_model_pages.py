@@ -0,0 +1,55 @@
+import asyncio
+
+from conftest import register
+from src.database import db_main
+from src.database.repositories import ModelsRepository
+
+
+def _add_models(user_id, names):
+    async def add():
+        async with db_main.new_session() as session:
+            repo = ModelsRepository(session)
+            for i, name in enumerate(names):
+                await repo.create_model(user_id=user_id, name=name, stored_name=f"{user_id}-{i}.obj")
+
+    asyncio.run(add())
+
+
+def _pages(client, headers, **params):
+    pages = []
+    cursor = None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/analysis/models/names", params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([row["name"] for row in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_all_models_once(client):
+    headers = register(client)
+    other = register(client, "other")
+    names = [f"model{i:02}" for i in range(7)]
+    _add_models(1, names)
+    _add_models(2, ["foreign"])
+
+    assert _pages(client, headers, limit=3) == [names[:3], names[3:6], names[6:]]
+    # Ровно полная последняя страница: заголовка курсора нет
+    assert _pages(client, headers, limit=7) == [names]
+    assert _pages(client, other, limit=3) == [["foreign"]]
+
+
+def test_prefix_filter(client):
+    headers = register(client)
+    _add_models(1, ["chair.obj", "Chair.glb", "table.obj", "chair_2.fbx", "chairs.obj"])
+    assert _pages(client, headers, prefix="chair", limit=2) == [["chair.obj", "chair_2.fbx"], ["chairs.obj"]]
+
+
+def test_invalid_cursor_and_limit(client):
+    headers = register(client)
+    for cursor in ("not-base64!", "e30", "eyJhZnRlciI6ICJ4In0"):
+        response = client.get("/analysis/models/names", params={"cursor": cursor}, headers=headers)
+        assert response.status_code == 400, cursor
+    assert client.get("/analysis/models/names", params={"limit": 0}, headers=headers).status_code == 422
@@ -0,0 +1,83 @@
+import asyncio
+import re
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from conftest import register, upload_model, wait_job
+from src.database import models  # noqa: F401  (регистрирует таблицы в Base.metadata)
+from src.database.db_main import Base
+from src.database.repositories import ModelsRepository
+
+REPORT = {"metrics": {"faces": 12}, "uv_image_url": "/uv.svg", "result": {"passed": True}}
+
+
+@pytest.fixture
+def run_with_repo(tmp_path):
+    """Выполняет корутину с ModelsRepository на пустой базе; возвращает результат и запросы SQL."""
+    def run(fn):
+        async def main():
+            path = tmp_path / "repo.db"
+            if path.exists():
+                path.unlink()
+            engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+            statements = []
+            event.listen(engine.sync_engine, "before_cursor_execute",
+                         lambda conn, cursor, statement, *args: statements.append(statement))
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            try:
+                async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                    repo = ModelsRepository(session)
+                    await repo.create_model(user_id=1, name="a.obj", stored_name="a.obj", report=REPORT)
+                    statements.clear()
+                    return await fn(repo), statements
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_get_owned_projects_report_keys_in_sql(run_with_repo):
+    row, statements = run_with_repo(
+        lambda repo: repo.get_owned(1, 1, "name", report_keys=("metrics", "uv_image_url", "missing")))
+    assert row.name == "a.obj"
+    assert row.metrics == {"faces": 12}
+    assert row._mapping["uv_image_url"] == "/uv.svg"
+    assert row._mapping["missing"] is None
+    # Отчет целиком не выбирается: только извлечения из JSON
+    select_sql = statements[0].lower()
+    assert select_sql.count("json_extract(") == 3
+    assert "report" not in re.sub(r"json_extract\([^)]*\)", "", select_sql)
+
+
+def test_get_owned_filters_owner_in_sql(run_with_repo):
+    row, _ = run_with_repo(lambda repo: repo.get_owned(1, 2, "name"))
+    assert row is None
+    row, _ = run_with_repo(lambda repo: repo.get_owned_by_stored_name("a.obj", 2))
+    assert row is None
+    row, _ = run_with_repo(lambda repo: repo.get_owned_by_stored_name("a.obj", 1, "content_hash"))
+    assert row.content_hash is None
+
+
+def test_model_endpoints_hide_foreign_models(client, tmp_path):
+    owner = register(client)
+    other = register(client, "other")
+    model_id = upload_model(client, owner, tmp_path)
+    job_id = client.post(f"/analysis/models/{model_id}/analyze",
+                         json={"game_type": "indie", "usage_area": "prop"}, headers=owner).json()["job_id"]
+    assert wait_job(client, owner, job_id)["status"] == "done"
+
+    urls = client.get(f"/analysis/models/{model_id}/url", headers=owner).json()
+    assert urls["name"] == "grid.glb"
+    assert urls["uv_url"].split("?")[0].endswith(".svg")
+    assert client.get(urls["url"]).status_code == 200
+    profiles = client.get(f"/analysis/models/{model_id}/profiles", headers=owner).json()
+    assert profiles["metrics"]["faces"] == 200
+
+    for path in ("url", "profiles", "analysis"):
+        assert client.get(f"/analysis/models/{model_id}/{path}", headers=other).status_code == 404
+    assert client.delete(f"/upload/{model_id}", headers=other).status_code == 404
@@ -0,0 +1,66 @@
+import re
+
+import pytest
+
+from conftest import register
+from src import monitoring
+
+SAMPLE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]\w*="(\\.|[^"\\])*",?)*\})? \S+$')
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(monitoring, "REGISTRY", [])
+    monkeypatch.setattr(monitoring, "COLLECTORS", [])
+    return monitoring.REGISTRY
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = monitoring.Histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, stage="load")
+    assert monitoring.render().splitlines() == [
+        "# HELP stage_seconds Stage time",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="load",le="0.1"} 1',
+        'stage_seconds_bucket{stage="load",le="1.0"} 3',
+        'stage_seconds_bucket{stage="load",le="+Inf"} 4',
+        'stage_seconds_sum{stage="load"} 6.05',
+        'stage_seconds_count{stage="load"} 4',
+    ]
+
+
+def test_counter_gauge_and_label_escaping(registry):
+    counter = monitoring.Counter("errors_total", "Errors", ("kind",))
+    gauge = monitoring.Gauge("peak_bytes", "Peak")
+    counter.inc(kind='a"b\nc')
+    counter.inc(2, kind='a"b\nc')
+    gauge.set_max(10)
+    gauge.set_max(5)
+    monitoring.COLLECTORS.append(lambda: gauge.set_max(20))
+    lines = monitoring.render().splitlines()
+    assert 'errors_total{kind="a\\"b\\nc"} 3.0' in lines
+    assert "peak_bytes 20.0" in lines
+    assert "# TYPE errors_total counter" in lines and "# TYPE peak_bytes gauge" in lines
+
+
+def test_size_class():
+    assert monitoring.size_class(0) == "small"
+    assert monitoring.size_class(10_000) == "medium"
+    assert monitoring.size_class(10 ** 9) == "huge"
+
+
+def test_metrics_endpoint_format(client):
+    register(client)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    for line in lines:
+        assert line.startswith(("# HELP ", "# TYPE ")) or SAMPLE.match(line), line
+    # Латентность уже выполненного запроса регистрации попала в гистограмму по роутерам
+    assert any(line.startswith('http_request_duration_seconds_count{router="authorization",method="POST"')
+               for line in lines)
+    assert "# TYPE analysis_stage_seconds histogram" in lines
@@ -0,0 +1,19 @@
+from benchmarks import synthetic
+from src.analysis import pipeline
+from src.analysis.mesh_utils import AnalysisContext
+
+
+def test_failed_metric_task_keeps_rest_of_report(tmp_path, monkeypatch):
+    """Упавшая задача метрики дает 0.0, а уже построенные артефакты остаются в отчете."""
+    def fail(self):
+        raise MemoryError("boom")
+
+    monkeypatch.setattr(AnalysisContext, "uv_distortion", fail)
+    path = synthetic.export(str(tmp_path / "grid.glb"), synthetic.uv_grid(200))
+    result = pipeline.compute_analysis(path, str(tmp_path / "out"), "exact", "svg",
+                                       ("faces", "uv_overlap", "uv_distortion", "texel_density"),
+                                       ("recolored", "uv_overlap"))
+    assert result["metrics"]["uv_distortion"] == 0.0
+    assert result["metrics"]["faces"] > 0
+    assert result["metrics"]["texel_density"] > 0
+    assert set(result["artifacts"]) == {"recolored", "uv_overlap"}
@@ -0,0 +1,85 @@
+import os
+
+from benchmarks import synthetic
+from src.analysis import pipeline, result_cache
+from src.analysis.result_cache import ResultCache
+
+
+def test_rerun_does_not_modify_cached_artifacts(tmp_path, monkeypatch):
+    """Повторный анализ другим методом не меняет файлы, связанные с прошлой записью кэша."""
+    cache = ResultCache(str(tmp_path / "cache"), 1024 ** 3)
+    monkeypatch.setattr(pipeline, "result_cache", cache)
+    path = synthetic.export(str(tmp_path / "model" / "grid.glb"), synthetic.uv_grid(2000))
+    out_dir = str(tmp_path / "model")
+    artifacts = ("recolored", "uv_overlap")
+
+    pipeline.ensure_analysis(path, out_dir, "exact", "svg", (), artifacts)
+    exact_key = cache.key_for(path, variant="overlap-exact-svg")
+    entry_dir = cache._entry_dir(exact_key)
+    before = {}
+    for name in ("recolored.glb", "uv_overlap.svg"):
+        with open(os.path.join(entry_dir, name), "rb") as f:
+            before[name] = f.read()
+
+    pipeline.ensure_analysis(path, out_dir, "raster", "svg", (), artifacts)
+
+    for name, data in before.items():
+        cached = os.path.join(entry_dir, name)
+        assert not os.path.samefile(cached, os.path.join(out_dir, name))
+        with open(cached, "rb") as f:
+            assert f.read() == data
+
+
+def test_lazy_artifact_is_built_per_method(tmp_path, monkeypatch):
+    """Файл, построенный одним методом, не отдается по ссылке с другим методом."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pipeline, "result_cache", ResultCache(str(tmp_path / "cache"), 1024 ** 3))
+    stored_name = "0" * 32 + ".glb"
+    synthetic.export(os.path.join(pipeline.get_model_dir(1, stored_name), stored_name), synthetic.uv_grid(200))
+    calls = []
+    compute = pipeline.compute_analysis
+    monkeypatch.setattr(pipeline, "compute_analysis", lambda *a, **k: calls.append(a[2]) or compute(*a, **k))
+
+    for method in ("exact", "raster", "exact"):
+        assert pipeline.materialize_artifact(1, stored_name, "uv_overlap", method) is not None
+    assert calls == ["exact", "raster"]
+
+
+def _put(cache, tmp_path, key, size):
+    out_dir = tmp_path / "out" / key
+    out_dir.mkdir(parents=True)
+    (out_dir / "a.bin").write_bytes(b"x" * size)
+    cache.put(key, {"metrics": {}, "artifacts": {"a": "a.bin"}}, str(out_dir))
+
+
+def test_evict_uses_size_index(tmp_path, monkeypatch):
+    """Вытеснение идет по индексу размеров в памяти, без обхода всего кэша на каждый put."""
+    cache = ResultCache(str(tmp_path / "cache"), 2500)
+    walks = []
+    tree_size = result_cache._tree_size
+    monkeypatch.setattr(result_cache, "_tree_size", lambda path: walks.append(path) or tree_size(path))
+    for key in ("aa1", "bb2", "cc3"):
+        _put(cache, tmp_path, key, 1000)
+    # Только по одному обходу на каждую новую запись (ее временный каталог)
+    assert len(walks) == 3
+    assert cache.get("aa1") is None
+    assert cache.get("bb2") == {"metrics": {}, "artifacts": {"a": "a.bin"}}
+    assert list(cache._index) == ["cc3", "bb2"]
+    assert cache._total == sum(result_cache._entry_size(cache._entry_dir(k)) for k in ("bb2", "cc3"))
+
+    # Индекс после перезапуска строится из размеров в entry.json
+    reopened = ResultCache(str(tmp_path / "cache"), 2500)
+    reopened.evict()
+    assert reopened._total == cache._total
+
+
+def test_evict_skips_entries_being_restored(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), 1500)
+    _put(cache, tmp_path, "aa1", 1000)
+    cache._restoring["aa1"] = 1
+    _put(cache, tmp_path, "bb2", 1000)
+    assert os.path.isdir(cache._entry_dir("aa1"))
+    cache._restoring.clear()
+    cache.evict()
+    assert cache.get("aa1") is None
+    assert cache.get("bb2") is not None
@@ -0,0 +1,18 @@
+from src.analysis import thresholds
+
+
+def test_profiles_without_metrics_are_not_evaluated():
+    matrix = thresholds.evaluate_all({})
+    verdicts = [v for areas in matrix.values() for v in areas.values()]
+    assert verdicts and all(v["passed"] is None and v["result"] == {} for v in verdicts)
+
+
+def test_profiles_with_metrics_pass_or_fail():
+    matrix = thresholds.evaluate_all({"faces": 500})
+    assert matrix["low-poly"]["hero"]["passed"] is True
+    assert matrix["low-poly"]["background"]["passed"] is False
+
+
+def test_no_thresholds_configured(monkeypatch):
+    monkeypatch.setattr(thresholds, "THRESHOLDS", {})
+    assert thresholds.evaluate_all({"faces": 500}) == {}
@@ -0,0 +1,59 @@
+import asyncio
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from conftest import register
+from src.config import settings
+from src.upload import upload_router
+
+OBJ = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvt 1 0\nvt 0 1\nf 1/1 2/2 3/3\n" * 50
+
+
+async def _stream(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_write_stream_hashes_chunks(tmp_path):
+    path = str(tmp_path / "model.obj")
+    digest = asyncio.run(upload_router.write_stream(_stream(OBJ, 7), path, max_bytes=len(OBJ)))
+    assert digest == hashlib.sha256(OBJ).hexdigest()
+    with open(path, "rb") as f:
+        assert f.read() == OBJ
+    assert os.listdir(tmp_path) == ["model.obj"]
+
+
+@pytest.mark.parametrize("max_bytes, min_bytes, status", [(len(OBJ) - 1, 0, 413), (len(OBJ) * 2, len(OBJ) + 1, 400)])
+def test_write_stream_rejects_size_and_removes_part(tmp_path, max_bytes, min_bytes, status):
+    path = str(tmp_path / "model.obj")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(upload_router.write_stream(_stream(OBJ, 64), path, max_bytes, min_bytes))
+    assert exc.value.status_code == status
+    assert os.listdir(tmp_path) == []
+
+
+def test_upload_returns_413_over_limit(client, monkeypatch):
+    headers = register(client)
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", len(OBJ) - 1)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 100)
+    response = client.post("/upload/", files={"file": ("big.obj", OBJ)}, headers=headers)
+    assert response.status_code == 413
+    assert os.listdir(os.path.join("models", "1")) == []
+
+    response = client.post("/upload/sessions", json={"filename": "big.obj", "size": len(OBJ)}, headers=headers)
+    assert response.status_code == 413
+
+
+def test_upload_stores_blob_by_hash(client):
+    headers = register(client)
+    first = client.post("/upload/", files={"file": ("a.obj", OBJ)}, headers=headers)
+    second = client.post("/upload/", files={"file": ("b.obj", OBJ)}, headers=headers)
+    assert first.status_code == second.status_code == 200
+    digest = hashlib.sha256(OBJ).hexdigest()
+    blob = os.path.join(settings.BLOB_STORE_DIR, digest[:2], digest)
+    assert os.path.isfile(blob)
+    # Одинаковое содержимое хранится один раз: файлы моделей - жесткие ссылки на blob
+    assert os.stat(blob).st_nlink == 3
@@ -0,0 +1,85 @@
+import hashlib
+
+from conftest import register
+from src.config import settings
+from src.upload import upload_router
+
+OBJ = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvt 1 0\nvt 0 1\nf 1/1 2/2 3/3\n" * 50
+
+
+def _create_session(client, headers, chunk_size, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_SESSION_CHUNK_SIZE", chunk_size)
+    response = client.post("/upload/sessions", json={"filename": "model.obj", "size": len(OBJ)}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+
+def _put_chunks(client, headers, session, indexes):
+    size = session["chunk_size"]
+    for index in indexes:
+        response = client.put(f"/upload/sessions/{session['upload_id']}/chunks/{index}",
+                              content=OBJ[index * size:(index + 1) * size], headers=headers)
+        assert response.status_code == 200, response.text
+
+
+def test_session_assembles_out_of_order_chunks(client, monkeypatch):
+    headers = register(client)
+    session = _create_session(client, headers, 256, monkeypatch)
+    total = session["total_chunks"]
+    assert total > 2
+    _put_chunks(client, headers, session, reversed(range(1, total)))
+
+    state = client.get(f"/upload/sessions/{session['upload_id']}", headers=headers).json()
+    assert state["missing"] == 1
+    incomplete = client.post(f"/upload/sessions/{session['upload_id']}/complete", headers=headers)
+    assert incomplete.status_code == 409
+
+    _put_chunks(client, headers, session, [0])
+    digest = hashlib.sha256(OBJ).hexdigest()
+    response = client.post(f"/upload/sessions/{session['upload_id']}/complete", json={"sha256": digest},
+                           headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()["sha256"] == digest
+    with open(response.json()["url"].lstrip("/"), "rb") as f:
+        assert f.read() == OBJ
+    # Сессия удалена после сборки
+    assert client.get(f"/upload/sessions/{session['upload_id']}", headers=headers).status_code == 404
+
+
+def test_session_rejects_wrong_chunk_size(client, monkeypatch):
+    headers = register(client)
+    session = _create_session(client, headers, 256, monkeypatch)
+    response = client.put(f"/upload/sessions/{session['upload_id']}/chunks/0", content=OBJ[:100], headers=headers)
+    assert response.status_code == 400
+    response = client.put(f"/upload/sessions/{session['upload_id']}/chunks/0", content=OBJ[:300], headers=headers)
+    assert response.status_code == 413
+
+
+def test_session_checksum_mismatch_keeps_chunks(client, monkeypatch):
+    headers = register(client)
+    session = _create_session(client, headers, 256, monkeypatch)
+    _put_chunks(client, headers, session, range(session["total_chunks"]))
+    response = client.post(f"/upload/sessions/{session['upload_id']}/complete", json={"sha256": "0" * 64},
+                           headers=headers)
+    assert response.status_code == 422
+    state = client.get(f"/upload/sessions/{session['upload_id']}", headers=headers).json()
+    assert state["missing"] == 0
+
+
+def test_concurrent_complete_is_rejected(client, monkeypatch):
+    headers = register(client)
+    session = _create_session(client, headers, 256, monkeypatch)
+    _put_chunks(client, headers, session, range(session["total_chunks"]))
+    # Сессия уже собирается другим запросом: второй complete не создает вторую модель
+    monkeypatch.setattr(upload_router, "_completing", {session["upload_id"]})
+    response = client.post(f"/upload/sessions/{session['upload_id']}/complete", headers=headers)
+    assert response.status_code == 409
+    assert client.get(f"/upload/sessions/{session['upload_id']}", headers=headers).status_code == 200
+
+
+def test_session_is_private(client, monkeypatch):
+    owner = register(client)
+    other = register(client, "other")
+    session = _create_session(client, owner, 256, monkeypatch)
+    response = client.put(f"/upload/sessions/{session['upload_id']}/chunks/0", content=OBJ[:256], headers=other)
+    assert response.status_code == 404
@@ -0,0 +1,46 @@
+import numpy as np
+import trimesh
+
+from src.analysis import mesh_utils, uv_overlap
+
+
+def _stacked(quads: int) -> trimesh.Trimesh:
+    """quads квадратов рядом в 3D, развертка каждого - весь квадрат [0, 1]^2."""
+    i = np.arange(quads, dtype=np.float64)[:, None]
+    zero = np.zeros_like(i)
+    vertices = np.stack([np.c_[i, zero, zero], np.c_[i + 1, zero, zero],
+                         np.c_[i + 1, zero + 1, zero], np.c_[i, zero + 1, zero]], axis=1).reshape(-1, 3)
+    b = 4 * np.arange(quads)[:, None]
+    faces = np.r_[np.c_[b, b + 1, b + 2], np.c_[b, b + 2, b + 3]]
+    mesh = trimesh.Trimesh(vertices=vertices, faces=faces, process=False)
+    mesh.visual = trimesh.visual.TextureVisuals(uv=np.tile([[0, 0], [1, 0], [1, 1], [0, 1]], (quads, 1)).astype(float))
+    return mesh
+
+
+def test_exact_falls_back_to_raster_past_pair_budget(monkeypatch):
+    monkeypatch.setattr(mesh_utils, "UV_OVERLAP_MAX_PAIRS", 1000)
+    mesh = _stacked(100)
+    geom = mesh_utils.GeometryData(mesh)
+    assert geom.overlap_method("exact") == "raster"
+    ratio = mesh_utils.compute_uv_overlap(mesh, method="exact")
+    assert abs(ratio - 0.99) < 0.01
+    colors = mesh_utils.get_uv_overlap_colors(mesh, method="exact")
+    assert np.all(colors[:, 0] == 255)
+
+
+def test_overlap_pairs_shared_between_ratio_and_colors(monkeypatch):
+    calls = []
+    find = uv_overlap.find_overlaps
+    monkeypatch.setattr(uv_overlap, "find_overlaps", lambda *a, **k: calls.append(1) or find(*a, **k))
+    mesh = _stacked(10)
+    mesh_utils.compute_uv_overlap(mesh, method="exact")
+    mesh_utils.get_uv_overlap_colors(mesh, method="exact")
+    assert len(calls) == 1
+
+
+def test_geometry_cached_on_mesh_and_dropped_on_change():
+    mesh = _stacked(10)
+    geom = mesh_utils._as_geometry(mesh)
+    assert mesh_utils._as_geometry(mesh) is geom
+    mesh.vertices[0] += 1.0
+    assert mesh_utils._as_geometry(mesh) is not geom
@@ -0,0 +1,42 @@
+import numpy as np
+
+from benchmarks import synthetic
+from src.analysis import uv_overlap, uv_raster
+
+
+def _uv_faces(mesh) -> np.ndarray:
+    return mesh.visual.uv[mesh.faces]
+
+
+def test_shared_edges_cover_each_pixel_once():
+    # Сетка 8 x 8 квадратов по две грани: с правилом "верхнее-левое" нет ни дыр, ни двойного покрытия
+    n = 8
+    y, x = np.mgrid[0:n, 0:n].reshape(2, -1) / n
+    a, b, c, d = (np.c_[x + dx, y + dy] for dx, dy in ((0, 0), (1 / n, 0), (1 / n, 1 / n), (0, 1 / n)))
+    uv_faces = np.concatenate([np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)])
+    coverage = uv_raster.uv_coverage(uv_faces, 64)
+    assert coverage.counts.min() == 1 and coverage.counts.max() == 1
+    assert coverage.overlap_ratio == 0.0
+    assert not coverage.face_overlap.any()
+
+
+def test_raster_estimate_close_to_exact():
+    uv_faces = _uv_faces(synthetic.uv_grid(2000, overlap=0.1))
+    overlaps = uv_overlap.find_overlaps(uv_faces)
+    exact = uv_overlap.overlap_ratio(uv_faces, overlaps)
+    coverage = uv_raster.uv_coverage(uv_faces, 1024)
+    assert exact > 0.05
+    assert abs(coverage.overlap_ratio - exact) < 0.01
+    exact_mask = uv_overlap.face_overlap_mask(len(uv_faces), overlaps)
+    assert (coverage.face_overlap == exact_mask).mean() > 0.98
+
+
+def test_resolution_drops_for_stacked_islands_and_skips_nan():
+    square = np.array([[[0, 0], [1, 0], [1, 1]], [[0, 0], [1, 1], [0, 1]]], dtype=np.float64)
+    uv_faces = np.concatenate([np.tile(square, (50, 1, 1)), [[[np.nan, 0], [1, 0], [0, 1]]]])
+    coverage = uv_raster.uv_coverage(uv_faces, 512, max_samples=1 << 16)
+    resolution = int(np.sqrt(coverage.counts.size))
+    assert resolution < 512
+    assert coverage.counts.sum() <= 1 << 16
+    assert abs(coverage.overlap_ratio - 49 / 50) < 1e-9
+    assert coverage.face_overlap[:-1].all() and not coverage.face_overlap[-1]
@@ -0,0 +1,68 @@
+import io
+import re
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from src.analysis import uv_svg
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def _triangles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.random((n, 3, 2))
+
+
+def _paths(svg: str):
+    root = ET.fromstring(svg)
+    return [(p.get("fill"), p.get("d")) for p in root.iter(f"{SVG}path")]
+
+
+def _points(d: str) -> np.ndarray:
+    assert re.fullmatch(r"(M[-\d. ]+Z)*", d)
+    return np.array([[float(v) for v in t.split()] for t in d[1:-1].split("ZM")]).reshape((-1, 3, 2))
+
+
+def test_one_path_per_fill_in_first_appearance_order():
+    tris = _triangles(9)
+    palette = np.array([[255, 0, 0, 255], [0, 255, 0, 128], [0, 0, 255, 255]], dtype=np.uint8)
+    face_colors = palette[[1, 0, 1, 2, 0, 1, 2, 2, 1]]
+    paths = _paths(uv_svg.render_uv_svg(tris, face_colors, size=256))
+    assert [fill for fill, _ in paths] == ["rgba(0,255,0,0.50)", "rgba(255,0,0,1.00)", "rgba(0,0,255,1.00)"]
+    assert [len(_points(d)) for _, d in paths] == [4, 2, 3]
+
+
+def test_paths_hold_every_triangle_with_one_orientation():
+    tris = _triangles(50, seed=1)
+    colors = np.random.default_rng(2).integers(0, 3, 50)[:, None].repeat(3, axis=1).astype(np.uint8)
+    paths = _paths(uv_svg.render_uv_svg(tris, colors, size=512))
+    pts = np.concatenate([_points(d) for _, d in paths])
+    expected, _ = uv_svg.layout(tris, colors, 512)
+    assert len(pts) == 50
+    assert np.allclose(np.sort(pts.reshape(50, -1), axis=0), np.sort(expected.reshape(50, -1), axis=0), atol=0.01)
+    a, b, c = pts[:, 0], pts[:, 1], pts[:, 2]
+    cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+    assert (cross >= -1e-6).all()
+
+
+def test_without_colors_single_unfilled_path_and_nan_faces_dropped():
+    tris = _triangles(5)
+    tris[2, 1, 0] = np.nan
+    paths = _paths(uv_svg.render_uv_svg(tris, None, size=128))
+    assert len(paths) == 1 and paths[0][0] == "none"
+    assert len(_points(paths[0][1])) == 4
+
+
+def test_chunked_writing_matches_render(tmp_path):
+    tris = _triangles(30)
+    colors = np.full((30, 4), 200, dtype=np.uint8)
+    path = tmp_path / "uv.svg"
+    uv_svg.save_uv_svg(str(path), tris, colors, size=300)
+    assert path.read_text(encoding="utf-8") == uv_svg.render_uv_svg(tris, colors, size=300)
+    assert [p.name for p in tmp_path.iterdir()] == ["uv.svg"]
+
+    pts, colors = uv_svg.layout(tris, colors, 300)
+    buf = io.StringIO()
+    uv_svg.write_svg(buf, pts, colors, 300, 1, chunk=7)
+    assert buf.getvalue() == path.read_text(encoding="utf-8")
@@ -0,0 +1,71 @@
+import io
+import os
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+from src.analysis import uv_tiles
+
+
+def _read_png(data: bytes):
+    """Разбирает PNG по чанкам, проверяя CRC; возвращает (ширина, высота, пиксели RGB)."""
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    chunks = []
+    while pos < len(data):
+        (length,) = struct.unpack(">I", data[pos:pos + 4])
+        tag = data[pos + 4:pos + 8]
+        body = data[pos + 8:pos + 8 + length]
+        (crc,) = struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])
+        assert crc == zlib.crc32(tag + body) & 0xFFFFFFFF
+        chunks.append((tag, body))
+        pos += 12 + length
+    assert [tag for tag, _ in chunks] == [b"IHDR", b"IDAT", b"IEND"]
+    width, height, depth, color_type, _, _, _ = struct.unpack(">IIBBBBB", chunks[0][1])
+    assert (depth, color_type) == (8, 2)
+    raw = np.frombuffer(zlib.decompress(chunks[1][1]), dtype=np.uint8).reshape((height, 1 + width * 3))
+    assert (raw[:, 0] == 0).all()
+    return width, height, raw[:, 1:].reshape((height, width, 3))
+
+
+def test_encode_png_roundtrip():
+    rgb = np.random.default_rng(0).integers(0, 256, (5, 7, 3), dtype=np.uint8)
+    width, height, pixels = _read_png(uv_tiles.encode_png(rgb))
+    assert (width, height) == (7, 5)
+    assert np.array_equal(pixels, rgb)
+
+
+def test_encode_png_decodes_with_pillow():
+    Image = pytest.importorskip("PIL.Image")
+    rgb = np.random.default_rng(1).integers(0, 256, (16, 9, 3), dtype=np.uint8)
+    image = Image.open(io.BytesIO(uv_tiles.encode_png(rgb)))
+    assert image.mode == "RGB"
+    assert np.array_equal(np.asarray(image), rgb)
+
+
+def test_tile_pyramid_layout(tmp_path):
+    uv_faces = np.array([[[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]], [[1.0, 1.0], [0.0, 1.0], [1.0, 0.0]]])
+    colors = np.array([[255, 0, 0, 255], [0, 0, 255, 255]], dtype=np.uint8)
+    out_dir = str(tmp_path / "tiles")
+    assert uv_tiles.save_uv_tiles(out_dir, uv_faces, colors, max_zoom=2) == 2
+    for z in range(3):
+        n = 1 << z
+        assert sorted(os.listdir(os.path.join(out_dir, str(z)))) == [str(x) for x in range(n)]
+        for x in range(n):
+            assert sorted(os.listdir(os.path.join(out_dir, str(z), str(x)))) == [f"{y}.png" for y in range(n)]
+    with open(os.path.join(out_dir, "0", "0", "0.png"), "rb") as f:
+        width, height, pixels = _read_png(f.read())
+    assert (width, height) == (uv_tiles.TILE_SIZE, uv_tiles.TILE_SIZE)
+    # Ось V направлена вверх: красная половина UV слева снизу, синяя справа сверху
+    assert pixels[215, 40, 0] > 200 and pixels[215, 40, 2] < 50
+    assert pixels[40, 215, 2] > 200 and pixels[40, 215, 0] < 50
+    assert sorted(os.listdir(tmp_path)) == ["tiles"]
+
+
+def test_zoom_grows_with_face_count():
+    assert uv_tiles.zoom_for(10) == uv_tiles.MIN_ZOOM
+    assert uv_tiles.zoom_for(10 ** 9) == uv_tiles.MAX_ZOOM
+    zooms = [uv_tiles.zoom_for(n) for n in (10, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)]
+    assert zooms == sorted(zooms)
@@ -0,0 +1,35 @@
+import numpy as np
+import trimesh
+
+from src.analysis import mesh_utils, winding
+
+
+def _two_bodies() -> trimesh.Trimesh:
+    """Большая сфера и маленькая в стороне; у маленькой развернута первая грань.
+
+    Намотка маленькой сферы распространяется от ее первой грани, поэтому
+    после согласования вся она оказывается вывернутой наизнанку.
+    """
+    big = trimesh.creation.icosphere(subdivisions=3, radius=2.0)
+    small = trimesh.creation.icosphere(subdivisions=2, radius=0.5)
+    small.apply_translation([5.0, 0.0, 0.0])
+    faces = np.array(small.faces)
+    faces[0] = faces[0][::-1]
+    small = trimesh.Trimesh(vertices=small.vertices, faces=faces, process=False)
+    return trimesh.util.concatenate([big, small])
+
+
+def test_orient_faces_per_body():
+    """Каждое замкнутое тело разворачивается наружу независимо от соседних."""
+    mesh = _two_bodies()
+    n_big = 20 * 4 ** 3
+    oriented, flips = winding.orient_faces(mesh.vertices, mesh.faces)
+    assert np.flatnonzero(flips).tolist() == [n_big]
+    assert winding.signed_volume(mesh.vertices, oriented[:n_big]) > 0
+    assert winding.signed_volume(mesh.vertices, oriented[n_big:]) > 0
+
+
+def test_only_inverted_face_is_red():
+    colored = mesh_utils.fix_and_color_inverted_polygons(_two_bodies())
+    red = np.all(colored.visual.face_colors == [255, 0, 0, 255], axis=1)
+    assert int(red.sum()) == 1